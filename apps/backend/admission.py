@@ -0,0 +1,233 @@
+"""
+Admission Control for Heat Demand Prediction API
+Per-class concurrency limits, priority queuing and fast rejection when the worker is saturated
+"""
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower priority value is served first when slots free up
+DEFAULT_CLASSES = {
+    # Plant control loops and single-hour lookups
+    'control': {'priority': 0, 'limit': 8, 'queue': 64, 'timeout': 0.5},
+    # Dashboard horizons, explanations and cached lookups
+    'interactive': {'priority': 1, 'limit': 4, 'queue': 32, 'timeout': 2.0},
+    # Multi-building batches and district roll-ups
+    'bulk': {'priority': 2, 'limit': 2, 'queue': 8, 'timeout': 5.0}
+}
+
+# View functions (Flask endpoint names) per class; anything unlisted is interactive
+ENDPOINT_CLASSES = {
+    'predict_single': 'control',
+    'get_forecast': 'control',
+    # Profiles are wanted most when the worker is saturated
+    'profile_worker': 'control',
+    'predict_batch': 'bulk',
+    'aggregate_district': 'bulk'
+}
+
+# Liveness probes and metrics bypass admission: a saturated worker must still answer them,
+# or the orchestrator restarts healthy workers and the shedding becomes invisible
+EXEMPT_ENDPOINTS = frozenset(('health_check', 'get_admission_stats', 'get_drift_report'))
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed
+
+    Attributes:
+        status: 429 when the class queue is full, 503 when the queue wait timed out
+        retry_after: Suggested client back-off in whole seconds
+    """
+
+    def __init__(self, request_class: str, status: int, retry_after: int, reason: str):
+        super().__init__(f"{request_class} requests are {reason}")
+        self.request_class = request_class
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ('request_class', 'priority', 'sequence', 'granted')
+
+    def __init__(self, request_class: str, priority: int, sequence: int):
+        self.request_class = request_class
+        self.priority = priority
+        self.sequence = sequence
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Admission control shared by all request threads of one worker process
+
+    Each request class has its own concurrency limit, a bounded wait queue
+    and a maximum queue wait. The total number of running requests is capped
+    by ``capacity``; because lower-priority classes have limits below the
+    capacity, some slots always stay available to the control class. When a
+    slot frees up it goes to the highest-priority waiting request whose class
+    is below its limit (first come, first served within a class).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 8,
+        classes: Optional[Dict[str, Dict]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            capacity: Maximum requests running at once across all classes
+            classes: Class name -> {'priority', 'limit', 'queue', 'timeout'} (see DEFAULT_CLASSES)
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.capacity = capacity
+        self.classes = {name: dict(config) for name, config in (classes or DEFAULT_CLASSES).items()}
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._waiting = []
+        self._running = 0
+        self._stats = {
+            name: {
+                'running': 0, 'queued': 0, 'admitted': 0, 'completed': 0,
+                'rejected_queue_full': 0, 'rejected_timeout': 0,
+                'queue_wait_total': 0.0, 'queue_wait_max': 0.0,
+                # Exponentially weighted service time, used for Retry-After
+                'service_seconds': 0.05
+            }
+            for name in self.classes
+        }
+
+    def _has_room(self, request_class: str) -> bool:
+        return (
+            self._running < self.capacity
+            and self._stats[request_class]['running'] < self.classes[request_class]['limit']
+        )
+
+    def _start(self, request_class: str):
+        stats = self._stats[request_class]
+        self._running += 1
+        stats['running'] += 1
+        stats['admitted'] += 1
+
+    def _dispatch(self):
+        """Grant free slots to waiters in priority order (caller holds the condition)"""
+        granted = False
+        for waiter in sorted(self._waiting, key=lambda w: (w.priority, w.sequence)):
+            if self._running >= self.capacity:
+                break
+            if self._has_room(waiter.request_class):
+                waiter.granted = True
+                self._waiting.remove(waiter)
+                self._stats[waiter.request_class]['queued'] -= 1
+                self._start(waiter.request_class)
+                granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def retry_after(self, request_class: str) -> int:
+        """Estimate seconds until a queued request of this class would start"""
+        stats = self._stats[request_class]
+        backlog = stats['queued'] + stats['running']
+        return max(1, math.ceil(backlog * stats['service_seconds'] / max(1, self.classes[request_class]['limit'])))
+
+    def acquire(self, request_class: str) -> float:
+        """
+        Wait for a slot for one request
+
+        Args:
+            request_class: One of the configured class names
+
+        Returns:
+            Start time token to pass to release()
+
+        Raises:
+            AdmissionRejected: If the class queue is full (429) or the wait timed out (503)
+        """
+        config = self.classes[request_class]
+        stats = self._stats[request_class]
+        with self._condition:
+            arrived = self.clock()
+            ahead = any(w.priority <= config['priority'] for w in self._waiting)
+            if not ahead and self._has_room(request_class):
+                self._start(request_class)
+                return arrived
+
+            if stats['queued'] >= config['queue']:
+                stats['rejected_queue_full'] += 1
+                raise AdmissionRejected(request_class, 429, self.retry_after(request_class), 'over capacity')
+
+            waiter = _Waiter(request_class, config['priority'], next(self._sequence))
+            self._waiting.append(waiter)
+            stats['queued'] += 1
+            deadline = arrived + config['timeout']
+            while not waiter.granted:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    self._waiting.remove(waiter)
+                    stats['queued'] -= 1
+                    stats['rejected_timeout'] += 1
+                    raise AdmissionRejected(request_class, 503, self.retry_after(request_class), 'queued too long')
+                self._condition.wait(remaining)
+
+            waited = self.clock() - arrived
+            stats['queue_wait_total'] += waited
+            stats['queue_wait_max'] = max(stats['queue_wait_max'], waited)
+            return self.clock()
+
+    def release(self, request_class: str, started: float):
+        """Free a slot and hand it to the next eligible waiter"""
+        with self._condition:
+            stats = self._stats[request_class]
+            self._running -= 1
+            stats['running'] -= 1
+            stats['completed'] += 1
+            stats['service_seconds'] = 0.9 * stats['service_seconds'] + 0.1 * (self.clock() - started)
+            self._dispatch()
+
+    def describe(self) -> Dict:
+        """Per-class queue and rejection metrics"""
+        with self._condition:
+            classes = {}
+            for name, stats in self._stats.items():
+                admitted = stats['admitted']
+                classes[name] = {
+                    **self.classes[name],
+                    'running': stats['running'],
+                    'queued': stats['queued'],
+                    'admitted': admitted,
+                    'completed': stats['completed'],
+                    'rejected_queue_full': stats['rejected_queue_full'],
+                    'rejected_timeout': stats['rejected_timeout'],
+                    'queue_wait_avg_ms': round(1000 * stats['queue_wait_total'] / admitted, 3) if admitted else 0.0,
+                    'queue_wait_max_ms': round(1000 * stats['queue_wait_max'], 3),
+                    'service_time_ms': round(1000 * stats['service_seconds'], 3)
+                }
+            return {'capacity': self.capacity, 'running': self._running, 'classes': classes}
+
+
+def create_admission_controller_from_env() -> Optional[AdmissionController]:
+    """
+    Build the admission controller configured by environment variables
+
+    ADMISSION_CONTROL=off disables it. ADMISSION_CAPACITY sets the total slots
+    (match gunicorn's --threads); ADMISSION_<CLASS>_LIMIT, _QUEUE and _TIMEOUT
+    override a class's settings, e.g. ADMISSION_BULK_LIMIT=1.
+    """
+    if os.environ.get('ADMISSION_CONTROL', 'on').lower() in ('off', '0', 'false'):
+        return None
+    classes = {name: dict(config) for name, config in DEFAULT_CLASSES.items()}
+    for name, config in classes.items():
+        for key, cast in (('limit', int), ('queue', int), ('timeout', float)):
+            value = os.environ.get(f'ADMISSION_{name.upper()}_{key.upper()}')
+            if value is not None:
+                config[key] = cast(value)
+    return AdmissionController(int(os.environ.get('ADMISSION_CAPACITY', 8)), classes)
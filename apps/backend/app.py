@@ -7,10 +7,13 @@ QUICK START:
 2. Ensure model files are in the backend directory (best_heating_model.pkl, feature_scaler.pkl, model_info.json)
 3. Run: python app.py
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 import joblib
 import json
+import hashlib
+import math
+from collections import Counter
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -19,6 +22,24 @@ import traceback
 import os
 from feature_service import FeatureService
 from constants import SAMPLE_WEATHER_DATA, SAMPLE_BUILDING_DATA, TEST_WEATHER_DATA
+from response_format import (
+    JSON_MIMETYPE, PrecomputedResponse, UnsupportedFormatError, negotiate_format, encode_columnar
+)
+from postprocessing import postprocess_predictions, prediction_rows, summary_dict
+from inference import resolve_interval_config, predict_with_intervals, predict_contributions
+from weather_service import create_weather_cache_from_env, validate_location
+from storage import create_store_from_env
+from forecast_scheduler import BuildingRegistry, ForecastScheduler
+from district import DistrictAggregator
+from explanations import ExplanationCache, rank_importances, top_contributors
+from drift_monitor import DriftMonitor
+from dispatch import DispatchOptimizer, Plant
+from admission import ENDPOINT_CLASSES, EXEMPT_ENDPOINTS, AdmissionRejected, create_admission_controller_from_env
+from sampling_profiler import ProfilerBusy, create_profiler_from_env
+from request_decoding import (
+    WEATHER_RECORD, FieldErrors, RequestDecodeError, decode_building_data, decode_horizon, decode_json_object,
+    decode_timestamp, decode_weather, raise_for_errors
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,11 +50,55 @@ app = Flask(__name__)
 frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 CORS(app, resources={r"/api/*": {"origins": frontend_url}})
 
+# Per-class concurrency limits and priority queuing (ADMISSION_* environment variables)
+admission_controller = create_admission_controller_from_env()
+
+# On-demand stack sampling of this worker; disabled unless PROFILER_TOKEN is set
+profiler = create_profiler_from_env()
+
+@app.before_request
+def admit_request():
+    """Hold the request until its class has a free slot, or shed it with 429/503 and Retry-After."""
+    if admission_controller is None or request.method == 'OPTIONS' or request.endpoint is None:
+        return None
+    if request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    request_class = ENDPOINT_CLASSES.get(request.endpoint, 'interactive')
+    try:
+        g.admission = (request_class, admission_controller.acquire(request_class))
+    except AdmissionRejected as e:
+        logger.warning(f"Shed {request.path}: {e}")
+        response = jsonify({'error': str(e), 'request_class': e.request_class})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+@app.teardown_request
+def release_admission(error=None):
+    admitted = g.pop('admission', None)
+    if admitted is not None:
+        admission_controller.release(*admitted)
+
+# Per-hour arrays shipped in columnar responses
+COLUMNAR_FIELDS = ('demand', 'confidence_low', 'confidence_high', 'trend')
+
+# Reference columns with each row's heating degree base and scaling (see FeatureService.create_horizon_features_from_arrays)
+HEATING_DEGREE_COLUMNS = ['hdh_base_temp', 'hdh_scaling']
+
+# Metadata only changes when a model is loaded; polling clients revalidate after a minute
+METADATA_CACHE_CONTROL = 'public, max-age=60, must-revalidate'
+
 # Global variables for model and services
 model = None
 scaler = None
 feature_service = None
 model_info = None
+model_fingerprint = ''
+interval_config = None
+global_importance = []
+drift_monitor = None
+metadata_responses = {}
 
 def load_model_and_services() -> bool:
     """
@@ -42,7 +107,8 @@ def load_model_and_services() -> bool:
     Returns:
         bool: True if the model and feature services loaded successfully, False otherwise.
     """
-    global model, scaler, feature_service, model_info
+    global model, scaler, feature_service, model_info, model_fingerprint, interval_config, global_importance, drift_monitor
+    global metadata_responses
     
     try:
         # Load model and scaler
@@ -63,10 +129,29 @@ def load_model_and_services() -> bool:
         with open(info_path, 'r') as f:
             model_info = json.load(f)
         
+        # Content hash of the model file; cached horizons and explanations keyed on it expire on a reload
+        with open(model_path, 'rb') as f:
+            model_fingerprint = hashlib.sha256(f.read()).hexdigest()[:16]
+        
         # Initialize feature service
         feature_service = FeatureService()
         
+        # Decide once how prediction intervals are obtained from this model
+        interval_config = resolve_interval_config(model, model_info)
+        
+        # Global importances are ranked once here rather than on every model-info request
+        global_importance = rank_importances(model_info.get('feature_importance', {}))
+        
+        # Live input distributions versus the training statistics in scaler_info
+        drift_monitor = DriftMonitor.from_model_info(model_info)
+        if drift_monitor is not None:
+            feature_service.default_listener = drift_monitor.record_defaults
+        
+        # Metadata routes serve these bytes until the next model load
+        metadata_responses = build_metadata_responses()
+        
         logger.info(f"Model loaded successfully: {model_info['model_type']}")
+        logger.info(f"Prediction intervals: {interval_config['method']}")
         logger.info(f"Features: {model_info['feature_count']}")
         logger.info(f"Performance: MAE {model_info['performance']['mae']:.3f} kW")
         
@@ -77,9 +162,278 @@ def load_model_and_services() -> bool:
         traceback.print_exc()
         return False
 
+def build_metadata_responses() -> dict:
+    """
+    Serialize and compress the model-info, features and sample responses for the loaded model.
+    
+    Returns:
+        dict: Route name -> PrecomputedResponse.
+    """
+    model_info_body = {
+        'model_type': model_info['model_type'],
+        'training_date': model_info['training_date'],
+        'total_features': model_info['feature_count'],
+        'hyperparameters': {
+            'iterations': 200,
+            'depth': 8,
+            'learning_rate': 0.05,
+            'l2_leaf_reg': 1,
+            'border_count': 128
+        },
+        # Top features in the format expected by frontend
+        'top_features': global_importance[:10],
+        'performance': {
+            'test_mape': 12.3,  # Mock MAPE value
+            'test_r2': 0.85,    # Mock R² value
+            'test_rmse': model_info['performance']['rmse'],
+            'test_mae': model_info['performance']['mae']
+        },
+        'confidence': {
+            'rating': 'high',
+            'score': 0.85,
+            'explanation': 'Model shows strong predictive performance with R² > 0.8'
+        },
+        'data_characteristics': {
+            'zero_percentage': 5.2,
+            'small_values_warning': 'Low percentage of zero values indicates good data quality'
+        }
+    }
+    
+    features_body = {
+        'total_features': model_info['feature_count'],
+        'features': model_info['feature_names']
+    }
+    
+    # Sample features at the top of the load hour, so workers loaded within the hour agree
+    features = feature_service.create_single_prediction_features(
+        SAMPLE_WEATHER_DATA,
+        datetime.now().replace(minute=0, second=0, microsecond=0),
+        SAMPLE_BUILDING_DATA
+    )
+    sample_body = {
+        'sample_data': {col: float(features[col].iloc[0]) for col in features.columns},
+        'note': 'Sample data for testing the API'
+    }
+    
+    return {
+        name: PrecomputedResponse(body, METADATA_CACHE_CONTROL)
+        for name, body in (('model_info', model_info_body), ('features', features_body), ('sample', sample_body))
+    }
+
 # Load model and services on startup
 load_model_and_services()
 
+# Shared per-location forecast cache (independent of the model, so it survives reloads)
+weather_cache = create_weather_cache_from_env()
+
+# Optional time-series store for predictions and actuals (PREDICTION_STORE_URL)
+prediction_store = create_store_from_env()
+
+def store_predictions(building_id, processed: dict, index: int = None):
+    """
+    Queue post-processed predictions for persistence when a store is configured.
+    
+    Writes happen on the store's background thread, so this only builds row tuples.
+    """
+    if prediction_store is None or not building_id:
+        return
+    select = (lambda key: processed[key]) if index is None else (lambda key: processed[key][index])
+    prediction_store.record_predictions(
+        str(building_id), processed['timestamps'], select('demand'),
+        select('confidence_low'), select('confidence_high'), model_info['model_type']
+    )
+
+class UnknownLocationError(LookupError):
+    """Raised when a request refers to a location with no cached or fetchable forecast"""
+    status = 404
+
+class ExpiredForecastError(UnknownLocationError):
+    """Raised when a location's forecast ends before the requested hour and the provider has nothing newer"""
+    status = 503
+
+def resolve_weather(payload: dict, horizon: int, window_cache: dict = None) -> tuple:
+    """
+    Get current weather and forecast either from the payload or from the shared weather cache.
+    
+    A payload with a 'location' and no embedded 'weatherForecast' is served from the cache;
+    window_cache lets a batch request slice each location only once.
+    
+    Returns:
+        tuple: (current weather dict, forecast as sent: hourly dicts or columnar lists).
+    """
+    location = payload.get('location')
+    if not location or payload.get('weatherForecast'):
+        return payload.get('weatherData', {}), payload.get('weatherForecast') or []
+    
+    if window_cache is not None and location in window_cache:
+        current, forecast = window_cache[location]
+    else:
+        try:
+            window = weather_cache.window(location, datetime.now(), horizon)
+        except ValueError:
+            window = None
+        if window is None and weather_cache.describe(location) is not None:
+            raise ExpiredForecastError(f"Weather forecast for location {location} has expired")
+        if window is None:
+            raise UnknownLocationError(f"No weather forecast available for location: {location}")
+        current, forecast = window
+        if window_cache is not None:
+            window_cache[location] = window
+    # Explicit current conditions from the client still take precedence
+    return payload.get('weatherData') or current, list(forecast)
+
+def run_model(features: pd.DataFrame) -> dict:
+    """
+    Validate, scale and score a feature frame with one model call.
+    
+    Args:
+        features: Engineered features (one row per prediction).
+    
+    Returns:
+        dict: Point predictions, interval bounds and the interval method (see inference.predict_with_intervals).
+    """
+    model_features = feature_service.validate_features(features, model_info['feature_names'])
+    features_scaled = scaler.transform(model_features)
+    if drift_monitor is not None:
+        # Score heating degrees against the reference of the buildings actually served
+        heating_degree = features[HEATING_DEGREE_COLUMNS].to_numpy() if 'hdh_scaling' in features else None
+        drift_monitor.update(features_scaled, heating_degree)
+    return predict_with_intervals(model, features_scaled, interval_config)
+
+def build_horizon_features(buildings: list, horizon: int, default_location: str = None,
+                           skip_unknown: bool = False, start: datetime = None) -> tuple:
+    """
+    Resolve weather and engineer stacked horizon features for many buildings.
+    
+    Args:
+        buildings: Building entries ('buildingId', 'buildingData' and either weather fields or 'location').
+        horizon: Hours per building.
+        default_location: Location used by entries that give neither weather nor their own location.
+        skip_unknown: Drop buildings whose location has no forecast instead of raising.
+        start: First prediction time (defaults to now).
+    
+    Returns:
+        tuple: (buildings actually featurized, feature frame with horizon rows per building or None, start).
+    """
+    # Each location's forecast is sliced once for the whole batch
+    window_cache = {}
+    errors, defaulted = FieldErrors(), Counter()
+    scored, weather, building_params = [], [], []
+    for i, building in enumerate(buildings):
+        if type(building) is not dict:
+            errors.add(f'buildings[{i}]', 'must be an object')
+            continue
+        try:
+            current, forecast = resolve_weather({'location': default_location, **building}, horizon, window_cache)
+        except UnknownLocationError:
+            if not skip_unknown:
+                raise
+            logger.warning(f"Skipping building {building.get('buildingId')}: no forecast for {building.get('location')}")
+            continue
+        weather.append(decode_weather(current, forecast, horizon, f'buildings[{i}]', errors, defaulted))
+        building_params.append(decode_building_data(building.get('buildingData'), f'buildings[{i}].buildingData', errors))
+        scored.append(building)
+    raise_for_errors(errors)
+    
+    start = start or datetime.now()
+    if not scored:
+        return scored, None, start
+    
+    # Build every building's horizon in one grouped pass so the model runs once
+    features = feature_service.create_decoded_features(np.stack(weather), start, np.stack(building_params), defaulted)
+    return scored, features, start
+
+def predict_building_horizons(buildings: list, horizon: int, default_location: str = None,
+                              skip_unknown: bool = False) -> dict:
+    """
+    Score the horizons of many buildings with a single model call.
+    
+    Args:
+        buildings: Building entries ('buildingId', 'buildingData' and either weather fields or 'location').
+        horizon: Hours per building.
+        default_location: Location used by entries that give neither weather nor their own location.
+        skip_unknown: Drop buildings whose location has no forecast instead of raising.
+    
+    Returns:
+        dict: 'demand', 'confidence_low' and 'confidence_high' arrays shaped (buildings, horizon),
+        'building_ids' in row order, 'start' and 'interval_method'.
+    """
+    scored, features, start = build_horizon_features(buildings, horizon, default_location, skip_unknown)
+    if not scored:
+        empty = np.empty((0, horizon))
+        return {'demand': empty, 'confidence_low': empty, 'confidence_high': empty,
+                'building_ids': [], 'start': start, 'interval_method': interval_config['method']}
+    
+    output = run_model(features)
+    
+    shape = (len(scored), horizon)
+    return {
+        'demand': output['demand'].reshape(shape),
+        'confidence_low': output['confidence_low'].reshape(shape),
+        'confidence_high': output['confidence_high'].reshape(shape),
+        'building_ids': [building.get('buildingId', str(i)) for i, building in enumerate(scored)],
+        'start': start,
+        'interval_method': output['interval_method']
+    }
+
+def explain_building_horizons(buildings: list, horizon: int, start: datetime = None) -> dict:
+    """
+    Compute SHAP contributions for many buildings' horizons with one native TreeSHAP call.
+    
+    Returns:
+        dict: 'contributions' shaped (buildings, horizon, features), 'expected_value' shaped
+        (buildings, horizon) and 'building_ids' in row order.
+    """
+    scored, features, _ = build_horizon_features(buildings, horizon, start=start)
+    model_features = feature_service.validate_features(features, model_info['feature_names'])
+    contributions, expected_value = predict_contributions(model, scaler.transform(model_features))
+    return {
+        'contributions': contributions.reshape(len(scored), horizon, -1),
+        'expected_value': expected_value.reshape(len(scored), horizon),
+        'building_ids': [building['buildingId'] for building in scored]
+    }
+
+def compute_scheduled_forecasts(buildings: list, horizon: int) -> dict:
+    """Batch-score registered buildings for the scheduler and persist the results."""
+    batch = predict_building_horizons(buildings, horizon, skip_unknown=True)
+    if prediction_store is not None:
+        timestamps = np.datetime64(batch['start'], 'us') + np.arange(horizon) * np.timedelta64(1, 'h')
+        for i, building_id in enumerate(batch['building_ids']):
+            prediction_store.record_predictions(
+                building_id, timestamps, batch['demand'][i],
+                batch['confidence_low'][i], batch['confidence_high'][i], model_info['model_type']
+            )
+    return batch
+
+# Registered buildings get rolling 48h forecasts precomputed off the request path
+building_registry = BuildingRegistry()
+forecast_scheduler = ForecastScheduler(building_registry, compute_scheduled_forecasts, horizon=48)
+if os.environ.get('BUILDING_REGISTRY_FILE'):
+    logger.info(f"Registered {building_registry.load_file(os.environ['BUILDING_REGISTRY_FILE'])} buildings from roster")
+    forecast_scheduler.start()
+
+def weather_version(location: str):
+    """Version token for a location's cached forecast (refreshing it first if expired)."""
+    if not location:
+        return None
+    try:
+        weather_cache.get(location)
+    except ValueError:
+        return None
+    return (weather_cache.describe(location) or {}).get('fetched_at')
+
+# Per-building horizons and per-node partial sums for district roll-ups
+district_aggregator = DistrictAggregator(
+    lambda buildings, horizon: predict_building_horizons(buildings, horizon, skip_unknown=True),
+    weather_version
+)
+
+# SHAP blocks keyed like cached predictions, so repeated explanations skip TreeSHAP entirely
+explanation_cache = ExplanationCache(explain_building_horizons, district_aggregator.building_signature)
+
+# Keeps each plant's last schedule so re-optimizations on forecast refresh are warm-started
+dispatch_optimizer = DispatchOptimizer()
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
@@ -103,6 +457,8 @@ def health_check():
                 'features': model_info['feature_count'],
                 'mae': model_info['performance']['mae']
             }
+        if prediction_store is not None:
+            status['prediction_store'] = dict(prediction_store.stats)
         
         return jsonify(status)
     
@@ -123,48 +479,11 @@ def get_model_info():
         tuple: JSON dictionary containing model versions, hyperparameter defaults, and top feature importance, with HTTP status.
     """
     try:
-        if not model_info:
+        if 'model_info' not in metadata_responses:
             return jsonify({'error': 'Model not loaded'}), 500
         
-        # Convert feature importance to top features format expected by frontend
-        sorted_features = sorted(
-            model_info['feature_importance'].items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        top_features = [
-            {'feature': feature, 'importance': importance}
-            for feature, importance in sorted_features[:10]  # Top 10 features
-        ]
-        
-        return jsonify({
-            'model_type': model_info['model_type'],
-            'training_date': model_info['training_date'],
-            'total_features': model_info['feature_count'],
-            'hyperparameters': {
-                'iterations': 200,
-                'depth': 8,
-                'learning_rate': 0.05,
-                'l2_leaf_reg': 1,
-                'border_count': 128
-            },
-            'top_features': top_features,
-            'performance': {
-                'test_mape': 12.3,  # Mock MAPE value
-                'test_r2': 0.85,    # Mock R² value
-                'test_rmse': model_info['performance']['rmse'],
-                'test_mae': model_info['performance']['mae']
-            },
-            'confidence': {
-                'rating': 'high',
-                'score': 0.85,
-                'explanation': 'Model shows strong predictive performance with R² > 0.8'
-            },
-            'data_characteristics': {
-                'zero_percentage': 5.2,
-                'small_values_warning': 'Low percentage of zero values indicates good data quality'
-            }
-        })
+        # Built once per loaded model; conditional requests get 304
+        return metadata_responses['model_info'].respond(request)
     
     except Exception as e:
         logger.error(f"Error getting model info: {e}")
@@ -175,50 +494,42 @@ def predict_single():
     """
     Make a single heat demand prediction using provided weather and building conditions.
     
-    Expects JSON payload with 'weatherData' and optionally 'buildingData' and 'timestamp'.
+    Expects JSON payload with 'weatherData' and optionally 'buildingData', 'timestamp' and 'buildingId'
+    (predictions for identified buildings are persisted when a prediction store is configured).
+    Columnar JSON, MessagePack or Arrow responses can be requested via the Accept header or ?format=.
     
     Returns:
         tuple: JSON response containing the 'heat_demand_kw' prediction and HTTP status.
     """
     try:
-        data = request.json
+        response_mimetype = negotiate_format(request)
+        data = decode_json_object(request)
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Extract weather data and building data
-        weather_data = data.get('weatherData', {})
-        building_data = data.get('buildingData', {})
-        timestamp_str = data.get('timestamp')
+        # Decode weather, building data and timestamp into typed arrays (current time if no timestamp)
+        errors, defaulted = FieldErrors(), Counter()
+        weather = decode_weather(data.get('weatherData'), None, 1, '', errors, defaulted)
+        building_params = decode_building_data(data.get('buildingData'), 'buildingData', errors)
+        timestamp = decode_timestamp(data.get('timestamp'), 'timestamp', errors) or datetime.now()
+        raise_for_errors(errors)
+        building_data = data.get('buildingData') or {}
         
-        # Parse timestamp or use current time
-        if timestamp_str:
-            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-        else:
-            timestamp = datetime.now()
-        
-        logger.info(f"Making prediction for {timestamp} with temp {weather_data.get('temperature', 'N/A')}°C")
+        logger.info(f"Making prediction for {timestamp} with temp {weather[0, 0]}°C")
         logger.info(f"Building data: floor_area={building_data.get('floorArea', 'N/A')}, insulation={building_data.get('insulationLevel', 'N/A')}")
         
-        # Create features
-        features = feature_service.create_single_prediction_features(weather_data, timestamp, building_data)
-        
-        # Validate features match model expectations
-        features = feature_service.validate_features(features, model_info['feature_names'])
-        
-        # Scale features
-        features_scaled = scaler.transform(features)
-        
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
-        
-        # Calculate confidence interval (±5% based on model uncertainty)
-        confidence_margin = prediction * 0.05
-        confidence_low = max(0, prediction - confidence_margin)
-        confidence_high = prediction + confidence_margin
+        # Create features at the same naive hour that is stored below
+        features = feature_service.create_decoded_features(
+            weather[None], timestamp, building_params[None], defaulted
+        )
+
+        # Validate, scale and predict with the model's own interval in one call
+        output = run_model(features)
+        prediction = output['demand'][0]
         
         # Determine trend (simplified - based on temperature vs base temp)
-        outdoor_temp = weather_data.get('temperature', 15)
+        outdoor_temp = weather[0, 0]
         if outdoor_temp < 10:
             trend = 'increasing'
         elif outdoor_temp > 20:
@@ -229,14 +540,33 @@ def predict_single():
         result = {
             'heat_demand_kw': float(prediction),
             'predictions': [float(prediction)],  # Single prediction in array format
-            'input_features': len(features.columns),
+            'confidence': [float(output['confidence_low'][0]), float(output['confidence_high'][0])],
+            'interval_method': output['interval_method'],
+            'input_features': len(model_info['feature_names']),
             'timestamp': timestamp.isoformat()
         }
         
         logger.info(f"Prediction: {prediction:.3f} kW for {outdoor_temp}°C")
         
+        if prediction_store is not None and data.get('buildingId'):
+            prediction_store.record_predictions(
+                str(data['buildingId']), [timestamp], output['demand'],
+                output['confidence_low'], output['confidence_high'], model_info['model_type']
+            )
+        
+        if response_mimetype != JSON_MIMETYPE:
+            return encode_columnar(
+                response_mimetype, timestamp, 3600,
+                {key: output[key] for key in ('demand', 'confidence_low', 'confidence_high')},
+                {'input_features': len(model_info['feature_names']), 'interval_method': output['interval_method']}
+            )
+        
         return jsonify(result)
     
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
     except Exception as e:
         logger.error(f"Error making prediction: {e}")
         return jsonify({'error': 'Internal server error during prediction sequence'}), 500
@@ -247,98 +577,759 @@ def predict_horizon():
     Make predictions for a multi-hour horizon (typically 24 or 48 hours).
     
     Expects a JSON payload containing 'weatherData' (current), 'weatherForecast' (array of future conditions),
-    and optionally 'buildingData' and 'horizon' (int).
+    and optionally 'buildingData' and 'horizon' (int). A 'location' may be sent instead of the weather
+    fields to use the server-side forecast cache, and a 'buildingId' to persist the predictions.
+    Columnar JSON, MessagePack or Arrow responses can be requested via the Accept header or ?format=.
     
     Returns:
         tuple: JSON array of predictions across the horizon matching timestamps, and HTTP status.
     """
     try:
-        data = request.json
+        response_mimetype = negotiate_format(request)
+        data = decode_json_object(request)
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         # Extract parameters
-        weather_data = data.get('weatherData', {})
-        building_data = data.get('buildingData', {})
-        horizon = data.get('horizon', 24)
-        weather_forecast = data.get('weatherForecast', [])
+        errors, defaulted = FieldErrors(), Counter()
+        horizon = decode_horizon(data.get('horizon'), errors)
+        building_params = decode_building_data(data.get('buildingData'), 'buildingData', errors)
+        raise_for_errors(errors)
+        building_data = data.get('buildingData') or {}
         
-        if horizon not in [24, 48]:
-            return jsonify({'error': 'Horizon must be 24 or 48 hours'}), 400
+        # Forecast comes from the payload or, given a 'location', from the shared cache
+        weather_data, weather_forecast = resolve_weather(data, horizon)
+        weather = decode_weather(weather_data, weather_forecast, horizon, '', errors, defaulted)
+        raise_for_errors(errors)
         
         logger.info(f"Making {horizon}-hour prediction with {len(weather_forecast)} forecast points")
         logger.info(f"Building data: floor_area={building_data.get('floorArea', 'N/A')}, insulation={building_data.get('insulationLevel', 'N/A')}")
         
         # Create features for the entire horizon
-        features = feature_service.create_horizon_prediction_features(
-            weather_data, weather_forecast, horizon, building_data
-        )
-        
-        # Validate features
-        model_features = feature_service.validate_features(
-            features, model_info['feature_names']
-        )
-        
-        # Scale features
-        features_scaled = scaler.transform(model_features)
-        
-        # Make predictions
-        predictions = model.predict(features_scaled)
-        
-        # Create response with predictions for each hour
-        result_predictions = []
         base_time = datetime.now()
+        features = feature_service.create_decoded_features(weather[None], base_time, building_params[None], defaulted)
+
+        # Validate, scale and predict (with intervals) in one model call
+        output = run_model(features)
+        predictions = output['demand']
         
-        for i, prediction in enumerate(predictions):
-            timestamp = base_time + timedelta(hours=i)
-            
-            # Calculate confidence interval
-            confidence_margin = prediction * 0.05
-            confidence_low = max(0, prediction - confidence_margin)
-            confidence_high = prediction + confidence_margin
-            
-            # Determine trend (compare with previous prediction)
-            if i == 0:
-                trend = 'stable'
-            else:
-                prev_pred = predictions[i-1]
-                if prediction > prev_pred * 1.02:
-                    trend = 'increasing'
-                elif prediction < prev_pred * 0.98:
-                    trend = 'decreasing'
-                else:
-                    trend = 'stable'
-            
-            result_predictions.append({
-                'timestamp': timestamp.isoformat(),
-                'demand': float(prediction),
-                'confidence': [float(confidence_low), float(confidence_high)],
-                'trend': trend
-            })
+        # Timestamps, confidence bands, trends and summary in one vectorized pass
+        processed = postprocess_predictions(
+            predictions, base_time,
+            confidence_low=output['confidence_low'], confidence_high=output['confidence_high']
+        )
         
-        result = {
-            'predictions': result_predictions,
+        metadata = {
             'horizon_hours': horizon,
-            'total_predictions': len(result_predictions),
+            'total_predictions': len(predictions),
             'model_version': model_info['model_type'],
+            'interval_method': output['interval_method'],
             'generated_at': datetime.now().isoformat(),
-            'summary': {
-                'min_demand': float(np.min(predictions)),
-                'max_demand': float(np.max(predictions)),
-                'avg_demand': float(np.mean(predictions)),
-                'total_demand': float(np.sum(predictions))
-            }
+            'summary': summary_dict(processed)
         }
         
+        store_predictions(data.get('buildingId'), processed)
+        
+        if response_mimetype != JSON_MIMETYPE:
+            logger.info(f"Encoding {len(predictions)} predictions as {response_mimetype}")
+            return encode_columnar(
+                response_mimetype, base_time, 3600,
+                {key: processed[key] for key in COLUMNAR_FIELDS},
+                metadata
+            )
+        
+        result = {'predictions': prediction_rows(processed), **metadata}
+        
         logger.info(f"Generated {len(predictions)} predictions, range: {np.min(predictions):.3f} - {np.max(predictions):.3f} kW")
         
         return jsonify(result)
     
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except UnknownLocationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
     except Exception as e:
         logger.error(f"Error making horizon prediction: {e}")
         return jsonify({'error': 'Internal server error during horizon prediction'}), 500
 
+@app.route('/api/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Make horizon predictions for many buildings with a single model call.
+    
+    Expects a JSON payload containing 'buildings' (list of objects with 'buildingId', 'weatherData',
+    and optionally 'weatherForecast' and 'buildingData') and optionally 'horizon' (int).
+    Buildings may give a 'location' (or inherit a top-level one) instead of embedding weather.
+    Columnar responses are flattened row-major with shape [buildings, horizon].
+    
+    Returns:
+        tuple: JSON object with one horizon result per building, and HTTP status.
+    """
+    try:
+        response_mimetype = negotiate_format(request)
+        data = decode_json_object(request)
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        errors = FieldErrors()
+        buildings = data.get('buildings') or []
+        horizon = decode_horizon(data.get('horizon'), errors)
+        if type(buildings) is not list:
+            errors.add('buildings', 'must be a list')
+        raise_for_errors(errors)
+        if not buildings:
+            return jsonify({'error': 'No buildings provided'}), 400
+
+        logger.info(f"Making {horizon}-hour batch prediction for {len(buildings)} buildings")
+        
+        batch = predict_building_horizons(buildings, horizon, data.get('location'))
+        predictions = batch['demand']
+        base_time = batch['start']
+        processed = postprocess_predictions(
+            predictions, base_time,
+            confidence_low=batch['confidence_low'], confidence_high=batch['confidence_high']
+        )
+        building_ids = [building.get('buildingId', str(i)) for i, building in enumerate(buildings)]
+        for i, building in enumerate(buildings):
+            store_predictions(building.get('buildingId'), processed, i)
+        
+        metadata = {
+            'horizon_hours': horizon,
+            'total_buildings': len(buildings),
+            'total_predictions': int(predictions.size),
+            'model_version': model_info['model_type'],
+            'interval_method': batch['interval_method'],
+            'generated_at': datetime.now().isoformat()
+        }
+        
+        if response_mimetype != JSON_MIMETYPE:
+            return encode_columnar(
+                response_mimetype, base_time, 3600,
+                {key: processed[key].ravel() for key in COLUMNAR_FIELDS},
+                {**metadata, 'building_ids': building_ids, 'shape': list(predictions.shape)}
+            )
+        
+        results = [
+            {
+                'buildingId': building_id,
+                'predictions': prediction_rows(processed, i),
+                'summary': summary_dict(processed, i)
+            }
+            for i, building_id in enumerate(building_ids)
+        ]
+        
+        return jsonify({'results': results, **metadata})
+    
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except UnknownLocationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except Exception as e:
+        logger.error(f"Error making batch prediction: {e}")
+        return jsonify({'error': 'Internal server error during batch prediction'}), 500
+
+@app.route('/api/weather/<location>', methods=['GET'])
+def get_weather(location):
+    """
+    Get the cached hourly forecast for a location, refreshing it from the provider if expired.
+    
+    Returns:
+        tuple: JSON object with cache metadata and the hourly forecast, and HTTP status.
+    """
+    try:
+        frame = weather_cache.get(location)
+        if frame is None:
+            return jsonify({'error': f'No weather forecast available for location: {location}'}), 404
+        
+        forecast = frame.reset_index()
+        forecast['timestamp'] = forecast['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        
+        return jsonify({
+            **weather_cache.describe(location),
+            'forecast': forecast.astype(object).where(forecast.notna(), None).to_dict('records')
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting weather for {location}: {e}")
+        return jsonify({'error': 'Internal server error while fetching weather'}), 500
+
+@app.route('/api/weather/<location>', methods=['PUT'])
+def ingest_weather(location):
+    """
+    Push an hourly forecast for a location into the shared weather cache.
+    
+    Expects a JSON payload with 'forecast' (list of hourly weather objects, optionally with 'timestamp').
+    
+    Returns:
+        tuple: JSON metadata for the stored forecast, and HTTP status.
+    """
+    try:
+        data = decode_json_object(request) or {}
+        
+        errors = FieldErrors()
+        forecast = data.get('forecast')
+        if type(forecast) is not list or not forecast:
+            errors.add('forecast', 'must be a non-empty list')
+        else:
+            WEATHER_RECORD.decode_rows(forecast, 'forecast', errors)
+            raise_for_errors(errors)
+            for i, point in enumerate(forecast):
+                decode_timestamp(point.get('timestamp'), f'forecast[{i}].timestamp', errors)
+        raise_for_errors(errors)
+        
+        stored = weather_cache.ingest(location, forecast)
+        # New forecast data makes precomputed horizons for this site outdated
+        forecast_scheduler.trigger()
+        
+        return jsonify(stored)
+    
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error ingesting weather for {location}: {e}")
+        return jsonify({'error': 'Internal server error while ingesting weather'}), 500
+
+@app.route('/api/actuals', methods=['POST'])
+def record_actuals():
+    """
+    Record observed heat demand for a building.
+    
+    Expects a JSON payload with 'buildingId' and 'observations' (list of {'timestamp', 'demand'}).
+    
+    Returns:
+        tuple: JSON acknowledgement with the number of queued observations, and HTTP status.
+    """
+    try:
+        if prediction_store is None:
+            return jsonify({'error': 'Prediction store not configured'}), 503
+        
+        data = decode_json_object(request)
+        
+        if not data or not data.get('buildingId') or not data.get('observations'):
+            return jsonify({'error': 'buildingId and observations required'}), 400
+        
+        errors = FieldErrors()
+        if type(data['buildingId']) not in (str, int):
+            errors.add('buildingId', 'must be a string')
+        observations = data['observations']
+        if type(observations) is not list:
+            errors.add('observations', 'must be a list')
+            observations = []
+        timestamps, demand = [], []
+        for i, observation in enumerate(observations):
+            path = f'observations[{i}]'
+            if type(observation) is not dict:
+                errors.add(path, 'must be an object')
+                continue
+            timestamp = decode_timestamp(observation.get('timestamp'), f'{path}.timestamp', errors)
+            if observation.get('timestamp') is None:
+                errors.add(f'{path}.timestamp', 'is required')
+            value = observation.get('demand')
+            if type(value) not in (int, float) or not math.isfinite(value):
+                errors.add(f'{path}.demand', 'must be a number')
+            timestamps.append(timestamp)
+            demand.append(value)
+        raise_for_errors(errors)
+        
+        prediction_store.record_actuals(str(data['buildingId']), timestamps, np.asarray(demand, dtype=float))
+        
+        return jsonify({'queued': len(observations)}), 202
+    
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except Exception as e:
+        logger.error(f"Error recording actuals: {e}")
+        return jsonify({'error': 'Internal server error while recording actuals'}), 500
+
+@app.route('/api/history/<building_id>', methods=['GET'])
+def get_history(building_id):
+    """
+    Get stored predictions and actuals for a building, aggregated per hour or day.
+    
+    Query parameters: 'start' and 'end' (ISO timestamps, default last 7 days) and 'resolution' ('hour' or 'day').
+    
+    Returns:
+        tuple: JSON object with time buckets of predicted and observed demand, and HTTP status.
+    """
+    try:
+        if prediction_store is None:
+            return jsonify({'error': 'Prediction store not configured'}), 503
+        
+        end = request.args.get('end') or datetime.now().isoformat()
+        start = request.args.get('start') or (datetime.fromisoformat(end) - timedelta(days=7)).isoformat()
+        resolution = request.args.get('resolution', 'hour')
+        
+        buckets = prediction_store.aggregate(building_id, start, end, resolution)
+        
+        return jsonify({
+            'building_id': building_id,
+            'start': start,
+            'end': end,
+            'resolution': resolution,
+            'buckets': buckets
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting history for {building_id}: {e}")
+        return jsonify({'error': 'Internal server error while fetching history'}), 500
+
+@app.route('/api/buildings', methods=['POST'])
+def register_building():
+    """
+    Register a building for scheduled forecast precomputation.
+    
+    Expects a JSON payload with 'buildingId', 'location' (weather cache key) and optionally 'buildingData'.
+    
+    Returns:
+        tuple: JSON registry entry, and HTTP status.
+    """
+    try:
+        data = decode_json_object(request)
+        
+        if not data or not data.get('buildingId') or not data.get('location'):
+            return jsonify({'error': 'buildingId and location required'}), 400
+        # Reject bad building data now rather than on every scheduled refresh
+        errors = FieldErrors()
+        if type(data['buildingId']) not in (str, int):
+            errors.add('buildingId', 'must be a string')
+        try:
+            validate_location(data['location'])
+        except ValueError:
+            errors.add('location', "must contain only letters, digits, '.', '_' or '-'")
+        decode_building_data(data.get('buildingData'), 'buildingData', errors)
+        raise_for_errors(errors)
+        
+        entry = building_registry.register(str(data['buildingId']), data['location'], data.get('buildingData'))
+        forecast_scheduler.start()
+        forecast_scheduler.trigger()
+        
+        return jsonify(entry), 201
+    
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except Exception as e:
+        logger.error(f"Error registering building: {e}")
+        return jsonify({'error': 'Internal server error while registering building'}), 500
+
+@app.route('/api/buildings', methods=['GET'])
+def list_buildings():
+    """
+    List registered buildings and the status of the precomputed forecast cache.
+    
+    Returns:
+        tuple: JSON object with registry entries and cache metadata, and HTTP status.
+    """
+    return jsonify({
+        'buildings': building_registry.snapshot(),
+        'forecast_cache': forecast_scheduler.describe()
+    })
+
+@app.route('/api/buildings/<building_id>', methods=['DELETE'])
+def remove_building(building_id):
+    """
+    Stop precomputing forecasts for a building.
+    
+    Returns:
+        tuple: Empty JSON object, and HTTP status (404 if the building is not registered).
+    """
+    if not building_registry.remove(building_id):
+        return jsonify({'error': f'Building not registered: {building_id}'}), 404
+    return jsonify({}), 200
+
+@app.route('/api/forecast/<building_id>', methods=['GET'])
+def get_forecast(building_id):
+    """
+    Serve the precomputed rolling forecast for a registered building.
+    
+    Query parameters: 'horizon' (24 or 48, default 24). Supports the same response formats as /api/predict-horizon.
+    
+    Returns:
+        tuple: JSON horizon result with cache version and freshness metadata, and HTTP status.
+    """
+    try:
+        response_mimetype = negotiate_format(request)
+        horizon = request.args.get('horizon', 24, type=int)
+        
+        if horizon not in [24, 48]:
+            return jsonify({'error': 'Horizon must be 24 or 48 hours'}), 400
+        if building_registry.get(building_id) is None:
+            return jsonify({'error': f'Building not registered: {building_id}'}), 404
+        
+        cached = forecast_scheduler.lookup(building_id, horizon)
+        if cached is None:
+            forecast_scheduler.trigger()
+            response = jsonify({'error': 'Forecast not computed yet'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        processed, index = cached['processed'], cached['index']
+        metadata = {
+            'buildingId': building_id,
+            'horizon_hours': horizon,
+            'total_predictions': horizon,
+            'model_version': model_info['model_type'],
+            'interval_method': cached['interval_method'],
+            'generated_at': cached['generated_at'],
+            'cache_version': cached['version'],
+            'age_seconds': cached['age_seconds'],
+            'stale': cached['stale'],
+            'summary': summary_dict(processed, index)
+        }
+        
+        if response_mimetype != JSON_MIMETYPE:
+            return encode_columnar(
+                response_mimetype, processed['timestamps'][0].astype(datetime), 3600,
+                {key: processed[key][index] for key in COLUMNAR_FIELDS},
+                metadata
+            )
+        
+        return jsonify({'predictions': prediction_rows(processed, index), **metadata})
+    
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except Exception as e:
+        logger.error(f"Error serving forecast for {building_id}: {e}")
+        return jsonify({'error': 'Internal server error while serving forecast'}), 500
+
+@app.route('/api/district/aggregate', methods=['POST'])
+def aggregate_district():
+    """
+    Forecast total load for a district heating network.
+    
+    Expects a JSON payload with 'district' (tree of nodes with 'id' and 'children'; leaves are buildings with
+    'buildingId', 'location' or weather fields, and optionally 'buildingData'), optionally 'horizon' (int)
+    and 'rootOnly' (bool). Only buildings whose inputs changed are re-scored, and only nodes on their
+    path to the root are re-summed.
+    
+    Returns:
+        tuple: JSON object with aggregated demand per node, and HTTP status.
+    """
+    try:
+        data = decode_json_object(request)
+        
+        if not data or not data.get('district'):
+            return jsonify({'error': 'District definition required'}), 400
+        
+        errors = FieldErrors()
+        horizon = decode_horizon(data.get('horizon'), errors)
+        raise_for_errors(errors)
+        
+        result = district_aggregator.aggregate(data['district'], horizon, model_fingerprint)
+        node_ids = [result['root']] if data.get('rootOnly') else result['order']
+        
+        nodes = {}
+        for node_id in node_ids:
+            node = result['nodes'][node_id]
+            nodes[node_id] = {
+                'parent': node['parent'],
+                'buildings': node['buildings'],
+                'demand': node['demand'].tolist(),
+                'confidence_low': node['confidence_low'].tolist(),
+                'confidence_high': node['confidence_high'].tolist(),
+                'peak_demand': float(node['demand'].max()),
+                'total_demand': float(node['demand'].sum())
+            }
+        
+        start = datetime.now().replace(minute=0, second=0, microsecond=0)
+        return jsonify({
+            'district': result['root'],
+            'horizon_hours': horizon,
+            'timestamps': [(start + timedelta(hours=h)).isoformat() for h in range(horizon)],
+            'nodes': nodes,
+            'missing_buildings': result['missing_buildings'],
+            'recomputed': result['recomputed'],
+            'model_version': model_info['model_type'],
+            'generated_at': datetime.now().isoformat()
+        })
+    
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error aggregating district: {e}")
+        return jsonify({'error': 'Internal server error during district aggregation'}), 500
+
+@app.route('/api/dispatch', methods=['POST'])
+def optimize_dispatch():
+    """
+    Schedule boilers, CHP units and thermal storage against a demand forecast at least cost.
+    
+    Expects a JSON payload with 'plant' ('units' with 'id', 'type', 'capacityKw', 'efficiency', 'fuelCost'
+    and, for CHP, 'powerToHeat'; optional 'storage' and 'storageLevels') and one demand source: 'demand'
+    (hourly kW), 'buildings' (as for /api/predict-batch) or 'district' (as for /api/district/aggregate).
+    Optional: 'plantId' (warm starts reuse that plant's previous schedule), 'horizon', 'start',
+    'electricityPrice' (per kWh, number or hourly list), 'demandSeries' ('demand' or 'confidence_high'
+    to plan for the upper band) and 'warmStart' (bool).
+    
+    Returns:
+        tuple: JSON hourly setpoints per unit, storage flows and levels, costs, and HTTP status.
+    """
+    try:
+        data = decode_json_object(request)
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        errors = FieldErrors()
+        horizon = decode_horizon(data.get('horizon'), errors)
+        series = data.get('demandSeries', 'demand')
+        if series not in ('demand', 'confidence_high'):
+            errors.add('demandSeries', "must be 'demand' or 'confidence_high'")
+        start = decode_timestamp(data.get('start'), 'start', errors)
+        raise_for_errors(errors)
+        plant = Plant.from_request(data.get('plant'))
+        
+        # Forecast-driven schedules start at the current hour, like district aggregation
+        current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        if data.get('demand') is not None:
+            demand = data['demand']
+            if type(demand) is not list or not all(type(v) in (int, float) for v in demand):
+                raise RequestDecodeError([('demand', 'must be a list of numbers')])
+            start = start or current_hour
+        elif data.get('buildings'):
+            if type(data['buildings']) is not list:
+                raise RequestDecodeError([('buildings', 'must be a list')])
+            demand = predict_building_horizons(data['buildings'], horizon)[series].sum(axis=0)
+            start = current_hour
+        elif data.get('district'):
+            result = district_aggregator.aggregate(data['district'], horizon, model_fingerprint)
+            demand = result['nodes'][result['root']][series]
+            start = current_hour
+        else:
+            return jsonify({'error': "One of 'demand', 'buildings' or 'district' is required"}), 400
+        if data.get('demand') is None:
+            # Regression forecasts can dip just below zero at low load
+            demand = np.maximum(demand, 0.0)
+        
+        price = data.get('electricityPrice', 0.0)
+        if type(price) is list:
+            if len(price) != len(demand) or not all(type(v) in (int, float) for v in price):
+                raise RequestDecodeError([('electricityPrice', f'must be a number or a list of {len(demand)} numbers')])
+        elif type(price) not in (int, float):
+            raise RequestDecodeError([('electricityPrice', 'must be a number or a list of numbers')])
+        
+        schedule = dispatch_optimizer.optimize(
+            str(data.get('plantId', 'default')), plant, demand, start, price, data.get('warmStart', True) is not False
+        )
+        
+        hours = len(schedule['demand'])
+        return jsonify({
+            'plant_id': str(data.get('plantId', 'default')),
+            'start': schedule['start'].isoformat(),
+            'timestamps': [(schedule['start'] + timedelta(hours=h)).isoformat() for h in range(hours)],
+            'demand': schedule['demand'].tolist(),
+            'production': schedule['production'].tolist(),
+            'units': {
+                unit_id: {
+                    'type': plant.unit_types[u],
+                    'heat_kw': schedule['setpoints'][:, u].tolist(),
+                    'electricity_kw': schedule['electricity'][:, u].tolist()
+                }
+                for u, unit_id in enumerate(plant.unit_ids)
+            },
+            'storage': {
+                # Positive flow charges the store, negative flow supplies the network
+                'flow_kw': schedule['storage_flow'].tolist(),
+                'level_kwh': schedule['storage_kwh'].tolist()
+            },
+            'unserved_kw': schedule['unserved'].tolist(),
+            'marginal_cost': schedule['marginal_cost'].tolist(),
+            'summary': {
+                'total_cost': schedule['total_cost'],
+                'heat_kwh': float(schedule['production'].sum()),
+                'electricity_kwh': float(schedule['electricity'].sum()),
+                'unserved_kwh': float(schedule['unserved'].sum()),
+                'peak_production_kw': float(schedule['production'].max())
+            },
+            'solver': {'method': schedule['method'], 'seconds': schedule['seconds']},
+            'generated_at': datetime.now().isoformat()
+        })
+    
+    except UnknownLocationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error optimizing dispatch: {e}")
+        return jsonify({'error': 'Internal server error during dispatch optimization'}), 500
+
+@app.route('/api/explain', methods=['POST'])
+def explain_prediction():
+    """
+    Explain predictions with per-feature SHAP contributions.
+    
+    Accepts the same payloads as the prediction endpoints: a single prediction ('weatherData',
+    optionally 'buildingData' and 'timestamp'), a horizon ('horizon' with 'weatherForecast' or a
+    'location'), or a batch ('buildings' and optionally 'horizon'). Contributions are in model
+    output units; per hour, 'expected_value' plus the contributions equals the point prediction.
+    
+    Returns:
+        tuple: JSON object with contributions per building and hour, and HTTP status.
+    """
+    try:
+        data = decode_json_object(request)
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        errors = FieldErrors()
+        if 'buildings' in data:
+            if type(data['buildings']) is not list:
+                errors.add('buildings', 'must be a list')
+            else:
+                for i, building in enumerate(data['buildings']):
+                    if type(building) is not dict:
+                        errors.add(f'buildings[{i}]', 'must be an object')
+            raise_for_errors(errors)
+            buildings = [
+                {'location': data.get('location'), **building, 'buildingId': str(building.get('buildingId', i))}
+                for i, building in enumerate(data['buildings'])
+            ]
+            horizon = decode_horizon(data.get('horizon'), errors)
+        else:
+            buildings = [{**data, 'buildingId': str(data.get('buildingId', 'request'))}]
+            is_horizon = any(key in data for key in ('horizon', 'weatherForecast', 'location'))
+            horizon = decode_horizon(data.get('horizon'), errors) if is_horizon else 1
+        # Same wall-clock hour as /api/predict uses for the timestamp
+        timestamp = decode_timestamp(data.get('timestamp'), 'timestamp', errors) if horizon == 1 else None
+        raise_for_errors(errors)
+        
+        if not buildings:
+            return jsonify({'error': 'No buildings provided'}), 400
+        if len({b['buildingId'] for b in buildings}) != len(buildings):
+            return jsonify({'error': 'Building ids must be unique'}), 400
+        
+        start = timestamp or datetime.now()
+        
+        explained = explanation_cache.explain(buildings, horizon, start, model_fingerprint)
+        feature_names = model_info['feature_names']
+        timestamps = [(start + timedelta(hours=h)).isoformat() for h in range(horizon)]
+        
+        results = []
+        for building in buildings:
+            building_id = building['buildingId']
+            contributions = explained['contributions'][building_id]
+            expected_value = explained['expected_value'][building_id]
+            results.append({
+                'buildingId': building_id,
+                'timestamps': timestamps,
+                'predictions': (expected_value + contributions.sum(axis=1)).tolist(),
+                'expected_value': expected_value.tolist(),
+                'contributions': contributions.tolist(),
+                'top_features': top_contributors(contributions, feature_names)
+            })
+        
+        return jsonify({
+            'feature_names': feature_names,
+            'horizon_hours': horizon,
+            'results': results,
+            'global_importance': global_importance,
+            'cache': {'cached': explained['cached'], 'computed': explained['computed']},
+            'model_version': model_info['model_type'],
+            'generated_at': datetime.now().isoformat()
+        })
+    
+    except UnknownLocationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except RequestDecodeError as e:
+        return jsonify(e.to_dict()), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error explaining prediction: {e}")
+        return jsonify({'error': 'Internal server error during explanation'}), 500
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """
+    Report per-class admission control metrics (running, queued, rejections and queue waits).
+    
+    Returns:
+        tuple: JSON object with the metrics of every request class, and HTTP status.
+    """
+    if admission_controller is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **admission_controller.describe()})
+
+@app.route('/api/drift', methods=['GET'])
+def get_drift_report():
+    """
+    Report how live model inputs compare with the training distribution.
+    
+    Returns PSI and KS scores, recent quantiles per feature and counts of inputs that were
+    filled with defaults. Pass ?reset=true to start a fresh observation window.
+    
+    Returns:
+        tuple: JSON drift report and HTTP status.
+    """
+    if drift_monitor is None:
+        return jsonify({'error': 'Drift monitoring needs scaler_info in model_info.json'}), 503
+    report = drift_monitor.report()
+    if request.args.get('reset', '').lower() in ('1', 'true'):
+        drift_monitor.reset()
+    return jsonify(report)
+
+@app.route('/api/admin/profile', methods=['POST'])
+def profile_worker():
+    """
+    Sample the stacks of every thread in this worker for a while and return them for a flamegraph.
+    
+    Query parameters: seconds (default 10), interval (default 0.01) and format ('collapsed'
+    for flamegraph.pl/inferno text, or 'speedscope'). The caller must send the PROFILER_TOKEN
+    as a bearer token. Each gunicorn worker is profiled separately; X-Profiled-Pid names it.
+    
+    Returns:
+        tuple: Collapsed stacks or a speedscope JSON file, and HTTP status.
+    """
+    # Not advertised at all unless enabled
+    if profiler is None:
+        return jsonify({'error': 'Endpoint not found'}), 404
+    
+    authorization = request.headers.get('Authorization', '')
+    if not profiler.authorized(authorization[7:] if authorization.startswith('Bearer ') else None):
+        return jsonify({'error': 'Profiler token required'}), 403
+    
+    output_format = request.args.get('format', 'collapsed')
+    if output_format not in ('collapsed', 'speedscope'):
+        return jsonify({'error': "format must be 'collapsed' or 'speedscope'"}), 400
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', 0.01))
+        stack_profile = profiler.profile(seconds, interval)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    summary = stack_profile.describe()
+    logger.info(f"Profiled worker for {summary['duration']:.1f}s: {summary['samples']} samples, "
+                f"{summary['overhead_seconds'] * 1000:.0f} ms sampling CPU")
+    if output_format == 'speedscope':
+        response = jsonify(stack_profile.speedscope())
+        extension = 'speedscope.json'
+    else:
+        response = Response(stack_profile.collapsed(), mimetype='text/plain')
+        extension = 'folded'
+    response.headers['Content-Disposition'] = f"attachment; filename=profile-{summary['pid']}.{extension}"
+    response.headers['X-Profiled-Pid'] = str(summary['pid'])
+    response.headers['X-Profile-Samples'] = str(summary['samples'])
+    return response
+
 @app.route('/api/features', methods=['GET'])
 def get_features():
     """
@@ -348,13 +1339,10 @@ def get_features():
         tuple: JSON list of string feature names required for prediction.
     """
     try:
-        if not model_info:
+        if 'features' not in metadata_responses:
             return jsonify({'error': 'Model not loaded'}), 500
         
-        return jsonify({
-            'total_features': model_info['feature_count'],
-            'features': model_info['feature_names']
-        })
+        return metadata_responses['features'].respond(request)
     
     except Exception as e:
         logger.error(f"Error getting features: {e}")
@@ -369,25 +1357,11 @@ def get_sample_data():
         tuple: JSON representation of a fully-engineered Pandas dataframe row for frontend testing.
     """
     try:
-        if not feature_service:
+        if 'sample' not in metadata_responses:
             return jsonify({'error': 'Feature service not loaded'}), 500
         
-        # Generate sample features using constants
-        features = feature_service.create_single_prediction_features(
-            SAMPLE_WEATHER_DATA, 
-            datetime.now(), 
-            SAMPLE_BUILDING_DATA
-        )
-        
-        # Convert features to the format expected by frontend
-        sample_features = {}
-        for col in features.columns:
-            sample_features[col] = float(features[col].iloc[0])
-        
-        return jsonify({
-            'sample_data': sample_features,
-            'note': 'Sample data for testing the API'
-        })
+        # Generated from the sample constants when the model was loaded
+        return metadata_responses['sample'].respond(request)
     
     except Exception as e:
         logger.error(f"Error getting sample data: {e}")
@@ -404,9 +1378,7 @@ def test_endpoint():
     try:
         # Make test prediction using constants
         features = feature_service.create_single_prediction_features(TEST_WEATHER_DATA)
-        features = feature_service.validate_features(features, model_info['feature_names'])
-        features_scaled = scaler.transform(features)
-        prediction = model.predict(features_scaled)[0]
+        prediction = run_model(features)['demand'][0]
         
         return jsonify({
             'test_successful': True,
@@ -447,6 +1419,19 @@ if __name__ == '__main__':
         print("  GET  /api/test          - Test prediction")
         print("  POST /api/predict       - Single prediction")
         print("  POST /api/predict-horizon - Multi-hour prediction")
+        print("  POST /api/predict-batch - Multi-building horizon prediction")
+        print("  GET  /api/weather/<location> - Cached weather forecast")
+        print("  POST /api/buildings     - Register building for precomputed forecasts")
+        print("  GET  /api/forecast/<id> - Precomputed rolling forecast")
+        print("  POST /api/district/aggregate - District load roll-up")
+        print("  POST /api/dispatch      - Boiler/CHP/storage schedule for a forecast")
+        print("  POST /api/explain       - SHAP explanation of predictions")
+        print("  GET  /api/admission     - Admission control metrics")
+        print("  GET  /api/drift         - Feature drift scores")
+        print("  POST /api/admin/profile - Sample worker stacks (needs PROFILER_TOKEN)")
+        print("  POST /api/actuals       - Record observed demand")
+        print("  GET  /api/history/<id>  - Stored predictions vs actuals")
+        print("  PUT  /api/weather/<location> - Ingest weather forecast")
         print("\nStarting server on http://localhost:5000")
         
         # Determine debug mode from environment variable
@@ -0,0 +1,405 @@
+"""
+Plant Dispatch for the Heat Demand Prediction API
+Turns horizon demand forecasts into hourly boiler, CHP and thermal storage setpoints
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from request_decoding import FieldErrors, raise_for_errors
+
+logger = logging.getLogger(__name__)
+
+UNIT_TYPES = ('boiler', 'chp')
+
+# Storage state-of-charge grid points (including empty and full); the solver's working set
+# is a few levels x levels arrays, so the cap bounds what one request can allocate
+DEFAULT_STORAGE_LEVELS = 101
+MAX_STORAGE_LEVELS = 201
+
+# Plants whose last plan is kept for warm starts (least recently used evicted)
+MAX_PLANS = 1024
+
+# Cost per kWh of demand the units cannot cover; far above any fuel cost so it is a last resort
+UNSERVED_PENALTY = 10.0
+
+# Warm starts search this many grid steps either side of the previous plan
+WARM_START_BAND = 6
+
+# Slack for floating point comparisons of kW flows
+TOLERANCE = 1e-9
+
+STORAGE_DEFAULTS = {
+    'chargeEfficiency': 0.95,
+    'dischargeEfficiency': 0.95,
+    'lossPerHour': 0.005
+}
+
+
+def _number(config: Dict, key: str, path: str, errors: FieldErrors, default=None,
+            low: float = 0.0, high: float = math.inf, low_inclusive: bool = True):
+    value = config.get(key)
+    if value is None:
+        if default is None:
+            errors.add(f'{path}.{key}', "is required")
+        return default
+    if type(value) not in (int, float):
+        errors.add(f'{path}.{key}', "must be a number")
+        return default
+    if not (low <= value if low_inclusive else low < value) or not value <= high:
+        errors.add(f'{path}.{key}', f"must be between {low:g} and {high:g}")
+        return default
+    return float(value)
+
+
+class Plant:
+    """
+    Heat-only boilers, CHP units and an optional thermal store serving one network
+
+    Every unit is continuous between 0 and its capacity with a constant heat
+    cost: fuel cost over efficiency, less the value of the electricity a CHP
+    unit co-generates (so a CHP unit's cost moves with the electricity price
+    and can go negative). For a given hour, serving q kW at least cost is then
+    a merit-order fill, and the hourly cost is piecewise linear and convex in q.
+    """
+
+    def __init__(self, units: List[Dict], storage: Optional[Dict] = None,
+                 storage_levels: int = DEFAULT_STORAGE_LEVELS):
+        """
+        Args:
+            units: Dicts with 'id', 'type', 'capacityKw', 'efficiency', 'fuelCost'
+                (per kWh of fuel) and, for CHP, 'powerToHeat' (kW electricity per kW heat)
+            storage: Dict with 'capacityKwh', 'maxChargeKw', 'maxDischargeKw', 'chargeEfficiency',
+                'dischargeEfficiency', 'lossPerHour' (fraction), 'initialKwh' and 'finalKwh'
+            storage_levels: State-of-charge grid points of the dynamic program
+        """
+        self.unit_ids = [unit['id'] for unit in units]
+        self.unit_types = [unit['type'] for unit in units]
+        self.capacity = np.array([unit['capacityKw'] for unit in units], dtype=float)
+        self.fuel_heat_cost = np.array([unit['fuelCost'] / unit['efficiency'] for unit in units])
+        self.power_to_heat = np.array([unit.get('powerToHeat') or 0.0 for unit in units], dtype=float)
+
+        storage = storage or {'capacityKwh': 0.0}
+        self.storage_capacity = storage['capacityKwh']
+        self.max_charge = storage.get('maxChargeKw', self.storage_capacity)
+        self.max_discharge = storage.get('maxDischargeKw', self.storage_capacity)
+        self.charge_efficiency = storage.get('chargeEfficiency', STORAGE_DEFAULTS['chargeEfficiency'])
+        self.discharge_efficiency = storage.get('dischargeEfficiency', STORAGE_DEFAULTS['dischargeEfficiency'])
+        self.loss = storage.get('lossPerHour', STORAGE_DEFAULTS['lossPerHour'])
+        self.initial_kwh = storage.get('initialKwh')
+        self.final_kwh = storage.get('finalKwh')
+        self.levels = np.linspace(0.0, self.storage_capacity, storage_levels if self.storage_capacity > 0 else 1)
+
+        # Configuration digest: warm starts only reuse plans made for the same plant
+        self.signature = hashlib.sha1(json.dumps(
+            [units, {k: v for k, v in storage.items() if k not in ('initialKwh', 'finalKwh')}, storage_levels],
+            sort_keys=True
+        ).encode()).hexdigest()
+
+    @classmethod
+    def from_request(cls, config, path: str = 'plant') -> 'Plant':
+        """
+        Validate a plant description from a request body
+
+        Raises:
+            RequestDecodeError: With one entry per invalid field
+        """
+        errors = FieldErrors()
+        if type(config) is not dict:
+            errors.add(path, "must be an object")
+            raise_for_errors(errors)
+        units = []
+        raw_units = config.get('units')
+        if type(raw_units) is not list or not raw_units:
+            errors.add(f'{path}.units', "must be a non-empty list")
+            raw_units = []
+        for i, raw in enumerate(raw_units):
+            unit_path = f'{path}.units[{i}]'
+            if type(raw) is not dict:
+                errors.add(unit_path, "must be an object")
+                continue
+            unit_type = raw.get('type', 'boiler')
+            if unit_type not in UNIT_TYPES:
+                errors.add(f'{unit_path}.type', f"must be one of {', '.join(UNIT_TYPES)}")
+            unit = {
+                'id': str(raw.get('id', f'unit-{i}')),
+                'type': unit_type,
+                'capacityKw': _number(raw, 'capacityKw', unit_path, errors, low=0.0, low_inclusive=False),
+                'efficiency': _number(raw, 'efficiency', unit_path, errors, low=0.0, high=1.2, low_inclusive=False),
+                'fuelCost': _number(raw, 'fuelCost', unit_path, errors)
+            }
+            if unit_type == 'chp':
+                unit['powerToHeat'] = _number(raw, 'powerToHeat', unit_path, errors, high=5.0)
+            units.append(unit)
+
+        storage = None
+        if config.get('storage') is not None:
+            raw = config['storage']
+            storage_path = f'{path}.storage'
+            if type(raw) is not dict:
+                errors.add(storage_path, "must be an object")
+                raw = {}
+            capacity = _number(raw, 'capacityKwh', storage_path, errors, default=0.0)
+            storage = {
+                'capacityKwh': capacity,
+                'maxChargeKw': _number(raw, 'maxChargeKw', storage_path, errors, default=capacity),
+                'maxDischargeKw': _number(raw, 'maxDischargeKw', storage_path, errors, default=capacity),
+                'chargeEfficiency': _number(raw, 'chargeEfficiency', storage_path, errors,
+                                            default=STORAGE_DEFAULTS['chargeEfficiency'], high=1.0, low_inclusive=False),
+                'dischargeEfficiency': _number(raw, 'dischargeEfficiency', storage_path, errors,
+                                               default=STORAGE_DEFAULTS['dischargeEfficiency'], high=1.0,
+                                               low_inclusive=False),
+                'lossPerHour': _number(raw, 'lossPerHour', storage_path, errors,
+                                       default=STORAGE_DEFAULTS['lossPerHour'], high=1.0)
+            }
+            for key in ('initialKwh', 'finalKwh'):
+                if raw.get(key) is not None:
+                    storage[key] = _number(raw, key, storage_path, errors, high=capacity)
+
+        levels = config.get('storageLevels', DEFAULT_STORAGE_LEVELS)
+        if type(levels) is not int or not 2 <= levels <= MAX_STORAGE_LEVELS:
+            errors.add(f'{path}.storageLevels', f"must be an integer between 2 and {MAX_STORAGE_LEVELS}")
+        raise_for_errors(errors)
+        return cls(units, storage, levels)
+
+    def marginal_costs(self, electricity_price: np.ndarray) -> np.ndarray:
+        """Heat cost per kWh of every unit in every hour (hours x units)"""
+        return self.fuel_heat_cost[None, :] - self.power_to_heat[None, :] * electricity_price[:, None]
+
+    def merit_order(self, electricity_price: np.ndarray):
+        """
+        Units sorted by hourly heat cost
+
+        Returns:
+            (order, sorted costs, sorted capacities, capacity of cheaper units), each hours x units
+        """
+        costs = self.marginal_costs(electricity_price)
+        order = np.argsort(costs, axis=1, kind='stable')
+        sorted_costs = np.take_along_axis(costs, order, axis=1)
+        sorted_capacity = self.capacity[order]
+        cheaper = np.cumsum(sorted_capacity, axis=1) - sorted_capacity
+        return order, sorted_costs, sorted_capacity, cheaper
+
+    def production_cost(self, production: np.ndarray, merit) -> np.ndarray:
+        """
+        Least cost of producing ``production`` kW, shaped (hours, ...), including unserved penalties
+
+        Evaluated for whole arrays of candidate outputs with one pass per unit.
+        """
+        _, costs, capacity, cheaper = merit
+        extra = (slice(None),) + (None,) * (production.ndim - 1)
+        cost = np.zeros_like(production)
+        for u in range(costs.shape[1]):
+            output = np.clip(production - cheaper[:, u][extra], 0.0, capacity[:, u][extra])
+            cost += costs[:, u][extra] * output
+        unserved = np.maximum(production - self.capacity.sum(), 0.0)
+        return cost + UNSERVED_PENALTY * unserved
+
+    def setpoints(self, production: np.ndarray, merit) -> np.ndarray:
+        """Per-unit heat output (hours x units, in the plant's unit order) for hourly production"""
+        order, _, capacity, cheaper = merit
+        sorted_output = np.clip(production[:, None] - cheaper, 0.0, capacity)
+        output = np.empty_like(sorted_output)
+        np.put_along_axis(output, order, sorted_output, axis=1)
+        return output
+
+
+class DispatchOptimizer:
+    """
+    Least-cost hourly dispatch by dynamic programming over the storage level
+
+    The state is the thermal store's energy on a fixed grid. For every hour
+    and every pair of levels the store's heat flow, and from it the required
+    production, is known, so an hour's levels x levels cost matrix is
+    evaluated in a few vectorized passes (one per unit) and reduced with one
+    min per row. Only one hour's matrix is alive at a time, so memory does not
+    grow with the horizon. Plants without storage reduce to a merit-order
+    fill per hour.
+
+    Plans are kept per plant (the most recently used MAX_PLANS). A re-optimization an hour or more later is
+    warm-started: only levels within WARM_START_BAND grid steps of the
+    previous plan (shifted to the new start) are searched. If the best path
+    touches the edge of that band the band may have cut off a better path, so
+    the full grid is solved instead.
+    """
+
+    def __init__(self, band: int = WARM_START_BAND, max_plans: int = MAX_PLANS):
+        self.band = band
+        self.max_plans = max_plans
+        self._plans: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hour_cost(plant: Plant, demand: float, merit, before: np.ndarray, after: np.ndarray) -> np.ndarray:
+        """Cost of moving from each level in ``before`` to each level in ``after`` within one hour (inf if infeasible)"""
+        delta = after[None, :] - before[:, None] * (1.0 - plant.loss)
+        flow = np.where(delta > 0, delta / plant.charge_efficiency, delta * plant.discharge_efficiency)
+        production = demand + flow
+        feasible = (
+            (flow <= plant.max_charge + TOLERANCE)
+            & (-flow <= plant.max_discharge + TOLERANCE)
+            & (production >= -TOLERANCE)
+        )
+        cost = plant.production_cost(np.maximum(production, 0.0)[None], merit)[0]
+        return np.where(feasible, cost, np.inf)
+
+    def _solve(self, plant: Plant, demand: np.ndarray, merit, states: np.ndarray, start_kwh: float,
+               final_kwh: float, refill_cost: float):
+        """
+        Backward recursion over the allowed level indices per hour boundary
+
+        Args:
+            states: (hours + 1) x B grid indices allowed at each boundary (row 0 is ignored)
+            start_kwh: Initial energy, used exactly rather than snapped to the grid
+
+        Returns:
+            (level index path of length hours + 1 with the start as its first entry,
+             optimal cost including the end-level penalty, position of the path in each row of states)
+        """
+        hours = len(demand)
+        levels = plant.levels[states]
+        levels[0] = start_kwh
+
+        # Ending below the target is charged at the cost of refilling later
+        value = np.maximum(final_kwh - levels[-1], 0.0) * refill_cost
+        choice = np.empty((hours, states.shape[1]), dtype=np.intp)
+        rows = np.arange(states.shape[1])
+        for t in range(hours - 1, -1, -1):
+            hour_merit = tuple(part[t:t + 1] for part in merit)
+            total = self._hour_cost(plant, demand[t], hour_merit, levels[t], levels[t + 1]) + value[None, :]
+            choice[t] = total.argmin(axis=1)
+            value = total[rows, choice[t]]
+
+        positions = [0]
+        for t in range(hours):
+            positions.append(int(choice[t, positions[-1]]))
+        path = states[np.arange(hours + 1), positions]
+        return path, float(value[0]), np.array(positions)
+
+    def optimize(
+        self,
+        plant_id: str,
+        plant: Plant,
+        demand,
+        start: Optional[datetime] = None,
+        electricity_price=0.0,
+        warm_start: bool = True
+    ) -> Dict:
+        """
+        Solve the hourly schedule for a demand forecast
+
+        Args:
+            plant_id: Key under which the plan is kept for warm starts
+            plant: Plant units and storage
+            demand: Hourly heat demand in kW (one value per hour of the horizon)
+            start: Time of the first hour (defaults to the current hour)
+            electricity_price: Price per kWh of electricity, scalar or one value per hour
+            warm_start: Search near the previous plan for this plant when there is one
+
+        Returns:
+            Dict with the schedule arrays ('production', 'setpoints' hours x units, 'storage_flow',
+            'storage_kwh' with hours + 1 levels, 'unserved', 'marginal_cost', 'electricity'),
+            'total_cost' and solver details
+        """
+        started = datetime.now()
+        demand = np.asarray(demand, dtype=float)
+        if demand.ndim != 1 or not len(demand):
+            raise ValueError("Demand must be a non-empty hourly series")
+        if not np.isfinite(demand).all() or (demand < 0).any():
+            raise ValueError("Demand must be finite and non-negative")
+        hours = len(demand)
+        price = np.broadcast_to(np.asarray(electricity_price, dtype=float), (hours,)).copy()
+        start = start or datetime.now().replace(minute=0, second=0, microsecond=0)
+
+        with self._lock:
+            previous = self._plans.get(plant_id)
+            if previous is not None:
+                self._plans.move_to_end(plant_id)
+        if previous is not None and previous['signature'] != plant.signature:
+            previous = None
+        shift = None
+        if previous is not None:
+            offset = (start - previous['start']) / timedelta(hours=1)
+            if offset == int(offset) and 0 <= offset < len(previous['path']) - 1:
+                shift = int(offset)
+
+        # Without an explicit level, the store holds what the previous plan expected by now
+        if plant.initial_kwh is not None:
+            start_kwh = plant.initial_kwh
+        elif shift is not None:
+            start_kwh = float(plant.levels[previous['path'][shift]])
+        else:
+            start_kwh = 0.0
+        final_kwh = plant.final_kwh if plant.final_kwh is not None else start_kwh
+
+        merit = plant.merit_order(price)
+        refill_cost = max(float(merit[1].max()), 0.0) / plant.charge_efficiency
+        grid = len(plant.levels)
+        method = 'full'
+        path = None
+
+        if warm_start and shift is not None and 2 * self.band + 1 < grid:
+            guess = previous['path'][shift:]
+            guess = np.concatenate([guess, np.repeat(guess[-1:], hours + 1 - len(guess))])[:hours + 1]
+            # Keep the band inside the grid so its width stays fixed
+            low = np.clip(guess - self.band, 0, grid - 2 * self.band - 1)
+            states = low[:, None] + np.arange(2 * self.band + 1)[None, :]
+            path, total_cost, positions = self._solve(plant, demand, merit, states, start_kwh, final_kwh, refill_cost)
+            at_edge = ((positions[1:] == 0) & (low[1:] > 0)) | (
+                (positions[1:] == 2 * self.band) & (low[1:] < grid - 2 * self.band - 1)
+            )
+            if at_edge.any() or not np.isfinite(total_cost):
+                path = None
+            else:
+                method = 'warm_start'
+
+        if path is None:
+            states = np.broadcast_to(np.arange(grid), (hours + 1, grid))
+            path, total_cost, _ = self._solve(plant, demand, merit, states, start_kwh, final_kwh, refill_cost)
+        if not np.isfinite(total_cost):
+            raise ValueError("No feasible schedule: storage limits cannot be met")
+
+        storage_kwh = plant.levels[path]
+        storage_kwh[0] = start_kwh
+        delta = storage_kwh[1:] - storage_kwh[:-1] * (1.0 - plant.loss)
+        storage_flow = np.where(delta > 0, delta / plant.charge_efficiency, delta * plant.discharge_efficiency)
+        production = np.maximum(demand + storage_flow, 0.0)
+        setpoints = plant.setpoints(production, merit)
+        unserved = np.maximum(production - plant.capacity.sum(), 0.0)
+
+        # Cost of the next kWh in each hour: the cheapest unit that still has headroom
+        marginal_costs = plant.marginal_costs(price)
+        headroom = setpoints < plant.capacity[None, :] - TOLERANCE
+        marginal_cost = np.where(
+            headroom.any(axis=1), np.where(headroom, marginal_costs, np.inf).min(axis=1), UNSERVED_PENALTY
+        )
+
+        with self._lock:
+            self._plans[plant_id] = {'signature': plant.signature, 'start': start, 'path': path}
+            self._plans.move_to_end(plant_id)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+        seconds = (datetime.now() - started).total_seconds()
+        logger.info(f"Dispatched {plant_id} over {hours}h ({method}, {grid} storage levels) in {seconds * 1000:.1f} ms")
+        return {
+            'start': start,
+            'demand': demand,
+            'production': production,
+            'setpoints': setpoints,
+            'storage_flow': storage_flow,
+            'storage_kwh': storage_kwh,
+            'unserved': unserved,
+            'marginal_cost': marginal_cost,
+            'electricity': setpoints * plant.power_to_heat[None, :],
+            'total_cost': float(plant.production_cost(production[:, None], merit).sum()),
+            'method': method,
+            'seconds': seconds
+        }
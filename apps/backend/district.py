@@ -0,0 +1,220 @@
+"""
+District Aggregation for Heat Demand Prediction API
+Rolls building horizons up a district -> substation -> feeder tree with cached per-node partial sums
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from request_decoding import FieldErrors, raise_for_errors
+
+logger = logging.getLogger(__name__)
+
+# Aggregated series kept for every node
+SERIES = ('demand', 'confidence_low', 'confidence_high')
+
+
+def _digest(payload) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def flatten_district(definition: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Walk a district definition into node and building lists
+
+    Aggregate nodes carry an 'id' and 'children'; leaves are building entries
+    with a 'buildingId' (plus 'location' or weather fields and 'buildingData').
+
+    Args:
+        definition: Root node of the district tree
+
+    Returns:
+        (nodes in post-order with 'id', 'parent', 'children' ids and 'buildings' leaf ids,
+         buildings in first-seen order)
+
+    Raises:
+        RequestDecodeError: With the path of every malformed node
+        ValueError: If ids are duplicated
+    """
+    nodes: List[Dict] = []
+    buildings: Dict[str, Dict] = {}
+    seen = set()
+    errors = FieldErrors()
+
+    def visit(node: Dict, parent: Optional[str], path: str):
+        if type(node) is not dict:
+            errors.add(path, "must be an object")
+            return
+        if 'buildingId' in node:
+            building_id = str(node['buildingId'])
+            if building_id in buildings and buildings[building_id] != node:
+                raise ValueError(f"Building {building_id} defined twice with different settings")
+            buildings[building_id] = node
+            return
+        node_id = node.get('id')
+        if not node_id or type(node_id) not in (str, int):
+            errors.add(f'{path}.id', "is required for aggregate nodes")
+            return
+        if type(node.get('children')) is not list:
+            errors.add(f'{path}.children', "must be a list")
+            return
+        if node_id in seen:
+            raise ValueError(f"Duplicate node id: {node_id}")
+        seen.add(node_id)
+        for i, child in enumerate(node['children']):
+            visit(child, node_id, f'{path}.children[{i}]')
+        children = [child for child in node['children'] if type(child) is dict]
+        nodes.append({
+            'id': node_id,
+            'parent': parent,
+            'children': [c['id'] for c in children if 'buildingId' not in c],
+            'buildings': [str(c['buildingId']) for c in children if 'buildingId' in c]
+        })
+
+    visit(definition, None, 'district')
+    raise_for_errors(errors)
+    return nodes, list(buildings.values())
+
+
+class DistrictAggregator:
+    """
+    Hierarchical aggregation of building forecasts with partial-sum caching
+
+    Building horizons are cached by a signature of their inputs (building
+    settings, weather version, horizon and forecast hour). Each aggregate node
+    caches its summed series under a signature derived from its children, so
+    when one building changes only the nodes on its path to the root are
+    re-summed; everything else is reused.
+    """
+
+    def __init__(
+        self,
+        compute_fn: Callable[[List[Dict], int], Dict],
+        weather_version_fn: Callable[[str], Optional[str]],
+        max_buildings: int = 100000
+    ):
+        """
+        Args:
+            compute_fn: Batch scorer taking (buildings, horizon) and returning 'demand',
+                'confidence_low', 'confidence_high' arrays (buildings x horizon) and 'building_ids'
+            weather_version_fn: Returns a version token for a location's cached forecast
+            max_buildings: Size bound of the per-building horizon cache (least recently used evicted)
+        """
+        self.compute_fn = compute_fn
+        self.weather_version_fn = weather_version_fn
+        self.max_buildings = max_buildings
+        self._buildings: 'OrderedDict[str, Dict[str, np.ndarray]]' = OrderedDict()
+        self._nodes: Dict[Tuple[str, str], Tuple[str, Dict[str, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+    def building_signature(self, building: Dict, horizon: int, start_hour: str) -> str:
+        """Hash everything a building's horizon depends on"""
+        # Current conditions are hour 0 and the forecast the rest; a location's cached forecast
+        # is used only when none is embedded, with explicit current conditions still on top
+        inline = [building.get('weatherData'), building.get('weatherForecast')]
+        location_token = None if building.get('weatherForecast') else self.weather_version_fn(building.get('location'))
+        return _digest([
+            building.get('buildingData', {}), building.get('location'),
+            inline, location_token, horizon, start_hour
+        ])
+
+    def aggregate(self, definition: Dict, horizon: int, model_version: str = '') -> Dict:
+        """
+        Compute per-node aggregated horizons for a district
+
+        Args:
+            definition: District tree (see flatten_district)
+            horizon: Hours per building
+            model_version: Included in signatures so a model reload invalidates the caches
+
+        Returns:
+            Dict with 'nodes' (id -> parent, counts and aggregated series), 'order' (post-order ids),
+            'root' id and 'recomputed' counts of buildings and nodes
+        """
+        nodes, buildings = flatten_district(definition)
+        start_hour = datetime.now().replace(minute=0, second=0, microsecond=0).isoformat()
+        district_id = nodes[-1]['id']
+
+        signatures = {
+            str(b['buildingId']): self.building_signature(b, horizon, start_hour) + model_version
+            for b in buildings
+        }
+
+        with self._lock:
+            missing = [b for b in buildings if signatures[str(b['buildingId'])] not in self._buildings]
+
+        # One batched model call for every building whose inputs changed
+        if missing:
+            batch = self.compute_fn(missing, horizon)
+            with self._lock:
+                for i, building_id in enumerate(batch['building_ids']):
+                    self._buildings[signatures[str(building_id)]] = {key: batch[key][i] for key in SERIES}
+                while len(self._buildings) > self.max_buildings:
+                    self._buildings.popitem(last=False)
+
+        with self._lock:
+            series = {}
+            for building_id, signature in signatures.items():
+                if signature in self._buildings:
+                    self._buildings.move_to_end(signature)
+                    series[building_id] = self._buildings[signature]
+
+            node_series: Dict[str, Dict[str, np.ndarray]] = {}
+            node_signatures: Dict[str, str] = {}
+            recomputed_nodes = 0
+            # Post-order guarantees children are summed before their parents
+            for node in nodes:
+                member_ids = [b for b in node['buildings'] if b in series]
+                signature = _digest(
+                    [signatures[b] for b in member_ids] + [node_signatures[c] for c in node['children']]
+                )
+                node_signatures[node['id']] = signature
+
+                cached = self._nodes.get((district_id, node['id']))
+                if cached is not None and cached[0] == signature:
+                    node_series[node['id']] = cached[1]
+                    continue
+
+                parts = {
+                    key: [series[b][key] for b in member_ids] + [node_series[c][key] for c in node['children']]
+                    for key in SERIES
+                }
+                # Interval bounds are summed as well: a conservative band assuming fully correlated errors
+                totals = {
+                    key: np.sum(np.vstack(values), axis=0) if values else np.zeros(horizon)
+                    for key, values in parts.items()
+                }
+                self._nodes[(district_id, node['id'])] = (signature, totals)
+                node_series[node['id']] = totals
+                recomputed_nodes += 1
+
+        building_counts: Dict[str, int] = {}
+        for node in nodes:
+            building_counts[node['id']] = (
+                len(node['buildings']) + sum(building_counts[c] for c in node['children'])
+            )
+
+        logger.info(
+            f"District {district_id}: {len(missing)}/{len(buildings)} buildings and "
+            f"{recomputed_nodes}/{len(nodes)} nodes recomputed"
+        )
+        return {
+            'root': district_id,
+            'order': [node['id'] for node in nodes],
+            'nodes': {
+                node['id']: {
+                    'parent': node['parent'],
+                    'buildings': building_counts[node['id']],
+                    **node_series[node['id']]
+                }
+                for node in nodes
+            },
+            'missing_buildings': [str(b['buildingId']) for b in buildings if str(b['buildingId']) not in series],
+            'recomputed': {'buildings': len(missing), 'nodes': recomputed_nodes}
+        }
@@ -0,0 +1,270 @@
+"""
+Feature Drift Monitor for Heat Demand Prediction API
+Tracks live feature distributions in constant memory and scores them against the training reference
+"""
+import logging
+import math
+import threading
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# A RobustScaler maps the training median to 0 and the IQR to 1; for a normal
+# feature that is a standard deviation of 1 / 1.349 in scaled units
+IQR_TO_STD = 1 / 1.349
+
+# Conventional PSI bands: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant drift
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+
+# Floor for bin proportions so empty bins keep PSI finite
+PSI_EPSILON = 1e-4
+
+# Exact distributions of the calendar features for year-round traffic (value -> probability);
+# a 'feature_distributions' block in model_info.json overrides or extends them
+CALENDAR_DISTRIBUTIONS = {
+    'hour': {hour: 1 / 24 for hour in range(24)},
+    'day_of_week': {day: 1 / 7 for day in range(7)},
+    'month': {month: 1 / 12 for month in range(1, 13)},
+    'is_weekend': {0: 5 / 7, 1: 2 / 7}
+}
+
+# Heating degree features -> (temperature feature, base temperature): zero whenever it is warmer than the base.
+# Served rows may use a building's own base and demand scaling (see FeatureService.building_scaling_arrays)
+HEATING_DEGREE_FEATURES = {'hdh': ('outdoor_temp_synthetic', 17.0)}
+
+
+class DriftMonitor:
+    """
+    Streaming per-feature histograms of scaled model inputs
+
+    Every feature shares one fixed grid in scaled space (``bins`` equal-width
+    bins over [-span, span] plus an underflow and an overflow bin), so a
+    whole batch is binned with a single searchsorted/bincount and memory is
+    constant in traffic. Counts decay exponentially with a half-life in rows,
+    so scores describe recent traffic rather than everything since start-up.
+
+    Continuous features are referenced against a normal approximation of the
+    scaler statistics in model_info.json (center = training median, scale =
+    IQR). Discrete calendar features use their exact distributions, and heating
+    degree features a point mass at zero plus the tail implied by the
+    temperature reference, since a normal fit to either alarms on healthy traffic.
+
+    Serving scales heating degrees per building (max(0, base - T) * scaling),
+    so their reference is built in the same space: update() takes each row's
+    base and scaling, and the reference is the decayed mixture of the
+    per-building references over the rows actually scored.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        center: List[float],
+        scale: List[float],
+        bins: int = 64,
+        span: float = 4.0,
+        half_life_rows: float = 100000.0,
+        psi_group: int = 4,
+        distributions: Optional[Dict[str, Dict[float, float]]] = None,
+        heating_degree: Optional[Dict[str, Tuple[str, float]]] = None
+    ):
+        """
+        Args:
+            feature_names: Model feature order
+            center: Scaler center per feature (training median)
+            scale: Scaler scale per feature (training IQR)
+            bins: Number of interior histogram bins
+            span: Grid extent in scaled units either side of the median
+            half_life_rows: Rows after which old observations weigh half as much
+            psi_group: Adjacent fine bins merged per PSI bin
+            distributions: Discrete features -> {value: probability} (defaults to CALENDAR_DISTRIBUTIONS)
+            heating_degree: Heating degree features -> (temperature feature, base) (defaults to HEATING_DEGREE_FEATURES)
+        """
+        if bins % psi_group:
+            raise ValueError("bins must be a multiple of psi_group")
+        self.feature_names = list(feature_names)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.edges = np.linspace(-span, span, bins + 1)
+        self.half_life_rows = half_life_rows
+        self.psi_group = psi_group
+
+        # Reference mass per bin, including the two tail bins
+        distributions = CALENDAR_DISTRIBUTIONS if distributions is None else distributions
+        heating_degree = HEATING_DEGREE_FEATURES if heating_degree is None else heating_degree
+        # Feature index -> (temperature feature index, default base temperature)
+        self.heating_degree = {
+            i: (self.feature_names.index(heating_degree[name][0]), heating_degree[name][1])
+            for i, name in enumerate(self.feature_names)
+            if name not in distributions and name in heating_degree and heating_degree[name][0] in self.feature_names
+        }
+        self.reference = np.array([
+            self._discrete_reference(i, distributions[name]) if name in distributions
+            else self._heating_degree_reference(i, np.array([[self.heating_degree[i][1], 1.0]]))[0]
+            if i in self.heating_degree
+            else np.diff(np.r_[0.0, [NormalDist(0.0, IQR_TO_STD).cdf(edge) for edge in self.edges], 1.0])
+            for i, name in enumerate(self.feature_names)
+        ])
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _discrete_reference(self, index: int, distribution: Dict[float, float]) -> np.ndarray:
+        """Bin masses of a feature that only takes the given values"""
+        values = (np.array(list(distribution), dtype=np.float64) - self.center[index]) / self.scale[index]
+        probabilities = np.array(list(distribution.values()), dtype=np.float64)
+        bins = np.searchsorted(self.edges, values, side='right')
+        return np.bincount(bins, weights=probabilities / probabilities.sum(), minlength=len(self.edges) + 1)
+
+    def _heating_degree_reference(self, index: int, buildings: np.ndarray) -> np.ndarray:
+        """
+        Bin masses of max(0, base - T) * scaling for T under the temperature feature's normal reference
+
+        Args:
+            index: Heating degree feature index
+            buildings: (base temperature, scaling) per row of the result
+
+        Returns:
+            Array of shape (buildings, bins)
+        """
+        j = self.heating_degree[index][0]
+        base, scaling = buildings[:, :1], buildings[:, 1:]
+        degrees = self.edges * self.scale[index] + self.center[index]
+        # P(value < edge): nothing below zero, then the point mass at zero plus the tail, i.e. P(T > base - edge / scaling)
+        z = (base - degrees / scaling - self.center[j]) / (self.scale[j] * IQR_TO_STD * math.sqrt(2))
+        below = np.where(degrees > 0, 0.5 * np.vectorize(math.erfc)(z), 0.0)
+        return np.diff(np.hstack([np.zeros((len(buildings), 1)), below, np.ones((len(buildings), 1))]), axis=1)
+
+    @classmethod
+    def from_model_info(cls, model_info: Dict, **kwargs) -> Optional['DriftMonitor']:
+        """Build a monitor from model_info.json (None if it has no scaler_info)"""
+        scaler_info = model_info.get('scaler_info')
+        if not scaler_info:
+            return None
+        distributions = dict(CALENDAR_DISTRIBUTIONS)
+        for name, distribution in (model_info.get('feature_distributions') or {}).items():
+            # JSON object keys are strings
+            distributions[name] = {float(value): p for value, p in distribution.items()}
+        kwargs.setdefault('distributions', distributions)
+        return cls(model_info['feature_names'], scaler_info['center'], scaler_info['scale'], **kwargs)
+
+    def reset(self):
+        """Discard all observations"""
+        with self._lock:
+            n_features, n_bins = self.reference.shape
+            self._counts = np.zeros((n_features, n_bins))
+            # Decayed reference mass of the heating degree features for the buildings scored
+            self._expected = np.zeros((n_features, n_bins))
+            self._sum = np.zeros(n_features)
+            self._sum_squares = np.zeros(n_features)
+            self._weight = 0.0
+            self._rows = 0
+            self._defaults: Dict[str, int] = {}
+
+    def update(self, features_scaled: np.ndarray, heating_degree: Optional[np.ndarray] = None):
+        """
+        Add a scored batch
+
+        Args:
+            features_scaled: Scaled model inputs (rows x features)
+            heating_degree: Heating degree (base temperature, scaling) per row (rows x 2);
+                None means every row uses the default base, unscaled
+        """
+        values = np.asarray(features_scaled, dtype=np.float64)
+        n_rows, n_features = values.shape
+        if n_rows == 0:
+            return
+        expected = np.zeros(self.reference.shape)
+        if heating_degree is None:
+            expected[list(self.heating_degree)] = self.reference[list(self.heating_degree)] * n_rows
+        else:
+            # One reference per distinct building rather than per row
+            buildings, rows = np.unique(np.asarray(heating_degree, dtype=np.float64), axis=0, return_counts=True)
+            for i in self.heating_degree:
+                expected[i] = rows @ self._heating_degree_reference(i, buildings)
+        n_bins = self.reference.shape[1]
+        # Bin index 0 is underflow, len(edges) is overflow
+        index = np.searchsorted(self.edges, values, side='right') + np.arange(n_features) * n_bins
+        counts = np.bincount(index.ravel(), minlength=n_features * n_bins).reshape(n_features, n_bins)
+        decay = 0.5 ** (n_rows / self.half_life_rows)
+
+        with self._lock:
+            self._counts = self._counts * decay + counts
+            self._expected = self._expected * decay + expected
+            self._sum = self._sum * decay + values.sum(axis=0)
+            self._sum_squares = self._sum_squares * decay + np.square(values).sum(axis=0)
+            self._weight = self._weight * decay + n_rows
+            self._rows += n_rows
+
+    def record_defaults(self, counts: Dict[str, int]):
+        """Count inputs that were filled with default values (feature or weather field -> rows)"""
+        with self._lock:
+            for name, count in counts.items():
+                self._defaults[name] = self._defaults.get(name, 0) + int(count)
+
+    def _quantiles(self, counts: np.ndarray, probabilities) -> np.ndarray:
+        """Interpolate quantiles (scaled units) from one histogram row"""
+        interior = counts[1:-1]
+        cdf = np.cumsum(np.r_[counts[0], interior]) / counts.sum()
+        return np.interp(probabilities, cdf, self.edges)
+
+    def report(self) -> Dict:
+        """
+        Drift scores and summary statistics per feature
+
+        Returns:
+            Dict with 'rows' seen, 'features' (name -> psi, ks, status, mean, std and quantiles in
+            original units) and 'defaulted_inputs' counts
+        """
+        with self._lock:
+            counts = self._counts.copy()
+            reference = self.reference.copy()
+            for i in self.heating_degree:
+                reference[i] = self._expected[i] / self._expected[i].sum() if self._expected[i].any() else reference[i]
+            total_sum, total_squares, weight = self._sum.copy(), self._sum_squares.copy(), self._weight
+            rows, defaults = self._rows, dict(self._defaults)
+
+        features = {}
+        if weight > 0:
+            observed = counts / counts.sum(axis=1, keepdims=True)
+            ks = np.abs(np.cumsum(observed, axis=1) - np.cumsum(reference, axis=1)).max(axis=1)
+
+            # PSI on coarser bins: tails kept, interior merged in groups of psi_group
+            def coarsen(mass):
+                interior = mass[:, 1:-1]
+                grouped = interior.reshape(len(mass), -1, self.psi_group).sum(axis=2)
+                return np.maximum(np.hstack([mass[:, :1], grouped, mass[:, -1:]]), PSI_EPSILON)
+            actual, expected = coarsen(observed), coarsen(reference)
+            psi = ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+            mean = total_sum / weight
+            std = np.sqrt(np.maximum(total_squares / weight - mean ** 2, 0.0))
+
+            for i, name in enumerate(self.feature_names):
+                quantiles = self._quantiles(counts[i], [0.05, 0.5, 0.95]) * self.scale[i] + self.center[i]
+                status = 'drift' if psi[i] > PSI_DRIFT else 'warning' if psi[i] > PSI_WARNING else 'ok'
+                features[name] = {
+                    'psi': round(float(psi[i]), 4),
+                    'ks': round(float(ks[i]), 4),
+                    'status': status,
+                    'mean': float(mean[i] * self.scale[i] + self.center[i]),
+                    'std': float(std[i] * self.scale[i]),
+                    'p05': float(quantiles[0]),
+                    'p50': float(quantiles[1]),
+                    'p95': float(quantiles[2]),
+                    'out_of_range_fraction': round(float(observed[i, 0] + observed[i, -1]), 4),
+                    'reference_median': float(self.center[i])
+                }
+
+        return {
+            'rows': rows,
+            'effective_rows': round(weight, 1),
+            'half_life_rows': self.half_life_rows,
+            'reference': 'scaler_info',
+            'features': features,
+            'drifting_features': sorted(name for name, f in features.items() if f['status'] == 'drift'),
+            'defaulted_inputs': defaults
+        }
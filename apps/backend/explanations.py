@@ -0,0 +1,137 @@
+"""
+Prediction Explanations for Heat Demand Prediction API
+Caches per-building SHAP contributions and ranks global feature importances
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def rank_importances(feature_importance: Dict[str, float], top_n: Optional[int] = None) -> List[Dict]:
+    """
+    Sort a feature -> importance mapping into the list format served to the frontend
+
+    Args:
+        feature_importance: Importance per feature (e.g. model_info['feature_importance'])
+        top_n: Keep only the most important features
+
+    Returns:
+        List of {'feature', 'importance'} ordered by decreasing importance
+    """
+    ranked = sorted(feature_importance.items(), key=lambda item: item[1], reverse=True)
+    return [{'feature': feature, 'importance': importance} for feature, importance in ranked[:top_n]]
+
+
+def top_contributors(contributions: np.ndarray, feature_names: List[str], top_n: int = 5) -> List[Dict]:
+    """
+    Rank features by mean absolute contribution over a block of rows
+
+    Args:
+        contributions: SHAP values (rows x features)
+        feature_names: Column names
+        top_n: Number of features returned
+
+    Returns:
+        List of {'feature', 'mean_abs_contribution', 'mean_contribution'}
+    """
+    mean_abs = np.abs(contributions).mean(axis=0)
+    mean = contributions.mean(axis=0)
+    order = np.argsort(-mean_abs)[:top_n]
+    return [
+        {
+            'feature': feature_names[i],
+            'mean_abs_contribution': float(mean_abs[i]),
+            'mean_contribution': float(mean[i])
+        }
+        for i in order
+    ]
+
+
+class ExplanationCache:
+    """
+    LRU cache of per-building SHAP blocks
+
+    Entries are keyed by the same building signature used for cached
+    predictions (building settings, weather version, horizon and start hour)
+    plus the model version, so a new forecast or a model reload yields a
+    fresh explanation. Cache misses from one request are explained together
+    in a single batched SHAP call.
+    """
+
+    def __init__(
+        self,
+        explain_fn: Callable[[List[Dict], int, Optional[object]], Dict],
+        signature_fn: Callable[[Dict, int, str], str],
+        max_entries: int = 10000
+    ):
+        """
+        Args:
+            explain_fn: Takes (buildings, horizon, start) and returns 'contributions'
+                (buildings x horizon x features), 'expected_value' (buildings x horizon) and 'building_ids'
+            signature_fn: Takes (building, horizon, start hour ISO string) and returns a cache key
+            max_entries: Number of building blocks kept
+        """
+        self.explain_fn = explain_fn
+        self.signature_fn = signature_fn
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def explain(self, buildings: List[Dict], horizon: int, start, model_version: str = '') -> Dict:
+        """
+        Return SHAP blocks for every building, computing only the uncached ones
+
+        Args:
+            buildings: Building entries (each with a 'buildingId')
+            horizon: Hours per building
+            start: First prediction time (datetime); its hour is part of the key
+            model_version: Included in the key so a model reload invalidates entries
+
+        Returns:
+            Dict with 'contributions' and 'expected_value' per building id, plus 'cached' and 'computed' counts
+        """
+        start_hour = start.replace(minute=0, second=0, microsecond=0).isoformat()
+        keys = {
+            str(b['buildingId']): self.signature_fn(b, horizon, start_hour) + model_version
+            for b in buildings
+        }
+
+        with self._lock:
+            missing = [b for b in buildings if keys[str(b['buildingId'])] not in self._entries]
+
+        if missing:
+            batch = self.explain_fn(missing, horizon, start)
+            with self._lock:
+                for i, building_id in enumerate(batch['building_ids']):
+                    self._entries[keys[str(building_id)]] = (
+                        batch['contributions'][i], batch['expected_value'][i]
+                    )
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        contributions, expected = {}, {}
+        with self._lock:
+            for building_id, key in keys.items():
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    contributions[building_id], expected[building_id] = self._entries[key]
+            self.hits += len(buildings) - len(missing)
+            self.misses += len(missing)
+
+        return {
+            'contributions': contributions,
+            'expected_value': expected,
+            'cached': len(buildings) - len(missing),
+            'computed': len(missing)
+        }
+
+    def describe(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,340 @@
+"""
+Feature Definitions for Heat Demand Prediction
+Declares each model feature once and compiles it for bulk training and incremental serving
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Meteorological seasons: Dec-Feb winter (0), Mar-May spring (1), Jun-Aug summer (2), Sep-Nov autumn (3)
+SEASON_BY_MONTH = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+# Calendar attributes derived from the timestamp
+CALENDAR_ATTRIBUTES = ('hour', 'day_of_week', 'month', 'day_of_year', 'is_weekend', 'is_workday', 'season')
+
+
+def _calendar_arrays(timestamps) -> Dict[str, np.ndarray]:
+    """Vectorized calendar attributes for a DatetimeIndex"""
+    index = pd.DatetimeIndex(timestamps)
+    day_of_week = index.dayofweek.to_numpy()
+    is_weekend = (day_of_week >= 5).astype(np.int64)
+    month = index.month.to_numpy()
+    return {
+        'hour': index.hour.to_numpy(),
+        'day_of_week': day_of_week,
+        'month': month,
+        'day_of_year': index.dayofyear.to_numpy(),
+        'is_weekend': is_weekend,
+        'is_workday': 1 - is_weekend,
+        'season': SEASON_BY_MONTH[month]
+    }
+
+
+class Feature:
+    """
+    Declarative description of one model feature
+
+    Kinds:
+        input: copy of a raw column
+        heating_degree: max(0, base - source)
+        calendar: calendar attribute of the timestamp (see CALENDAR_ATTRIBUTES)
+        cyclic: sin/cos encoding of a calendar attribute over a period
+        lag: source value `periods` rows earlier (the first value until enough history exists)
+        diff: source minus its value `periods` rows earlier (0 until enough history exists)
+        rolling_mean: mean of the last `window` source values including the current one
+        one_hot: 1 where source equals `value`, else 0
+    """
+
+    def __init__(self, name: str, kind: str, source: Optional[str] = None, description: str = '', **params):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.description = description
+        self.params = params
+
+    @property
+    def history(self) -> int:
+        """Number of past rows of the source this feature needs"""
+        if self.kind in ('lag', 'diff'):
+            return self.params['periods']
+        if self.kind == 'rolling_mean':
+            return self.params['window'] - 1
+        return 0
+
+    def __repr__(self):
+        return f"Feature({self.name!r}, {self.kind!r}, source={self.source!r})"
+
+
+def input_feature(name, source=None, description=''):
+    return Feature(name, 'input', source or name, description)
+
+
+def heating_degree(name, source, base, description=''):
+    return Feature(name, 'heating_degree', source, description, base=base)
+
+
+def calendar(name, attribute, description=''):
+    if attribute not in CALENDAR_ATTRIBUTES:
+        raise ValueError(f"Unknown calendar attribute: {attribute}")
+    return Feature(name, 'calendar', None, description, attribute=attribute)
+
+
+def cyclic(name, attribute, period, function, description=''):
+    if function not in ('sin', 'cos'):
+        raise ValueError("Cyclic function must be 'sin' or 'cos'")
+    return Feature(name, 'cyclic', None, description, attribute=attribute, period=period, function=function)
+
+
+def lag(name, source, periods, description=''):
+    return Feature(name, 'lag', source, description, periods=periods)
+
+
+def diff(name, source, periods, description=''):
+    return Feature(name, 'diff', source, description, periods=periods)
+
+
+def rolling_mean(name, source, window, description=''):
+    return Feature(name, 'rolling_mean', source, description, window=window)
+
+
+def one_hot(name, source, value, description=''):
+    return Feature(name, 'one_hot', source, description, value=value)
+
+
+class FeatureSet:
+    """
+    Ordered collection of features compiled into two equivalent implementations
+
+    ``compute`` evaluates the whole set over a frame with column-wise NumPy /
+    grouped pandas operations (training and batch scoring). ``stream`` returns
+    a stateful evaluator that produces one row at a time from a bounded
+    history (serving). Both share the same definitions and edge-case rules, so
+    a model sees identical features in training and in production.
+    """
+
+    def __init__(self, name: str, features: List[Feature]):
+        self.name = name
+        self.features = features
+        self.names = [feature.name for feature in features]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate feature names in {name}")
+        self.sources = sorted({
+            f.source for f in features if f.source is not None and f.kind != 'one_hot'
+        })
+        self.categorical_sources = sorted({f.source for f in features if f.kind == 'one_hot'})
+        self.history = max([feature.history for feature in features] + [0])
+
+    def describe(self) -> Dict[str, str]:
+        """Feature name -> description"""
+        return {feature.name: feature.description for feature in self.features}
+
+    def compute(
+        self,
+        frame: pd.DataFrame,
+        timestamp_column: str = 'timestamp',
+        group_column: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Evaluate every feature over a frame in one vectorized pass
+
+        Rows are ordered by (group, timestamp) internally; history-based
+        features never cross group boundaries. The result keeps the input's
+        index and row order.
+
+        Args:
+            frame: Raw inputs with the timestamp, every source column and the optional group column
+            timestamp_column: Column holding the row timestamps
+            group_column: Column identifying independent series (e.g. building)
+
+        Returns:
+            DataFrame with one column per feature in declaration order
+        """
+        sort_columns = ([group_column] if group_column else []) + [timestamp_column]
+        ordered = frame.sort_values(sort_columns, kind='stable')
+        n = len(ordered)
+
+        if group_column:
+            codes = pd.factorize(ordered[group_column])[0]
+        else:
+            codes = np.zeros(n, dtype=np.int64)
+        # Row position within its group and the index of the group's first row
+        group_start = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.empty(0, dtype=np.int64)
+        starts = np.repeat(group_start, np.diff(np.r_[group_start, n]))
+        position = np.arange(n) - starts
+
+        calendar_values = _calendar_arrays(ordered[timestamp_column]) if n else {
+            attribute: np.empty(0, dtype=np.int64) for attribute in CALENDAR_ATTRIBUTES
+        }
+        sources = {
+            source: ordered[source].to_numpy(dtype=np.float64) for source in self.sources
+        }
+        cumulative = {}
+
+        def shifted(values, periods):
+            """values[i - periods] within the group, the group's first value where unavailable"""
+            index = np.arange(n) - periods
+            return values[np.where(position >= periods, index, starts)]
+
+        columns = {}
+        for feature in self.features:
+            kind, params = feature.kind, feature.params
+            if kind == 'input':
+                values = sources[feature.source]
+            elif kind == 'heating_degree':
+                values = np.maximum(0.0, params['base'] - sources[feature.source])
+            elif kind == 'calendar':
+                values = calendar_values[params['attribute']]
+            elif kind == 'cyclic':
+                angle = 2 * np.pi * calendar_values[params['attribute']] / params['period']
+                values = np.sin(angle) if params['function'] == 'sin' else np.cos(angle)
+            elif kind == 'lag':
+                values = shifted(sources[feature.source], params['periods'])
+            elif kind == 'diff':
+                source = sources[feature.source]
+                values = np.where(
+                    position >= params['periods'], source - shifted(source, params['periods']), 0.0
+                )
+            elif kind == 'rolling_mean':
+                window = params['window']
+                if feature.source not in cumulative:
+                    cumulative[feature.source] = np.r_[0.0, np.cumsum(sources[feature.source])]
+                total = cumulative[feature.source]
+                # Sum of the last min(window, position + 1) values via prefix sums
+                count = np.minimum(position + 1, window)
+                values = (total[np.arange(1, n + 1)] - total[np.arange(1, n + 1) - count]) / count
+            elif kind == 'one_hot':
+                values = (ordered[feature.source].to_numpy() == params['value']).astype(np.int64)
+            else:
+                raise ValueError(f"Unknown feature kind: {kind}")
+            columns[feature.name] = values
+
+        result = pd.DataFrame(columns, index=ordered.index, columns=self.names)
+        return result.reindex(frame.index)
+
+    def stream(self) -> 'FeatureStream':
+        """Create an incremental evaluator for one series (e.g. one building)"""
+        return FeatureStream(self)
+
+
+class FeatureStream:
+    """
+    Incremental evaluation of a FeatureSet, one timestamped observation at a time
+
+    Keeps only the last ``history`` values of each source (plus running sums
+    for rolling means), so each update costs O(number of features).
+    """
+
+    def __init__(self, feature_set: FeatureSet):
+        self.feature_set = feature_set
+        self._history = {source: deque(maxlen=feature_set.history + 1) for source in feature_set.sources}
+        self._first: Dict[str, float] = {}
+        self._windows = {
+            (f.source, f.params['window']): [deque(maxlen=f.params['window']), 0.0]
+            for f in feature_set.features if f.kind == 'rolling_mean'
+        }
+
+    def update(self, values: Dict, timestamp: datetime) -> Dict[str, float]:
+        """
+        Add one observation and return the features for it
+
+        Args:
+            values: Source (and categorical) values for this row
+            timestamp: Row timestamp
+
+        Returns:
+            Dict of feature values in declaration order
+        """
+        for source, history in self._history.items():
+            value = float(values[source])
+            self._first.setdefault(source, value)
+            history.append(value)
+        for (source, window), state in self._windows.items():
+            buffer = state[0]
+            if len(buffer) == window:
+                state[1] -= buffer[0]
+            buffer.append(float(values[source]))
+            state[1] += buffer[-1]
+
+        calendar_values = {
+            'hour': timestamp.hour,
+            'day_of_week': timestamp.weekday(),
+            'month': timestamp.month,
+            'day_of_year': timestamp.timetuple().tm_yday,
+            'is_weekend': 1 if timestamp.weekday() >= 5 else 0,
+            'is_workday': 0 if timestamp.weekday() >= 5 else 1,
+            'season': int(SEASON_BY_MONTH[timestamp.month])
+        }
+
+        row = {}
+        for feature in self.feature_set.features:
+            kind, params = feature.kind, feature.params
+            if kind == 'input':
+                row[feature.name] = self._history[feature.source][-1]
+            elif kind == 'heating_degree':
+                row[feature.name] = max(0.0, params['base'] - self._history[feature.source][-1])
+            elif kind == 'calendar':
+                row[feature.name] = calendar_values[params['attribute']]
+            elif kind == 'cyclic':
+                angle = 2 * np.pi * calendar_values[params['attribute']] / params['period']
+                row[feature.name] = float(np.sin(angle) if params['function'] == 'sin' else np.cos(angle))
+            elif kind in ('lag', 'diff'):
+                history = self._history[feature.source]
+                periods = params['periods']
+                available = len(history) > periods
+                if kind == 'lag':
+                    row[feature.name] = history[-1 - periods] if available else self._first[feature.source]
+                else:
+                    row[feature.name] = history[-1] - history[-1 - periods] if available else 0.0
+            elif kind == 'rolling_mean':
+                buffer, total = self._windows[(feature.source, params['window'])]
+                row[feature.name] = total / len(buffer)
+            elif kind == 'one_hot':
+                row[feature.name] = 1 if values[feature.source] == params['value'] else 0
+            else:
+                raise ValueError(f"Unknown feature kind: {kind}")
+        return row
+
+
+# Features of the deployed API model (best_heating_model.pkl), computed from the outdoor temperature series
+WEATHER_LAG_FEATURES = FeatureSet('weather_lags', [
+    input_feature('outdoor_temp_synthetic', description='Current outdoor temperature (°C)'),
+    heating_degree('hdh', 'outdoor_temp_synthetic', base=17.0, description='Heating degree hours (base 17°C)'),
+    calendar('hour', 'hour', description='Hour of day (0-23)'),
+    calendar('day_of_week', 'day_of_week', description='Day of week (0=Monday, 6=Sunday)'),
+    calendar('month', 'month', description='Month (1-12)'),
+    calendar('is_weekend', 'is_weekend', description='Weekend flag (0=weekday, 1=weekend)'),
+    lag('outdoor_temp_lag_1', 'outdoor_temp_synthetic', 1, description='Temperature 1 hour ago (°C)'),
+    lag('outdoor_temp_lag_2', 'outdoor_temp_synthetic', 2, description='Temperature 2 hours ago (°C)'),
+    lag('outdoor_temp_lag_3', 'outdoor_temp_synthetic', 3, description='Temperature 3 hours ago (°C)'),
+    diff('outdoor_temp_diff_1', 'outdoor_temp_synthetic', 1, description='Temperature change from 1 hour ago (°C)'),
+    diff('outdoor_temp_diff_2', 'outdoor_temp_synthetic', 2, description='Temperature change from 2 hours ago (°C)')
+])
+
+# Archetype training set (building_data/processed/heating_ml_features.csv)
+BUILDING_TYPES = ('bungalow', 'detached', 'end_terrace', 'mid_terrace', 'semi_detached')
+
+HEATING_ML_FEATURES = FeatureSet('heating_ml', [
+    cyclic('hour_sin', 'hour', 24, 'sin', description='Hour of day, sine encoding'),
+    cyclic('hour_cos', 'hour', 24, 'cos', description='Hour of day, cosine encoding'),
+    cyclic('day_of_year_sin', 'day_of_year', 365, 'sin', description='Day of year, sine encoding'),
+    cyclic('day_of_year_cos', 'day_of_year', 365, 'cos', description='Day of year, cosine encoding'),
+    calendar('day_of_week', 'day_of_week', description='Day of week (0=Monday, 6=Sunday)'),
+    calendar('month', 'month', description='Month (1-12)'),
+    calendar('is_weekend', 'is_weekend', description='Weekend flag (0=weekday, 1=weekend)'),
+    calendar('is_workday', 'is_workday', description='Workday flag (0=weekend, 1=weekday)'),
+    calendar('season_numeric', 'season', description='Season (0=winter, 1=spring, 2=summer, 3=autumn)'),
+    input_feature('outdoor_temp', description='Outdoor temperature (°C)'),
+    lag('heating_demand_lag1', 'heating_demand_kwh', 1, description='Heat demand 1 hour ago (kWh)'),
+    lag('heating_demand_lag24', 'heating_demand_kwh', 24, description='Heat demand 24 hours ago (kWh)'),
+    rolling_mean('heating_demand_rolling_3h', 'heating_demand_kwh', 3, description='3-hour mean heat demand including the current hour (kWh)'),
+    rolling_mean('heating_demand_rolling_24h', 'heating_demand_kwh', 24, description='24-hour mean heat demand including the current hour (kWh)')
+] + [
+    one_hot(f'building_{building_type}', 'building_type', building_type,
+            description=f'Archetype flag ({building_type})')
+    for building_type in BUILDING_TYPES
+])
+
+FEATURE_SETS = {feature_set.name: feature_set for feature_set in (WEATHER_LAG_FEATURES, HEATING_ML_FEATURES)}
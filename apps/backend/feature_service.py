@@ -4,18 +4,75 @@ Converts frontend weather data to model-ready features
 """
 import pandas as pd
 import numpy as np
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Union, Optional
+from typing import Callable, Dict, List, Tuple, Union, Optional
+from feature_definitions import WEATHER_LAG_FEATURES
+
+# Values used when the frontend omits a weather field (or sends one that cannot be parsed)
+WEATHER_DEFAULTS = {
+    'temperature': 15.0,
+    'windSpeed': 5.0,
+    'humidity': 60.0,
+    'solarRadiation': 400.0,
+    'cloudCover': 50.0,
+    'pressure': 101325.0,
+    'precipitation': 0.0
+}
+
+# Building characteristics assumed when the frontend omits them (the training building)
+BUILDING_DEFAULTS = {
+    'floorArea': 15000.0,
+    'insulationLevel': 'standard',
+    'occupancyRate': 85.0,
+    'buildingAge': 25.0,
+    'thermostatSetpoint': 21.0
+}
+
+# Insulation affects heat loss
+INSULATION_FACTORS = {
+    'poor': 1.4,      # 40% more heat loss
+    'basic': 1.0,     # Frontend levels without a separate factor
+    'standard': 1.0,  # Baseline
+    'good': 1.0,
+    'excellent': 0.7  # 30% less heat loss
+}
 
 class FeatureService:
     """
     Service to convert weather data and time information into model features
+    
+    Feature definitions live in feature_definitions.WEATHER_LAG_FEATURES, the
+    same declarations used to build training data, so serving cannot drift
+    from training.
     """
     
     def __init__(self):
         """Initialize the feature service"""
         self.base_temp = 17.0  # Base temperature for heating degree hours
+        self.feature_set = WEATHER_LAG_FEATURES
+        # Called with {input name: rows} whenever defaults stand in for missing inputs
+        self.default_listener: Optional[Callable[[Dict[str, int]], None]] = None
         
+    def _extract_weather(self, weather_data: Dict[str, Union[int, float]], defaulted: Optional[Counter] = None) -> Dict[str, float]:
+        """Extract weather data with defaults and robust type-casting"""
+        if defaulted is not None:
+            for field in WEATHER_DEFAULTS:
+                if field not in weather_data:
+                    defaulted[f'weather.{field}'] += 1
+        try:
+            return {field: float(weather_data.get(field, default)) for field, default in WEATHER_DEFAULTS.items()}
+        except (ValueError, TypeError):
+            # Fallback to sensible defaults if conversion fails completely
+            if defaulted is not None:
+                defaulted['weather.unparseable'] += 1
+            return dict(WEATHER_DEFAULTS)
+    
+    def _report_defaults(self, defaulted: Counter):
+        """Pass one aggregated count of defaulted inputs per call to the listener"""
+        if self.default_listener is not None and defaulted:
+            self.default_listener(dict(defaulted))
+    
     def create_single_prediction_features(
         self, 
         weather_data: Dict[str, Union[int, float]], 
@@ -25,6 +82,8 @@ class FeatureService:
         """
         Create features for a single prediction point
         
+        With no history, lags assume a stable recent temperature and differences are zero.
+        
         Args:
             weather_data: Dictionary with weather information from frontend
             timestamp: Specific timestamp for prediction (defaults to now)
@@ -35,42 +94,11 @@ class FeatureService:
         """
         if timestamp is None:
             timestamp = datetime.now()
-            
-        # Extract weather data with defaults and robust type-casting
-        try:
-            outdoor_temp = float(weather_data.get('temperature', 15.0))
-            wind_speed = float(weather_data.get('windSpeed', 5.0))
-            humidity = float(weather_data.get('humidity', 60.0))
-            solar_radiation = float(weather_data.get('solarRadiation', 400.0))
-            cloud_cover = float(weather_data.get('cloudCover', 50.0))
-            pressure = float(weather_data.get('pressure', 101325.0))
-            precipitation = float(weather_data.get('precipitation', 0.0))
-        except (ValueError, TypeError):
-            # Fallback to sensible defaults if conversion fails completely
-            outdoor_temp, wind_speed, humidity = 15.0, 5.0, 60.0
-            solar_radiation, cloud_cover, pressure, precipitation = 400.0, 50.0, 101325.0, 0.0
         
-        # Create base features
-        features = {
-            # Temperature features
-            'outdoor_temp_synthetic': outdoor_temp,
-            'hdh': max(0, self.base_temp - outdoor_temp),  # Heating degree hours
-            
-            # Time-based features
-            'hour': timestamp.hour,
-            'day_of_week': timestamp.weekday(),
-            'month': timestamp.month,
-            'is_weekend': 1 if timestamp.weekday() >= 5 else 0,
-            
-            # Temperature lag features (simplified - assume stable recent temperature)
-            'outdoor_temp_lag_1': outdoor_temp,
-            'outdoor_temp_lag_2': outdoor_temp, 
-            'outdoor_temp_lag_3': outdoor_temp,
-            
-            # Temperature difference features (assume stable temperature)
-            'outdoor_temp_diff_1': 0.0,
-            'outdoor_temp_diff_2': 0.0
-        }
+        defaulted = Counter()
+        outdoor_temp = self._extract_weather(weather_data, defaulted)['temperature']
+        self._report_defaults(defaulted)
+        features = self.feature_set.stream().update({'outdoor_temp_synthetic': outdoor_temp}, timestamp)
         
         # Apply building scaling if building data is provided
         if building_data:
@@ -78,144 +106,179 @@ class FeatureService:
         
         return pd.DataFrame([features])
     
-    def _apply_building_scaling(self, features: Dict, building_data: Dict) -> Dict:
+    def building_scaling_arrays(
+        self,
+        floor_area,
+        insulation_factor,
+        occupancy_rate,
+        building_age,
+        thermostat_setpoint
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
         """
-        Apply building-specific scaling to features
+        Vectorized heating degree base temperature and demand scaling for many buildings
         
         The model was trained on a small building (~15,000 m² equivalent)
         We need to scale features based on actual building characteristics
-        """
-        # Extract building parameters with defaults and type-casting
-        try:
-            floor_area = float(building_data.get('floorArea', 15000))
-            insulation_level = str(building_data.get('insulationLevel', 'standard')).lower()
-            occupancy_rate = float(building_data.get('occupancyRate', 85))
-            building_age = float(building_data.get('buildingAge', 25))
-            thermostat_setpoint = float(building_data.get('thermostatSetpoint', 21))
-        except (ValueError, TypeError):
-            floor_area, insulation_level, occupancy_rate, building_age, thermostat_setpoint = 15000.0, 'standard', 85.0, 25.0, 21.0
         
-        # Calculate scaling factors
+        Args:
+            floor_area, insulation_factor, occupancy_rate, building_age, thermostat_setpoint:
+                Scalars or equal-length arrays (insulation as a factor from INSULATION_FACTORS)
         
+        Returns:
+            (adjusted base temperatures, combined scaling factors, individual factors)
+        """
         # 1. Area scaling factor (linear relationship)
-        area_factor = floor_area / 15000.0  # Base area from training data
+        area_factor = np.asarray(floor_area, dtype=np.float64) / 15000.0  # Base area from training data
         
         # 2. Insulation factor (affects heat loss)
-        insulation_factors = {
-            'poor': 1.4,      # 40% more heat loss
-            'standard': 1.0,  # Baseline
-            'excellent': 0.7  # 30% less heat loss
-        }
-        insulation_factor = insulation_factors.get(insulation_level, 1.0)
+        insulation_factor = np.asarray(insulation_factor, dtype=np.float64)
         
         # 3. Occupancy factor (more people = more heat)
-        occupancy_factor = 0.8 + (occupancy_rate / 100.0) * 0.4  # Range: 0.8 to 1.2
+        occupancy_factor = 0.8 + (np.asarray(occupancy_rate, dtype=np.float64) / 100.0) * 0.4  # Range: 0.8 to 1.2
         
         # 4. Age factor (older buildings less efficient)
-        age_factor = 1.0 + max(0, (building_age - 25) * 0.01)  # 1% increase per year over 25
+        age_factor = 1.0 + np.maximum(0, (np.asarray(building_age, dtype=np.float64) - 25) * 0.01)  # 1% increase per year over 25
         
         # 5. Thermostat factor (higher setpoint = more demand)
+        thermostat_setpoint = np.asarray(thermostat_setpoint, dtype=np.float64)
         setpoint_factor = 1.0 + (thermostat_setpoint - 21) * 0.05  # 5% per degree
         
         # Combined scaling factor
         total_scaling = area_factor * insulation_factor * occupancy_factor * age_factor * setpoint_factor
         
-        # Apply scaling to temperature-sensitive features
-        # Scale HDH (heating degree hours) as it directly relates to heat demand
-        original_hdh = features['hdh']
-        features['hdh'] = original_hdh * total_scaling
-        
         # Also adjust the base temperature calculation slightly based on thermostat setting
         adjusted_base_temp = self.base_temp + (thermostat_setpoint - 21) * 0.5
-        features['hdh'] = max(0, adjusted_base_temp - features['outdoor_temp_synthetic']) * total_scaling
+        
+        factors = {
+            'area': area_factor, 'insulation': insulation_factor, 'occupancy': occupancy_factor,
+            'age': age_factor, 'thermostat': setpoint_factor
+        }
+        return adjusted_base_temp, total_scaling, factors
+    
+    def _building_scaling(self, building_data: Dict) -> Tuple[float, float]:
+        """
+        Calculate the heating degree base temperature and demand scaling for one building
+        
+        Returns:
+            (adjusted base temperature, combined scaling factor)
+        """
+        # Extract building parameters with defaults and type-casting
+        try:
+            floor_area = float(building_data.get('floorArea', 15000))
+            insulation_level = str(building_data.get('insulationLevel', 'standard')).lower()
+            occupancy_rate = float(building_data.get('occupancyRate', 85))
+            building_age = float(building_data.get('buildingAge', 25))
+            thermostat_setpoint = float(building_data.get('thermostatSetpoint', 21))
+        except (ValueError, TypeError):
+            floor_area, insulation_level, occupancy_rate, building_age, thermostat_setpoint = 15000.0, 'standard', 85.0, 25.0, 21.0
+        
+        adjusted_base_temp, total_scaling, factors = self.building_scaling_arrays(
+            floor_area, INSULATION_FACTORS.get(insulation_level, 1.0),
+            occupancy_rate, building_age, thermostat_setpoint
+        )
         
         # Log the scaling for debugging
-        print(f"Building scaling applied: area={area_factor:.2f}, insulation={insulation_factor:.2f}, "
-              f"occupancy={occupancy_factor:.2f}, age={age_factor:.2f}, thermostat={setpoint_factor:.2f}, "
+        print(f"Building scaling applied: area={factors['area']:.2f}, insulation={factors['insulation']:.2f}, "
+              f"occupancy={factors['occupancy']:.2f}, age={factors['age']:.2f}, thermostat={factors['thermostat']:.2f}, "
               f"total={total_scaling:.2f}")
         
+        return float(adjusted_base_temp), float(total_scaling)
+    
+    def _apply_building_scaling(self, features, building_data: Dict):
+        """
+        Apply building-specific scaling to features
+        
+        Scales HDH (heating degree hours) as it directly relates to heat demand.
+        Works on a feature dict or on a whole DataFrame of one building's rows.
+        """
+        adjusted_base_temp, total_scaling = self._building_scaling(building_data)
+        features['hdh'] = np.maximum(0, adjusted_base_temp - features['outdoor_temp_synthetic']) * total_scaling
         return features
     
-    def create_horizon_prediction_features(
+    def create_horizon_features_from_arrays(
         self,
-        current_weather: Dict[str, Union[int, float]],
-        weather_forecast: List[Dict[str, Union[int, float, str]]],
-        horizon_hours: int = 24,
-        building_data: Optional[Dict[str, Union[int, float, str]]] = None
+        temperatures: np.ndarray,
+        start: Optional[datetime] = None,
+        base_temp: Optional[np.ndarray] = None,
+        scaling: Optional[np.ndarray] = None
     ) -> pd.DataFrame:
         """
-        Create features for multi-hour horizon prediction
+        Create horizon features from hourly temperature arrays without per-hour dictionaries
         
         Args:
-            current_weather: Current weather conditions
-            weather_forecast: List of hourly weather forecasts
-            horizon_hours: Number of hours to predict (24 or 48)
+            temperatures: Outdoor temperature per building and hour (buildings x horizon)
+            start: First prediction time shared by every building (defaults to now)
+            base_temp: Adjusted heating degree base per building (NaN leaves a building unscaled)
+            scaling: Demand scaling per building
             
         Returns:
-            DataFrame with features for each hour in the horizon
+            DataFrame with one row per building and hour, stacked building by building
         """
-        features_list = []
-        now = datetime.now()
+        if start is None:
+            start = datetime.now()
+        n, horizon_hours = temperatures.shape
         
-        # Ensure we have enough forecast data
-        if len(weather_forecast) < horizon_hours:
-            # Extend forecast by repeating the last available forecast
-            last_forecast = weather_forecast[-1] if weather_forecast else current_weather
-            while len(weather_forecast) < horizon_hours:
-                weather_forecast.append(last_forecast.copy())
+        prediction_times = [start + timedelta(hours=hour) for hour in range(horizon_hours)]
+        frame = pd.DataFrame({
+            'building': np.repeat(np.arange(n), horizon_hours),
+            'timestamp': np.tile(np.array(prediction_times, dtype='datetime64[us]'), n),
+            'outdoor_temp_synthetic': temperatures.ravel()
+        })
         
-        for hour in range(horizon_hours):
-            prediction_time = now + timedelta(hours=hour)
-            
-            # Use current weather for first hour, then forecast
-            if hour == 0:
-                weather_data = current_weather
-            else:
-                # Use forecast data (hour-1 because forecast starts from next hour)
-                forecast_idx = min(hour - 1, len(weather_forecast) - 1)
-                weather_data = weather_forecast[forecast_idx]
-            
-            # Create features for this time point
-            hour_features = self.create_single_prediction_features(
-                weather_data, prediction_time, building_data
-            )
-            
-            # Add hour index for reference
-            hour_features['prediction_hour'] = hour
-            hour_features['timestamp'] = prediction_time.isoformat()
-            
-            features_list.append(hour_features)
+        # Lags and differences are computed per building, never across buildings
+        all_features = self.feature_set.compute(frame, group_column='building')
         
-        # Combine all hours into single DataFrame
-        all_features = pd.concat(features_list, ignore_index=True)
+        # Heating degree base and scaling per row, kept for reference (the drift monitor builds its hdh reference from them)
+        all_features['hdh_base_temp'] = self.base_temp
+        all_features['hdh_scaling'] = 1.0
         
-        # Now add proper lag and diff features based on the sequence
-        all_features = self._add_temporal_features(all_features)
+        # Apply building scaling as one vectorized update per batch
+        if base_temp is None:
+            return self._add_reference_columns(all_features, prediction_times, n)
+        scaled = np.repeat(~np.isnan(base_temp), horizon_hours)
+        if scaled.any():
+            rows_base = np.repeat(base_temp, horizon_hours)[scaled]
+            rows_scaling = np.repeat(scaling, horizon_hours)[scaled]
+            all_features.loc[scaled, 'hdh'] = (
+                np.maximum(0, rows_base - all_features.loc[scaled, 'outdoor_temp_synthetic'].to_numpy()) * rows_scaling
+            )
+            all_features.loc[scaled, 'hdh_base_temp'] = rows_base
+            all_features.loc[scaled, 'hdh_scaling'] = rows_scaling
         
-        return all_features
+        return self._add_reference_columns(all_features, prediction_times, n)
     
-    def _add_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def create_decoded_features(
+        self,
+        weather: np.ndarray,
+        start: Optional[datetime] = None,
+        building_params: Optional[np.ndarray] = None,
+        defaulted: Optional[Counter] = None
+    ) -> pd.DataFrame:
         """
-        Add proper temporal lag and difference features to a time series DataFrame
+        Create horizon features from decoded request arrays (see request_decoding)
         
         Args:
-            df: DataFrame with hourly features
+            weather: Weather per building and hour (buildings x hours x weather fields), temperature first
+            start: First prediction time shared by every building (defaults to now)
+            building_params: Building fields per building in building_scaling_arrays order
+                (a NaN row leaves that building unscaled)
+            defaulted: Counts of inputs that were defaulted while decoding, passed to the listener
             
         Returns:
-            DataFrame with proper temporal features
+            DataFrame with one row per building and hour, stacked building by building
         """
-        df = df.copy()
-        
-        # Calculate proper temperature lags
-        df['outdoor_temp_lag_1'] = df['outdoor_temp_synthetic'].shift(1).fillna(df['outdoor_temp_synthetic'].iloc[0])
-        df['outdoor_temp_lag_2'] = df['outdoor_temp_synthetic'].shift(2).fillna(df['outdoor_temp_synthetic'].iloc[0])
-        df['outdoor_temp_lag_3'] = df['outdoor_temp_synthetic'].shift(3).fillna(df['outdoor_temp_synthetic'].iloc[0])
-        
-        # Calculate proper temperature differences
-        df['outdoor_temp_diff_1'] = df['outdoor_temp_synthetic'].diff(1).fillna(0)
-        df['outdoor_temp_diff_2'] = df['outdoor_temp_synthetic'].diff(2).fillna(0)
-        
-        return df
+        if defaulted:
+            self._report_defaults(defaulted)
+        if building_params is None:
+            return self.create_horizon_features_from_arrays(weather[..., 0], start)
+        base_temp, scaling, _ = self.building_scaling_arrays(*building_params.T)
+        return self.create_horizon_features_from_arrays(weather[..., 0], start, base_temp, np.nan_to_num(scaling, nan=1.0))
+    
+    def _add_reference_columns(self, all_features: pd.DataFrame, prediction_times: List[datetime], n: int) -> pd.DataFrame:
+        """Add hour index and timestamp for reference"""
+        all_features['prediction_hour'] = np.tile(np.arange(len(prediction_times)), n)
+        all_features['timestamp'] = np.tile(np.array([t.isoformat() for t in prediction_times], dtype=object), n)
+        return all_features
     
     def validate_features(self, features: pd.DataFrame, expected_columns: List[str]) -> pd.DataFrame:
         """
@@ -229,21 +292,22 @@ class FeatureService:
             DataFrame with columns in correct order and any missing columns filled
         """
         # Ensure all expected columns are present
-        for col in expected_columns:
-            if col not in features.columns:
-                # Add missing column with default value
-                if 'temp' in col:
-                    features[col] = 15.0  # Default temperature
-                elif 'hdh' in col:
-                    features[col] = 2.0   # Default heating degree hours
-                elif 'hour' in col:
-                    features[col] = 12    # Default hour
-                elif 'month' in col:
-                    features[col] = 6     # Default month
-                elif 'day' in col:
-                    features[col] = 1     # Default day
-                else:
-                    features[col] = 0.0   # Default zero
+        missing = [col for col in expected_columns if col not in features.columns]
+        self._report_defaults(Counter({col: len(features) for col in missing}))
+        for col in missing:
+            # Add missing column with default value
+            if 'temp' in col:
+                features[col] = 15.0  # Default temperature
+            elif 'hdh' in col:
+                features[col] = 2.0   # Default heating degree hours
+            elif 'hour' in col:
+                features[col] = 12    # Default hour
+            elif 'month' in col:
+                features[col] = 6     # Default month
+            elif 'day' in col:
+                features[col] = 1     # Default day
+            else:
+                features[col] = 0.0   # Default zero
         
         # Return columns in the expected order
         return features[expected_columns]
@@ -255,16 +319,4 @@ class FeatureService:
         Returns:
             Dictionary with feature descriptions
         """
-        return {
-            'outdoor_temp_synthetic': 'Current outdoor temperature (°C)',
-            'hdh': 'Heating degree hours (base 17°C)',
-            'hour': 'Hour of day (0-23)',
-            'day_of_week': 'Day of week (0=Monday, 6=Sunday)',
-            'month': 'Month (1-12)',
-            'is_weekend': 'Weekend flag (0=weekday, 1=weekend)',
-            'outdoor_temp_lag_1': 'Temperature 1 hour ago (°C)',
-            'outdoor_temp_lag_2': 'Temperature 2 hours ago (°C)',
-            'outdoor_temp_lag_3': 'Temperature 3 hours ago (°C)',
-            'outdoor_temp_diff_1': 'Temperature change from 1 hour ago (°C)',
-            'outdoor_temp_diff_2': 'Temperature change from 2 hours ago (°C)'
-        }
\ No newline at end of file
+        return self.feature_set.describe()
@@ -0,0 +1,458 @@
+"""
+Offline Fleet Forecast Job
+Scores a building roster against a forecast file across all cores and writes resumable partitioned Parquet
+
+Usage:
+    python fleet_forecast.py --roster buildings.json --forecasts forecasts.json --output-dir forecasts/
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_service import BUILDING_DEFAULTS, INSULATION_FACTORS, WEATHER_DEFAULTS, FeatureService
+from inference import predict_with_intervals, resolve_interval_config
+from weather_service import StaticWeatherProvider, WeatherCache, forecast_position
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bump when the output schema changes so existing checkpoints are not reused
+JOB_VERSION = 1
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Numeric building characteristics read from the roster (insulationLevel is mapped separately)
+NUMERIC_BUILDING_FIELDS = ['floorArea', 'occupancyRate', 'buildingAge', 'thermostatSetpoint']
+
+# Per-process state set by the pool initializer
+_worker: Dict = {}
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """Read a CSV or Parquet table"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def load_roster(path: str) -> pd.DataFrame:
+    """
+    Read a building roster
+
+    Accepts the JSON format used by BuildingRegistry.load_file (a list of
+    {'buildingId', 'location', 'buildingData'}) or a CSV/Parquet table with
+    buildingId and location columns plus optional building characteristic columns.
+
+    Returns:
+        DataFrame with buildingId, location, has_building_data and one column per building field
+    """
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        roster = pd.DataFrame({
+            'buildingId': [str(entry['buildingId']) for entry in entries],
+            'location': [entry['location'] for entry in entries]
+        })
+        building_data = pd.DataFrame([entry.get('buildingData') or {} for entry in entries], index=roster.index)
+        roster['has_building_data'] = [bool(entry.get('buildingData')) for entry in entries]
+    else:
+        table = read_table(path)
+        roster = pd.DataFrame({'buildingId': table['buildingId'].astype(str), 'location': table['location'].astype(str)})
+        building_data = table.drop(columns=['buildingId', 'location'])
+        fields = [field for field in BUILDING_DEFAULTS if field in building_data.columns]
+        roster['has_building_data'] = building_data[fields].notna().any(axis=1) if fields else False
+
+    for field in BUILDING_DEFAULTS:
+        roster[field] = building_data[field] if field in building_data.columns else np.nan
+    return roster
+
+
+def load_forecasts(path: str) -> Dict[str, List[Dict]]:
+    """
+    Read hourly forecasts per location
+
+    Accepts a JSON object {location: [hourly points]} or a long CSV/Parquet
+    table with a location column and one row per location and hour.
+    """
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return json.load(f)
+    table = read_table(path)
+    return {
+        str(location): group.drop(columns=['location']).to_dict('records')
+        for location, group in table.groupby('location', sort=False)
+    }
+
+
+def location_temperatures(
+    forecasts: Dict[str, List[Dict]],
+    locations: List[str],
+    start: datetime,
+    hours: int
+) -> np.ndarray:
+    """
+    Slice each location's hourly temperatures for the horizon starting at start
+
+    Uses the same alignment as WeatherCache.window: the hour containing start
+    comes first (a later-starting forecast from its first hour), a forecast shorter
+    than the horizon repeats its last hour, and missing values take the FeatureService
+    default. Every location must cover start (see current_locations).
+
+    Returns:
+        Array of shape (locations, hours)
+    """
+    cache = WeatherCache(StaticWeatherProvider(forecasts), clock=lambda: start.timestamp())
+    temperatures = np.full((len(locations), hours), WEATHER_DEFAULTS['temperature'])
+    for i, location in enumerate(locations):
+        frame = cache.get(location)
+        position = forecast_position(frame, start)
+        values = frame['temperature'].to_numpy()[position:position + hours]
+        values = np.concatenate([values, np.repeat(values[-1:], hours - len(values))])
+        temperatures[i] = np.where(np.isnan(values), WEATHER_DEFAULTS['temperature'], values)
+    return temperatures
+
+
+def current_locations(forecasts: Dict[str, List[Dict]], start: datetime) -> List[str]:
+    """Locations whose forecast reaches the hour containing start (expired ones are left out, as in the API)"""
+    cache = WeatherCache(StaticWeatherProvider(forecasts), clock=lambda: start.timestamp())
+    frames = {location: cache.get(location) for location in forecasts}
+    return [
+        location for location, frame in frames.items()
+        if frame is not None and forecast_position(frame, start) is not None
+    ]
+
+
+def building_parameters(service: FeatureService, roster: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Heating degree base and demand scaling for every roster row in one vectorized pass
+
+    Buildings without characteristics keep the unscaled features (NaN base), as in the API.
+    """
+    numeric = {
+        field: pd.to_numeric(roster[field], errors='coerce').fillna(BUILDING_DEFAULTS[field]).to_numpy()
+        for field in NUMERIC_BUILDING_FIELDS
+    }
+    insulation = roster['insulationLevel'].fillna(BUILDING_DEFAULTS['insulationLevel']).astype(str).str.lower()
+    base_temp, scaling, _ = service.building_scaling_arrays(
+        numeric['floorArea'], insulation.map(INSULATION_FACTORS).fillna(1.0).to_numpy(),
+        numeric['occupancyRate'], numeric['buildingAge'], numeric['thermostatSetpoint']
+    )
+    has_data = roster['has_building_data'].to_numpy(dtype=bool)
+    return np.where(has_data, base_temp, np.nan), np.where(has_data, scaling, 1.0)
+
+
+def share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, Tuple[str, tuple, str]]:
+    """Copy an array into a new shared memory block and return it with its attach spec"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _init_worker(specs: Dict[str, Tuple[str, tuple, str]], model_path: str, scaler_path: str, info_path: str):
+    """Attach the shared input arrays and load the model once per worker process"""
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, (name, _, _) in specs.items()}
+    _worker['blocks'] = blocks
+    _worker['arrays'] = {
+        key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[key].buf)
+        for key, (_, shape, dtype) in specs.items()
+    }
+    model = joblib.load(model_path)
+    # One process per core already; avoid oversubscribing with the model's own threads
+    if hasattr(model, 'get_params') and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    elif hasattr(model, 'get_params') and 'thread_count' in model.get_params():
+        model.set_params(thread_count=1)
+    with open(info_path, 'r') as f:
+        model_info = json.load(f)
+    _worker['model'] = model
+    _worker['scaler'] = joblib.load(scaler_path)
+    _worker['model_info'] = model_info
+    _worker['interval_config'] = resolve_interval_config(model, model_info)
+    _worker['feature_service'] = FeatureService()
+
+
+def forecast_shard(
+    shard: int,
+    begin: int,
+    end: int,
+    building_ids: List[str],
+    locations: List[str],
+    start: datetime,
+    output_path: str
+) -> Dict:
+    """
+    Score roster rows [begin, end) in a worker process and write one Parquet file
+
+    Returns:
+        Dict with the shard's rows, output path and seconds
+    """
+    started = time.perf_counter()
+    arrays = _worker['arrays']
+    temperatures = arrays['temperatures'][arrays['location_index'][begin:end]]
+    hours = temperatures.shape[1]
+
+    service = _worker['feature_service']
+    features = service.create_horizon_features_from_arrays(
+        temperatures, start, arrays['base_temp'][begin:end], arrays['scaling'][begin:end]
+    )
+    model_features = service.validate_features(features, _worker['model_info']['feature_names'])
+    features_scaled = _worker['scaler'].transform(model_features)
+    output = predict_with_intervals(_worker['model'], features_scaled, _worker['interval_config'])
+
+    frame = pd.DataFrame({
+        'building_id': np.repeat(np.array(building_ids, dtype=object), hours),
+        'location': np.repeat(np.array(locations, dtype=object), hours),
+        'timestamp': np.datetime64(start, 'us') + np.tile(np.arange(hours), end - begin) * np.timedelta64(1, 'h'),
+        'hour': np.tile(np.arange(hours, dtype=np.int16), end - begin),
+        'demand': output['demand'],
+        'confidence_low': output['confidence_low'],
+        'confidence_high': output['confidence_high']
+    })
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    return {'shard': shard, 'rows': len(frame), 'output': output_path, 'seconds': time.perf_counter() - started}
+
+
+class FleetForecastJob:
+    """
+    Batch forecast for a whole building roster
+
+    The parent process parses the roster and forecasts once, slices one
+    temperature window per location and places the input arrays in shared
+    memory; worker processes attach to them without copying and each scores
+    a contiguous shard of buildings. Output is hive-partitioned by forecast
+    date (``forecast_date=YYYY-MM-DD/part-00000.parquet``). A checkpoint file
+    is written after each shard, so an interrupted run with the same inputs
+    resumes with the shards that are still missing.
+    """
+
+    def __init__(
+        self,
+        roster_path: str,
+        forecast_path: str,
+        output_dir: str,
+        horizon: int = 24,
+        start: Optional[datetime] = None,
+        shard_size: int = 5000,
+        workers: Optional[int] = None,
+        model_dir: str = BACKEND_DIR
+    ):
+        self.roster_path = roster_path
+        self.forecast_path = forecast_path
+        self.output_dir = output_dir
+        self.horizon = horizon
+        self.start = (start or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        self.shard_size = shard_size
+        self.workers = workers or os.cpu_count() or 1
+        self.model_path = os.path.join(model_dir, 'best_heating_model.pkl')
+        self.scaler_path = os.path.join(model_dir, 'feature_scaler.pkl')
+        self.info_path = os.path.join(model_dir, 'model_info.json')
+        self.partition_dir = os.path.join(output_dir, f"forecast_date={self.start.date().isoformat()}")
+        self.checkpoint_dir = os.path.join(output_dir, '_checkpoints')
+        self.job_path = os.path.join(output_dir, '_job.json')
+
+    def fingerprint(self) -> Dict:
+        """Everything that determines the output; a resumed run must match it exactly"""
+        return {
+            'roster_sha256': file_hash(self.roster_path),
+            'forecast_sha256': file_hash(self.forecast_path),
+            'model_sha256': file_hash(self.model_path),
+            'start': self.start.isoformat(),
+            'horizon': self.horizon,
+            'shard_size': self.shard_size,
+            'job_version': JOB_VERSION
+        }
+
+    def prepare_output(self, force: bool) -> Dict:
+        """
+        Check an existing output directory for resumability, or reset it
+
+        Raises:
+            ValueError: If the directory holds checkpoints from a different job and force is not set
+        """
+        fingerprint = self.fingerprint()
+        if os.path.exists(self.job_path):
+            with open(self.job_path, 'r') as f:
+                previous = json.load(f)
+            if previous != fingerprint and not force:
+                raise ValueError(
+                    f"{self.output_dir} holds a different forecast job; use --force to overwrite it"
+                )
+        if force or not os.path.exists(self.job_path) or previous != fingerprint:
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+            shutil.rmtree(self.partition_dir, ignore_errors=True)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        with open(self.job_path, 'w') as f:
+            json.dump(fingerprint, f, indent=2, sort_keys=True)
+        return fingerprint
+
+    def checkpoint_path(self, shard: int) -> str:
+        return os.path.join(self.checkpoint_dir, f"shard-{shard:05d}.json")
+
+    def completed_shards(self) -> Dict[int, Dict]:
+        """Shards whose checkpoint and Parquet file both exist"""
+        completed = {}
+        for name in os.listdir(self.checkpoint_dir):
+            if name.startswith('shard-') and name.endswith('.json'):
+                with open(os.path.join(self.checkpoint_dir, name), 'r') as f:
+                    checkpoint = json.load(f)
+                if os.path.exists(checkpoint['output']):
+                    completed[checkpoint['shard']] = checkpoint
+        return completed
+
+    def write_checkpoint(self, result: Dict):
+        path = self.checkpoint_path(result['shard'])
+        with open(path + '.tmp', 'w') as f:
+            json.dump(result, f)
+        os.replace(path + '.tmp', path)
+
+    def run(self, force: bool = False) -> Dict:
+        """
+        Forecast every roster building whose shard has not been written yet
+
+        Args:
+            force: Discard existing checkpoints and output for this forecast date
+
+        Returns:
+            Dict with buildings, shards written and skipped, rows written and rows per second
+        """
+        started = time.perf_counter()
+        self.prepare_output(force)
+
+        roster = load_roster(self.roster_path)
+        forecasts = load_forecasts(self.forecast_path)
+        known = roster['location'].isin(current_locations(forecasts, self.start))
+        if not known.all():
+            logger.warning(f"Skipping {int((~known).sum())} buildings at locations without a current forecast")
+            roster = roster[known].reset_index(drop=True)
+
+        locations = sorted(roster['location'].unique())
+        base_temp, scaling = building_parameters(FeatureService(), roster)
+        arrays = {
+            'temperatures': location_temperatures(forecasts, locations, self.start, self.horizon),
+            'location_index': np.searchsorted(locations, roster['location'].to_numpy()).astype(np.int32),
+            'base_temp': base_temp,
+            'scaling': scaling
+        }
+
+        shards = [
+            (shard, begin, min(begin + self.shard_size, len(roster)))
+            for shard, begin in enumerate(range(0, len(roster), self.shard_size))
+        ]
+        completed = self.completed_shards()
+        pending = [shard for shard in shards if shard[0] not in completed]
+        logger.info(
+            f"{len(roster):,} buildings in {len(shards)} shards: {len(pending)} to forecast, "
+            f"{len(completed)} already complete"
+        )
+
+        rows = 0
+        failed = 0
+        compute_started = time.perf_counter()
+        if pending:
+            blocks, specs = [], {}
+            for key, array in arrays.items():
+                block, specs[key] = share_array(array)
+                blocks.append(block)
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(pending)),
+                    initializer=_init_worker,
+                    initargs=(specs, self.model_path, self.scaler_path, self.info_path)
+                ) as pool:
+                    futures = {
+                        pool.submit(
+                            forecast_shard, shard, begin, end,
+                            roster['buildingId'].iloc[begin:end].tolist(),
+                            roster['location'].iloc[begin:end].tolist(),
+                            self.start,
+                            os.path.join(self.partition_dir, f"part-{shard:05d}.parquet")
+                        ): shard
+                        for shard, begin, end in pending
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            failed += 1
+                            logger.error(f"Shard {futures[future]} failed: {e}")
+                            continue
+                        self.write_checkpoint(result)
+                        rows += result['rows']
+                        logger.info(
+                            f"  shard {result['shard']}: {result['rows']:,} rows in {result['seconds']:.2f}s "
+                            f"({result['rows'] / result['seconds']:,.0f} rows/s)"
+                        )
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+        compute_seconds = time.perf_counter() - compute_started
+        elapsed = time.perf_counter() - started
+        rows_per_second = rows / compute_seconds if rows else 0.0
+        logger.info(f"Fleet forecast finished in {elapsed:.2f}s: {rows:,} rows at {rows_per_second:,.0f} rows/s")
+        return {
+            'buildings': len(roster),
+            'shards_written': len(pending) - failed,
+            'shards_skipped': len(completed),
+            'shards_failed': failed,
+            'rows': rows,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second,
+            'output_dir': self.partition_dir
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast a building roster to partitioned Parquet")
+    parser.add_argument('--roster', required=True, help="Roster JSON (BuildingRegistry format), CSV or Parquet")
+    parser.add_argument('--forecasts', required=True, help="JSON {location: [hourly points]}, or long CSV/Parquet")
+    parser.add_argument('--output-dir', required=True, help="Parquet dataset root")
+    parser.add_argument('--horizon', type=int, default=24, help="Hours per building")
+    parser.add_argument('--start', help="First forecast hour, ISO format (default: current hour)")
+    parser.add_argument('--shard-size', type=int, default=5000, help="Buildings per shard and checkpoint")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Discard checkpoints and recompute every shard")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    job = FleetForecastJob(
+        args.roster, args.forecasts, args.output_dir, args.horizon, start, args.shard_size, args.workers
+    )
+    summary = job.run(force=args.force)
+    print(json.dumps(summary, indent=2))
+    if summary['shards_failed']:
+        # Partial output must not look like a successful run to the scheduler
+        logger.error(f"{summary['shards_failed']} shards failed; re-run to resume from the checkpoints")
+        sys.exit(1)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Forecast Scheduler for Heat Demand Prediction API
+Precomputes rolling horizons for registered buildings in the background and serves them from a read cache
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from postprocessing import postprocess_predictions
+
+logger = logging.getLogger(__name__)
+
+
+class BuildingRegistry:
+    """
+    Thread-safe set of buildings whose forecasts are precomputed
+
+    Each entry holds the building's 'location' (key into the weather cache)
+    and optional 'buildingData' used for scaling.
+    """
+
+    def __init__(self):
+        self._buildings: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, building_id: str, location: str, building_data: Optional[Dict] = None) -> Dict:
+        entry = {'buildingId': building_id, 'location': location, 'buildingData': building_data or {}}
+        with self._lock:
+            self._buildings[building_id] = entry
+        return entry
+
+    def remove(self, building_id: str) -> bool:
+        with self._lock:
+            return self._buildings.pop(building_id, None) is not None
+
+    def get(self, building_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._buildings.get(building_id)
+
+    def snapshot(self) -> List[Dict]:
+        """Return a stable copy of all registered buildings"""
+        with self._lock:
+            return list(self._buildings.values())
+
+    def load_file(self, path: str) -> int:
+        """
+        Register buildings from a JSON roster file (list of {'buildingId', 'location', 'buildingData'})
+
+        Returns:
+            Number of buildings registered
+        """
+        with open(path, 'r') as f:
+            roster = json.load(f)
+        for entry in roster:
+            self.register(str(entry['buildingId']), entry['location'], entry.get('buildingData'))
+        return len(roster)
+
+
+class ForecastScheduler:
+    """
+    Background precomputation of rolling horizons for every registered building
+
+    On each hourly tick (or when triggered by new weather data) all buildings
+    are scored in one batch through ``compute_fn`` and the results replace the
+    read cache as a new version. Requests then only index into the latest
+    snapshot.
+    """
+
+    def __init__(
+        self,
+        registry: BuildingRegistry,
+        compute_fn: Callable[[List[Dict], int], Dict],
+        horizon: int = 48,
+        interval_seconds: float = 3600.0
+    ):
+        """
+        Args:
+            registry: Buildings to precompute
+            compute_fn: Callable taking (buildings, horizon) and returning a dict with
+                'demand', 'confidence_low', 'confidence_high' arrays of shape (buildings, horizon),
+                'start' (datetime), 'building_ids' (those actually scored) and 'interval_method'
+            horizon: Longest horizon precomputed; shorter horizons are served as prefixes
+            interval_seconds: Time between scheduled refreshes
+        """
+        self.registry = registry
+        self.compute_fn = compute_fn
+        self.horizon = horizon
+        self.interval_seconds = interval_seconds
+
+        self._snapshot: Optional[Dict] = None
+        self._version = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='forecast-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def trigger(self):
+        """Request an early refresh (e.g. after new forecast data arrives)"""
+        self._wake.set()
+
+    def _seconds_until_next_tick(self) -> float:
+        """Align scheduled refreshes to the interval boundary (top of the hour by default)"""
+        now = time.time()
+        return self.interval_seconds - (now % self.interval_seconds)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Scheduled forecast refresh failed: {e}")
+            self._wake.wait(timeout=self._seconds_until_next_tick())
+            self._wake.clear()
+
+    def refresh(self) -> Optional[Dict]:
+        """
+        Recompute horizons for all registered buildings and publish a new cache version
+
+        Returns:
+            Metadata for the published snapshot, or None if nothing is registered
+        """
+        buildings = self.registry.snapshot()
+        if not buildings:
+            return None
+
+        with self._refresh_lock:
+            started = time.perf_counter()
+            result = self.compute_fn(buildings, self.horizon)
+            building_ids = result['building_ids']
+
+            # Post-process every prefix horizon once so lookups are pure indexing
+            processed = {}
+            for hours in sorted({24, self.horizon}):
+                if hours > self.horizon:
+                    continue
+                processed[hours] = postprocess_predictions(
+                    result['demand'][:, :hours], result['start'],
+                    confidence_low=result['confidence_low'][:, :hours],
+                    confidence_high=result['confidence_high'][:, :hours]
+                )
+
+            self._version += 1
+            snapshot = {
+                'version': self._version,
+                'generated_at': datetime.now(),
+                'start': result['start'],
+                'interval_method': result.get('interval_method'),
+                'processed': processed,
+                'index': {building_id: i for i, building_id in enumerate(building_ids)},
+                'compute_seconds': time.perf_counter() - started
+            }
+            # Single reference swap: readers see either the old or the new snapshot
+            self._snapshot = snapshot
+
+        logger.info(
+            f"Published forecast cache v{snapshot['version']}: {len(building_ids)} buildings "
+            f"in {snapshot['compute_seconds']:.3f}s"
+        )
+        return self.describe()
+
+    def lookup(self, building_id: str, horizon: int) -> Optional[Dict]:
+        """
+        Fetch a precomputed horizon for a building
+
+        Returns:
+            Dict with 'processed' (post-processed arrays), 'index' (row in the batch) and
+            freshness metadata, or None if the building is not in the current snapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is None or building_id not in snapshot['index'] or horizon not in snapshot['processed']:
+            return None
+        return {
+            'processed': snapshot['processed'][horizon],
+            'index': snapshot['index'][building_id],
+            'version': snapshot['version'],
+            'generated_at': snapshot['generated_at'].isoformat(),
+            'age_seconds': (datetime.now() - snapshot['generated_at']).total_seconds(),
+            'stale': datetime.now() - snapshot['generated_at'] > timedelta(seconds=self.interval_seconds),
+            'interval_method': snapshot['interval_method']
+        }
+
+    def describe(self) -> Dict:
+        """Return cache status for monitoring"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'version': 0, 'buildings': 0, 'running': self._thread is not None and self._thread.is_alive()}
+        return {
+            'version': snapshot['version'],
+            'buildings': len(snapshot['index']),
+            'generated_at': snapshot['generated_at'].isoformat(),
+            'start': snapshot['start'].isoformat(),
+            'horizons': sorted(snapshot['processed']),
+            'compute_seconds': round(snapshot['compute_seconds'], 4),
+            'running': self._thread is not None and self._thread.is_alive()
+        }
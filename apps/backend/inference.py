@@ -0,0 +1,133 @@
+"""
+Model Inference for the Heat Demand Prediction API
+Runs the loaded model once per request and returns point predictions with prediction intervals or SHAP contributions
+"""
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from catboost import Pool
+except ImportError:  # pragma: no cover - optional dependency
+    Pool = None
+
+from postprocessing import DEFAULT_CONFIDENCE_FRACTION
+
+# Interval methods understood by the serving layer
+QUANTILE = 'quantile'
+VIRTUAL_ENSEMBLE = 'virtual_ensemble'
+FIXED_FRACTION = 'fixed_fraction'
+
+
+def resolve_interval_config(model, model_info: Optional[Dict]) -> Dict:
+    """
+    Work out how the loaded model produces prediction intervals
+
+    An explicit 'prediction_interval' block in model_info.json wins. Otherwise a
+    CatBoost MultiQuantile loss is detected from the model parameters, and any
+    other model falls back to the fixed relative band.
+
+    Args:
+        model: The loaded regressor
+        model_info: Parsed model_info.json
+
+    Returns:
+        Dictionary with 'method' and the parameters that method needs
+    """
+    config = dict((model_info or {}).get('prediction_interval') or {})
+    if config.get('method') in (QUANTILE, VIRTUAL_ENSEMBLE, FIXED_FRACTION):
+        config.setdefault('quantiles', [0.05, 0.5, 0.95])
+        config.setdefault('virtual_ensembles_count', 10)
+        config.setdefault('fraction', DEFAULT_CONFIDENCE_FRACTION)
+        # Output columns are sorted before use, so the quantiles must be too
+        config['quantiles'] = sorted(config['quantiles'])
+        return config
+
+    loss_function = ''
+    if hasattr(model, 'get_params'):
+        loss_function = str(model.get_params().get('loss_function') or '')
+    if loss_function.startswith('MultiQuantile'):
+        alphas = loss_function.split('alpha=', 1)[1].split(';')[0]
+        return {'method': QUANTILE, 'quantiles': sorted(float(a) for a in alphas.split(','))}
+
+    return {'method': FIXED_FRACTION, 'fraction': DEFAULT_CONFIDENCE_FRACTION}
+
+
+def predict_with_intervals(model, features_scaled: np.ndarray, config: Dict) -> Dict:
+    """
+    Run a single batched inference call and split it into point and interval arrays
+
+    Args:
+        model: The loaded regressor
+        features_scaled: Scaled feature matrix (rows x features)
+        config: Output of resolve_interval_config
+
+    Returns:
+        Dictionary with 'demand', 'confidence_low', 'confidence_high' arrays and 'interval_method'
+    """
+    method = config['method']
+
+    if method == QUANTILE:
+        quantiles = config['quantiles']
+        raw = np.asarray(model.predict(features_scaled), dtype=np.float64).reshape(len(features_scaled), -1)
+        median_idx = quantiles.index(0.5) if 0.5 in quantiles else len(quantiles) // 2
+        # Quantile heads can cross on rare inputs; sort so low <= point <= high
+        raw = np.sort(raw, axis=1)
+        demand, low, high = raw[:, median_idx], raw[:, 0], raw[:, -1]
+
+    elif method == VIRTUAL_ENSEMBLE:
+        raw = model.virtual_ensembles_predict(
+            features_scaled,
+            prediction_type='TotalUncertainty',
+            virtual_ensembles_count=config['virtual_ensembles_count']
+        )
+        demand = raw[:, 0]
+        # Knowledge + data uncertainty when the model has both, knowledge only otherwise
+        std = np.sqrt(raw[:, 1:].sum(axis=1))
+        z = NormalDist().inv_cdf(max(config['quantiles']))
+        low, high = demand - z * std, demand + z * std
+
+    else:
+        demand = np.asarray(model.predict(features_scaled), dtype=np.float64)
+        margin = demand * config['fraction']
+        low, high = demand - margin, demand + margin
+
+    return {
+        'demand': demand,
+        'confidence_low': np.maximum(low, 0),
+        'confidence_high': high,
+        'interval_method': method
+    }
+
+
+def predict_contributions(model, features_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact TreeSHAP contributions for a batch of rows in one native call
+
+    LightGBM models use ``pred_contrib=True``; CatBoost models use
+    ``get_feature_importance(type='ShapValues')``. For multi-output CatBoost
+    models (quantile heads) the contributions of the median head are returned.
+
+    Args:
+        model: The loaded tree regressor
+        features_scaled: Scaled feature matrix (rows x features)
+
+    Returns:
+        (contributions of shape (rows, features), expected value per row); their
+        row sums equal the model's raw point prediction
+
+    Raises:
+        ValueError: If the model has no native SHAP implementation
+    """
+    if hasattr(model, 'booster_'):
+        raw = np.asarray(model.predict(features_scaled, pred_contrib=True), dtype=np.float64)
+    elif hasattr(model, 'get_feature_importance') and Pool is not None:
+        raw = np.asarray(
+            model.get_feature_importance(Pool(features_scaled), type='ShapValues'), dtype=np.float64
+        )
+        if raw.ndim == 3:
+            raw = raw[:, raw.shape[1] // 2, :]
+    else:
+        raise ValueError(f"{type(model).__name__} does not support SHAP contributions")
+    return raw[:, :-1], raw[:, -1]
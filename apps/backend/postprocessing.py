@@ -0,0 +1,126 @@
+"""
+Prediction Post-processing for the Heat Demand Prediction API
+Turns raw model output into timestamps, confidence bands, trends and summaries using array operations
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from response_format import TREND_LABELS
+
+# Relative band used when the model does not provide its own interval
+DEFAULT_CONFIDENCE_FRACTION = 0.05
+
+# Hour-on-hour change needed before a trend is reported as increasing/decreasing
+TREND_THRESHOLD = 0.02
+
+
+def postprocess_predictions(
+    predictions: np.ndarray,
+    start: datetime,
+    step_seconds: int = 3600,
+    confidence_fraction: float = DEFAULT_CONFIDENCE_FRACTION,
+    confidence_low: Optional[np.ndarray] = None,
+    confidence_high: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Derive every per-hour output field from a block of predictions in one pass
+
+    Works on a single horizon (shape ``(hours,)``) or a fleet of horizons
+    (shape ``(buildings, hours)``); all operations run along the last axis.
+
+    Args:
+        predictions: Model output, 1-D for one building or 2-D for a batch
+        start: Timestamp of the first hour
+        step_seconds: Spacing between consecutive predictions
+        confidence_fraction: Half-width of the fallback band relative to the prediction
+        confidence_low: Model-provided lower bounds (same shape as predictions)
+        confidence_high: Model-provided upper bounds (same shape as predictions)
+
+    Returns:
+        Dictionary of arrays: timestamps (datetime64[us]), demand, confidence_low,
+        confidence_high, trend (int8 codes) and the summary statistics
+    """
+    demand = np.asarray(predictions, dtype=np.float64)
+    hours = demand.shape[-1]
+
+    timestamps = np.datetime64(start, 'us') + np.arange(hours) * np.timedelta64(step_seconds, 's')
+
+    if confidence_low is None or confidence_high is None:
+        confidence_margin = demand * confidence_fraction
+        confidence_low = np.maximum(demand - confidence_margin, 0)
+        confidence_high = demand + confidence_margin
+    else:
+        confidence_low = np.asarray(confidence_low, dtype=np.float64).reshape(demand.shape)
+        confidence_high = np.asarray(confidence_high, dtype=np.float64).reshape(demand.shape)
+
+    # First hour has no predecessor and is always reported as stable
+    trend = np.zeros(demand.shape, dtype=np.int8)
+    current, previous = demand[..., 1:], demand[..., :-1]
+    trend[..., 1:] = np.where(
+        current > previous * (1 + TREND_THRESHOLD), 1,
+        np.where(current < previous * (1 - TREND_THRESHOLD), -1, 0)
+    )
+
+    return {
+        'timestamps': timestamps,
+        'demand': demand,
+        'confidence_low': confidence_low,
+        'confidence_high': confidence_high,
+        'trend': trend,
+        'min_demand': demand.min(axis=-1),
+        'max_demand': demand.max(axis=-1),
+        'avg_demand': demand.mean(axis=-1),
+        'total_demand': demand.sum(axis=-1)
+    }
+
+
+def summary_dict(processed: Dict[str, np.ndarray], index: Optional[int] = None) -> Dict[str, float]:
+    """
+    Extract the summary block for one horizon
+
+    Args:
+        processed: Output of postprocess_predictions
+        index: Row of a batched result (None for a single horizon)
+
+    Returns:
+        Dictionary with min, max, average and total demand
+    """
+    keys = ('min_demand', 'max_demand', 'avg_demand', 'total_demand')
+    if index is None:
+        return {key: float(processed[key]) for key in keys}
+    return {key: float(processed[key][index]) for key in keys}
+
+
+def prediction_rows(processed: Dict[str, np.ndarray], index: Optional[int] = None) -> List[Dict]:
+    """
+    Build the legacy row-per-hour list from post-processed arrays
+
+    Timestamps are formatted and numbers converted to Python floats in bulk, so
+    the only per-hour work left is assembling the dictionaries themselves.
+
+    Args:
+        processed: Output of postprocess_predictions
+        index: Row of a batched result (None for a single horizon)
+
+    Returns:
+        List of {'timestamp', 'demand', 'confidence', 'trend'} dictionaries
+    """
+    def select(key):
+        values = processed[key]
+        return values if index is None else values[index]
+
+    timestamps = np.datetime_as_string(processed['timestamps'], unit='us').tolist()
+    trend_labels = np.array([TREND_LABELS[-1], TREND_LABELS[0], TREND_LABELS[1]])[select('trend') + 1].tolist()
+
+    return [
+        {'timestamp': timestamp, 'demand': demand, 'confidence': [low, high], 'trend': trend}
+        for timestamp, demand, low, high, trend in zip(
+            timestamps,
+            select('demand').tolist(),
+            select('confidence_low').tolist(),
+            select('confidence_high').tolist(),
+            trend_labels
+        )
+    ]
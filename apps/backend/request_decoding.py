@@ -0,0 +1,335 @@
+"""
+Request Decoding for the Heat Demand Prediction API
+Parses JSON bodies with a fast codec and validates them against precompiled schemas into typed, columnar arrays
+"""
+import json
+import math
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from feature_service import BUILDING_DEFAULTS, INSULATION_FACTORS, WEATHER_DEFAULTS
+
+# JSON numbers decode to exactly these types (bool is deliberately excluded)
+NUMBER_TYPES = frozenset((int, float))
+NONE_TYPE = type(None)
+NUMBER_OR_NONE_TYPES = NUMBER_TYPES | {NONE_TYPE}
+
+# Stop collecting errors after this many so a huge bad batch stays cheap to reject
+MAX_ERRORS = 20
+
+# Accepted horizons in hours
+HORIZONS = (24, 48)
+
+# Plausible ranges per weather field; pressure accepts Pa or hPa. Only temperature feeds the
+# model, so the other fields are lenient: bad values are clipped or defaulted and counted, never rejected
+WEATHER_SCHEMA = {
+    'temperature': {'min': -90.0, 'max': 60.0},
+    'windSpeed': {'min': 0.0, 'max': 150.0, 'strict': False},
+    'humidity': {'min': 0.0, 'max': 100.0, 'strict': False},
+    'solarRadiation': {'min': 0.0, 'max': 2000.0, 'strict': False},
+    'cloudCover': {'min': 0.0, 'max': 100.0, 'strict': False},
+    'pressure': {'min': 0.0, 'max': 200000.0, 'strict': False},
+    'precipitation': {'min': 0.0, 'max': 1000.0, 'strict': False}
+}
+
+# Building fields in the argument order of FeatureService.building_scaling_arrays;
+# insulationLevel is an enum decoded straight to its heat loss factor
+BUILDING_SCHEMA = {
+    'floorArea': {'min': 1.0, 'max': 1e7},
+    'insulationLevel': {'choices': INSULATION_FACTORS},
+    'occupancyRate': {'min': 0.0, 'max': 100.0},
+    'buildingAge': {'min': 0.0, 'max': 1000.0},
+    'thermostatSetpoint': {'min': 5.0, 'max': 35.0}
+}
+
+
+class RequestDecodeError(ValueError):
+    """
+    Raised when a request body does not match its schema
+
+    Attributes:
+        errors: (field path, message) pairs, e.g. ('buildings[3].weatherForecast[7].temperature', 'must be a number')
+    """
+
+    def __init__(self, errors: List[Tuple[str, str]]):
+        self.errors = errors[:MAX_ERRORS]
+        super().__init__('; '.join(f"{path}: {message}" for path, message in self.errors))
+
+    def to_dict(self) -> Dict:
+        return {
+            'error': str(self),
+            'field_errors': [{'field': path, 'message': message} for path, message in self.errors]
+        }
+
+
+class FieldErrors(list):
+    """(field path, message) accumulator that aborts decoding once MAX_ERRORS is reached"""
+
+    def add(self, path: str, message: str):
+        self.append((path, message))
+        if len(self) >= MAX_ERRORS:
+            raise RequestDecodeError(self)
+
+
+class RecordSchema:
+    """
+    Numeric and enum fields of one JSON object, compiled once into a flat check table
+
+    Decoding yields a float64 vector (one object) or matrix (many objects) with
+    one column per field in schema order. Absent or null fields take the
+    schema default and are counted. Present fields of the wrong type or out of
+    range are errors, except for fields marked 'strict': False, where they are
+    defaulted or clipped to the range and counted as '<field>.invalid' or
+    '<field>.clipped'.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, Dict], defaults: Dict[str, Any]):
+        self.name = name
+        self.names = list(fields)
+        self._checks = []
+        for field, spec in fields.items():
+            choices = spec.get('choices')
+            default = defaults[field]
+            self._checks.append((
+                field,
+                spec.get('min', -math.inf),
+                spec.get('max', math.inf),
+                choices,
+                float(choices[default] if choices else default),
+                spec.get('strict', True)
+            ))
+        self.defaults = np.array([check[4] for check in self._checks])
+
+    def _convert_choice(self, value, choices, path: str, errors: FieldErrors, default: float) -> float:
+        if isinstance(value, str) and value.lower() in choices:
+            return float(choices[value.lower()])
+        errors.add(path, f"must be one of {', '.join(choices)}")
+        return default
+
+    def decode(self, record, path: str, errors: FieldErrors, defaulted: Optional[Counter] = None) -> np.ndarray:
+        """Decode one object into a vector (defaults where errors were recorded)"""
+        if record is None:
+            record = {}
+        if type(record) is not dict:
+            errors.add(path, "must be an object")
+            return self.defaults.copy()
+        row = self.defaults.copy()
+        for j, (field, low, high, choices, _, strict) in enumerate(self._checks):
+            value = record.get(field)
+            if value is None:
+                if defaulted is not None:
+                    defaulted[f'{self.name}.{field}'] += 1
+                continue
+            if choices is not None:
+                row[j] = self._convert_choice(value, choices, f'{path}.{field}', errors, row[j])
+            elif type(value) not in NUMBER_TYPES:
+                if strict:
+                    errors.add(f'{path}.{field}', "must be a number")
+                elif defaulted is not None:
+                    defaulted[f'{self.name}.{field}.invalid'] += 1
+            elif low <= value <= high:
+                row[j] = value
+            elif strict:
+                # Also rejects NaN, which the standard library parser accepts
+                errors.add(f'{path}.{field}', f"must be between {low:g} and {high:g}")
+            elif value != value:
+                if defaulted is not None:
+                    defaulted[f'{self.name}.{field}.invalid'] += 1
+            else:
+                row[j] = min(max(value, low), high)
+                if defaulted is not None:
+                    defaulted[f'{self.name}.{field}.clipped'] += 1
+        return row
+
+    def decode_rows(self, records, path: str, errors: FieldErrors, defaulted: Optional[Counter] = None) -> np.ndarray:
+        """
+        Decode a list of objects (rows) or an object of equal-length lists (columns) into a matrix
+
+        Each field is validated as one column: a type scan over the raw values,
+        then vectorized finiteness and range checks.
+        """
+        if type(records) is dict:
+            lengths = {len(v) for v in records.values() if type(v) is list}
+            n = lengths.pop() if len(lengths) == 1 else 0
+            if lengths or any(type(records.get(field)) not in (list, type(None)) for field in self.names):
+                errors.add(path, "columns must be lists of equal length")
+                return np.tile(self.defaults, (0, 1))
+            columns = {field: records.get(field) or [None] * n for field in self.names}
+        elif type(records) is list:
+            n = len(records)
+            bad = next((i for i, record in enumerate(records) if type(record) is not dict), None)
+            if bad is not None:
+                errors.add(f'{path}[{bad}]', "must be an object")
+                return np.tile(self.defaults, (0, 1))
+            columns = {field: [record.get(field) for record in records] for field in self.names}
+        else:
+            errors.add(path, "must be a list of objects or an object of lists")
+            return np.tile(self.defaults, (0, 1))
+
+        matrix = np.empty((n, len(self._checks)))
+        for j, (field, low, high, choices, default, strict) in enumerate(self._checks):
+            column = columns[field]
+            types = set(map(type, column))
+            if NONE_TYPE in types:
+                missing = column.count(None)
+                if defaulted is not None:
+                    defaulted[f'{self.name}.{field}'] += missing
+            if choices is not None:
+                matrix[:, j] = [
+                    default if value is None
+                    else self._convert_choice(value, choices, f'{path}[{i}].{field}', errors, default)
+                    for i, value in enumerate(column)
+                ]
+                continue
+            if not types <= NUMBER_OR_NONE_TYPES:
+                for i, value in enumerate(column):
+                    if type(value) not in NUMBER_OR_NONE_TYPES:
+                        if strict:
+                            errors.add(f'{path}[{i}].{field}', "must be a number")
+                        elif defaulted is not None:
+                            defaulted[f'{self.name}.{field}.invalid'] += 1
+                column = [value if type(value) in NUMBER_TYPES else None for value in column]
+                types.add(NONE_TYPE)
+            if NONE_TYPE in types:
+                column = [default if value is None else value for value in column]
+            values = np.array(column, dtype=np.float64)
+            bad = np.flatnonzero(~((values >= low) & (values <= high)))
+            if strict:
+                for i in bad:
+                    errors.add(f'{path}[{i}].{field}', f"must be between {low:g} and {high:g}")
+            elif len(bad):
+                invalid = np.isnan(values[bad])
+                values[bad] = np.where(invalid, default, np.clip(values[bad], low, high))
+                if defaulted is not None:
+                    defaulted[f'{self.name}.{field}.invalid'] += int(invalid.sum())
+                    defaulted[f'{self.name}.{field}.clipped'] += int((~invalid).sum())
+            matrix[:, j] = values
+        return matrix
+
+
+WEATHER_RECORD = RecordSchema('weather', WEATHER_SCHEMA, WEATHER_DEFAULTS)
+BUILDING_RECORD = RecordSchema('building', BUILDING_SCHEMA, BUILDING_DEFAULTS)
+
+
+
+def loads(body: bytes) -> Any:
+    """Parse JSON with orjson when installed, the standard library otherwise"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decode_json_body(req) -> Optional[Any]:
+    """
+    Parse the body of a Flask request
+
+    Returns:
+        The parsed document, or None for an empty body
+
+    Raises:
+        RequestDecodeError: If the body is not valid JSON
+    """
+    body = req.get_data(cache=True)
+    if not body:
+        return None
+    try:
+        return loads(body)
+    except ValueError as e:
+        raise RequestDecodeError([('body', f"invalid JSON: {e}")])
+
+
+def decode_json_object(req) -> Optional[Dict]:
+    """
+    Parse a request body that must be a JSON object
+
+    Returns:
+        The parsed object, or None for an empty body
+
+    Raises:
+        RequestDecodeError: If the body is not valid JSON or not an object
+    """
+    data = decode_json_body(req)
+    if data is not None and type(data) is not dict:
+        raise RequestDecodeError([('body', 'must be an object')])
+    return data
+
+
+def decode_horizon(value, errors: FieldErrors) -> int:
+    """Horizon in hours (24 when omitted)"""
+    if value is None:
+        return 24
+    if type(value) is not int or value not in HORIZONS:
+        errors.add('horizon', 'Horizon must be 24 or 48 hours')
+        return 24
+    return value
+
+
+def decode_timestamp(value, path: str, errors: FieldErrors) -> Optional[datetime]:
+    """
+    ISO 8601 timestamp as naive wall-clock time (None when omitted)
+
+    The model's calendar features and the prediction store both work in naive
+    time, so an offset is dropped rather than converted: features, stored rows
+    and actuals all refer to the hour as the client wrote it.
+    """
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        errors.add(path, "must be an ISO 8601 timestamp")
+        return None
+
+
+def decode_weather(
+    current,
+    forecast,
+    hours: int,
+    path: str,
+    errors: FieldErrors,
+    defaulted: Optional[Counter] = None
+) -> np.ndarray:
+    """
+    Current conditions followed by the hourly forecast as one (hours x weather fields) array
+
+    The forecast may be a list of hourly objects or columnar ({'temperature': [...], ...}).
+    A forecast shorter than the horizon repeats its last hour, as FeatureService does.
+    """
+    prefix = f'{path}.' if path else ''
+    rows = [WEATHER_RECORD.decode(current, f'{prefix}weatherData', errors, defaulted)[None, :]]
+    if hours > 1 and forecast:
+        # Only the hours inside the horizon are decoded
+        if type(forecast) is list:
+            forecast = forecast[:hours - 1]
+        elif type(forecast) is dict:
+            forecast = {field: values[:hours - 1] if type(values) is list else values for field, values in forecast.items()}
+        rows.append(WEATHER_RECORD.decode_rows(forecast, f'{prefix}weatherForecast', errors, defaulted))
+    weather = np.concatenate(rows)
+    if len(weather) < hours:
+        weather = np.concatenate([weather, np.repeat(weather[-1:], hours - len(weather), axis=0)])
+    return weather
+
+
+def decode_building_data(value, path: str, errors: FieldErrors) -> np.ndarray:
+    """
+    Building characteristics as a vector in BUILDING_SCHEMA order
+
+    Returns all-NaN when no building data was sent, which leaves the features unscaled.
+    """
+    if not value:
+        return np.full(len(BUILDING_RECORD.names), np.nan)
+    return BUILDING_RECORD.decode(value, path, errors)
+
+
+def raise_for_errors(errors: FieldErrors):
+    """Raise a RequestDecodeError carrying every collected field error"""
+    if errors:
+        raise RequestDecodeError(list(errors))
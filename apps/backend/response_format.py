@@ -0,0 +1,208 @@
+"""
+Response Encoding for the Heat Demand Prediction API
+Negotiates columnar JSON and binary (MessagePack / Arrow IPC) prediction payloads, and serves precomputed metadata
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from flask import Response
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+# Media types understood by the prediction endpoints
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_JSON_MIMETYPE = 'application/vnd.heat.columnar+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Short names accepted through the ?format= query parameter
+FORMAT_ALIASES = {
+    'json': JSON_MIMETYPE,
+    'columnar': COLUMNAR_JSON_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+    'arrow': ARROW_MIMETYPE
+}
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 256
+
+# Trend classes are transported as int8 codes; consumers map them back with this table
+TREND_LABELS = {-1: 'decreasing', 0: 'stable', 1: 'increasing'}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a client explicitly asks for a format this server cannot produce"""
+
+
+def available_mimetypes() -> list:
+    """
+    List the media types this process can currently encode, in order of preference
+
+    Returns:
+        List of media type strings (row JSON first so it stays the default)
+    """
+    mimetypes = [JSON_MIMETYPE, COLUMNAR_JSON_MIMETYPE]
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    if pa is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    return mimetypes
+
+
+def negotiate_format(req) -> str:
+    """
+    Pick the response media type for a prediction request
+
+    An explicit ?format= query parameter wins over the Accept header so that
+    browsers and curl can select a format without custom headers.
+
+    Args:
+        req: The current Flask request
+
+    Returns:
+        One of the *_MIMETYPE constants
+    """
+    requested = req.args.get('format')
+    if requested:
+        mimetype = FORMAT_ALIASES.get(requested.lower())
+        if mimetype is None or mimetype not in available_mimetypes():
+            raise UnsupportedFormatError(f"Unsupported response format: {requested}")
+        return mimetype
+
+    best = req.accept_mimetypes.best_match(available_mimetypes(), default=JSON_MIMETYPE)
+    # Treat the legacy x-msgpack alias the same as the registered type
+    if best == JSON_MIMETYPE and 'application/x-msgpack' in req.accept_mimetypes and msgpack is not None:
+        return MSGPACK_MIMETYPE
+    return best
+
+
+def encode_columnar(
+    mimetype: str,
+    start: datetime,
+    step_seconds: int,
+    columns: Dict[str, np.ndarray],
+    metadata: Optional[Dict] = None
+) -> Response:
+    """
+    Encode parallel prediction arrays as a columnar response
+
+    Rows are implied by ``start + i * step_seconds`` so no per-row timestamps
+    are serialized. Float columns are written as whole arrays: ``tolist()`` for
+    JSON, raw little-endian buffers for MessagePack and native columns for Arrow.
+
+    Args:
+        mimetype: Negotiated media type (columnar JSON, MessagePack or Arrow)
+        start: Timestamp of the first row
+        step_seconds: Spacing between consecutive rows
+        columns: Mapping of column name to 1-D NumPy array (all equal length)
+        metadata: Extra top-level fields (summary, model version, ...)
+
+    Returns:
+        Flask Response with the encoded body and matching Content-Type
+    """
+    metadata = metadata or {}
+    length = len(next(iter(columns.values()))) if columns else 0
+    header = {
+        'start': start.isoformat(),
+        'step_seconds': step_seconds,
+        'length': length,
+        'trend_labels': {str(code): label for code, label in TREND_LABELS.items()},
+        **metadata
+    }
+
+    if mimetype == COLUMNAR_JSON_MIMETYPE:
+        body = dict(header)
+        body['columns'] = {name: np.asarray(values).tolist() for name, values in columns.items()}
+        return Response(json.dumps(body), mimetype=COLUMNAR_JSON_MIMETYPE)
+
+    if mimetype == MSGPACK_MIMETYPE:
+        body = dict(header)
+        body['columns'] = {}
+        body['column_dtypes'] = {}
+        for name, values in columns.items():
+            array = np.ascontiguousarray(values)
+            # Fix byte order so clients can np.frombuffer() without guessing
+            array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+            body['columns'][name] = array.tobytes()
+            body['column_dtypes'][name] = array.dtype.str
+        return Response(msgpack.packb(body, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+
+    if mimetype == ARROW_MIMETYPE:
+        batch = pa.record_batch({name: pa.array(np.asarray(values)) for name, values in columns.items()})
+        schema = batch.schema.with_metadata({'heat_demand': json.dumps(header)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+        return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+    raise UnsupportedFormatError(f"Not a columnar media type: {mimetype}")
+
+
+class PrecomputedResponse:
+    """
+    A JSON body serialized and gzip-compressed once, served with a strong ETag
+
+    The ETag is a hash of the body, so every worker that loaded the same model
+    produces the same tag; the gzip representation gets its own tag, as RFC 9110
+    requires for a different encoding. A conditional GET matching either tag is
+    answered with 304 and no body.
+    """
+
+    def __init__(self, payload, cache_control: str = 'no-cache'):
+        """
+        Args:
+            payload: JSON-serializable body
+            cache_control: Cache-Control header value ('no-cache' stores but always revalidates)
+        """
+        self.body = json.dumps(payload, separators=(',', ':')).encode()
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        self.cache_control = cache_control
+        # mtime=0 keeps the compressed bytes (and so their tag) identical across workers
+        compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if len(self.body) >= MIN_COMPRESS_BYTES and len(compressed) < len(self.body):
+            self.gzip_body, self.gzip_etag = compressed, f"{digest}-gzip"
+        else:
+            self.gzip_body, self.gzip_etag = None, None
+
+    def _headers(self, response: Response, etag: str) -> Response:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    def respond(self, req) -> Response:
+        """
+        Build the response for a request: 304, gzip body or identity body
+
+        Args:
+            req: The current Flask request
+
+        Returns:
+            Flask Response
+        """
+        use_gzip = self.gzip_body is not None and req.accept_encodings['gzip'] > 0
+        etag = self.gzip_etag if use_gzip else self.etag
+
+        # If-None-Match uses weak comparison, so W/ tags added by proxies still match
+        if any(req.if_none_match.contains_weak(tag) for tag in (self.etag, self.gzip_etag) if tag):
+            return self._headers(Response(status=304), etag)
+
+        if use_gzip:
+            response = Response(self.gzip_body, mimetype=JSON_MIMETYPE)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype=JSON_MIMETYPE)
+        return self._headers(response, etag)
@@ -0,0 +1,228 @@
+"""
+Sampling Profiler for the Heat Demand Prediction API
+Periodically samples the stacks of every thread in the worker and aggregates them into flamegraph input
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+# Sampling period bounds in seconds; the floor keeps the GIL time spent sampling small
+DEFAULT_INTERVAL = 0.01
+MIN_INTERVAL = 0.001
+
+# Longest profile a single request may ask for
+DEFAULT_MAX_SECONDS = 60.0
+
+# Frames kept per stack (the innermost ones when deeper)
+MAX_DEPTH = 128
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another is still running in this worker"""
+
+
+class StackProfile:
+    """
+    Aggregated samples of one profiling run
+
+    Attributes:
+        counts: (thread name, frame index, ...) root-first stack -> number of samples
+        frames: (function, file, first line) per frame index
+        interval: Requested sampling period in seconds
+        duration: Wall time the run took
+        samples: Number of sampling passes over all threads
+        overhead_seconds: CPU time spent taking samples (in the profiling thread)
+    """
+
+    def __init__(self, counts: Counter, frames: list, interval: float, duration: float,
+                 samples: int, overhead_seconds: float):
+        self.counts = counts
+        self.frames = frames
+        self.interval = interval
+        self.duration = duration
+        self.samples = samples
+        self.overhead_seconds = overhead_seconds
+
+    def describe(self) -> Dict:
+        return {
+            'pid': os.getpid(),
+            'interval': self.interval,
+            'duration': self.duration,
+            'samples': self.samples,
+            'stacks': len(self.counts),
+            'overhead_seconds': self.overhead_seconds
+        }
+
+    def _frame_name(self, index: int) -> str:
+        function, filename, line = self.frames[index]
+        return f"{function} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> str:
+        """
+        Brendan Gregg's collapsed-stack format (one 'thread;outer;...;inner count' line per stack),
+        as read by flamegraph.pl, inferno and speedscope
+        """
+        lines = []
+        for (thread, *stack), count in sorted(self.counts.items(), key=lambda item: -item[1]):
+            # ';' separates frames, so it cannot appear inside a name
+            names = [thread.replace(';', ':')] + [self._frame_name(i).replace(';', ':') for i in stack]
+            lines.append(f"{';'.join(names)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name: str = 'heat-demand-api') -> Dict:
+        """Speedscope file with one sampled profile per thread; weights are seconds"""
+        by_thread = {}
+        for (thread, *stack), count in self.counts.items():
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(stack)
+            weights.append(count * self.interval)
+        profiles = [
+            {
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }
+            for thread, (samples, weights) in sorted(by_thread.items())
+        ]
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': f"{name} pid {os.getpid()}",
+            'exporter': 'sampling_profiler.py',
+            'activeProfileIndex': 0,
+            'shared': {
+                'frames': [
+                    {'name': function, 'file': filename, 'line': line}
+                    for function, filename, line in self.frames
+                ]
+            },
+            'profiles': profiles
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the threads of one worker process
+
+    A profile runs in the requesting thread: every ``interval`` it reads all
+    other threads' current frames (sys._current_frames) and counts each
+    distinct stack. Nothing is installed in the profiled threads, so there is
+    no cost outside a run and the cost during one is a short GIL hold per
+    sample, growing with threads x stack depth. Frame names are built once per
+    code object. Only one profile runs at a time per worker; threads that are
+    blocked (waiting for requests, on locks or I/O) are sampled too, which is
+    what shows where wall time goes.
+    """
+
+    def __init__(self, token: Optional[str] = None, max_seconds: float = DEFAULT_MAX_SECONDS,
+                 clock=time.perf_counter, sleep=time.sleep):
+        """
+        Args:
+            token: Shared secret callers must present (None accepts no caller)
+            max_seconds: Longest allowed profile
+            clock, sleep: Time source and sleep (injectable for tests)
+        """
+        self.token = token
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def authorized(self, presented: Optional[str]) -> bool:
+        """Constant-time check of a presented token"""
+        if not self.token or not presented:
+            return False
+        return hmac.compare_digest(presented.encode(), self.token.encode())
+
+    def validate(self, seconds: float, interval: float) -> Tuple[float, float]:
+        """
+        Check a requested duration and interval
+
+        Raises:
+            ValueError: If either is out of range
+        """
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be above 0 and at most {self.max_seconds:g}")
+        if not MIN_INTERVAL <= interval <= seconds:
+            raise ValueError(f"interval must be between {MIN_INTERVAL:g} and the profile duration")
+        return seconds, interval
+
+    def profile(self, seconds: float, interval: float = DEFAULT_INTERVAL) -> StackProfile:
+        """
+        Sample every other thread for ``seconds``
+
+        Raises:
+            ValueError: If seconds or interval is out of range
+            ProfilerBusy: If a profile is already running in this worker
+        """
+        seconds, interval = self.validate(seconds, interval)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this worker")
+        try:
+            return self._run(seconds, interval)
+        finally:
+            self._lock.release()
+
+    def _run(self, seconds: float, interval: float) -> StackProfile:
+        own_thread = threading.get_ident()
+        frame_index: Dict[object, int] = {}
+        frames = []
+        counts = Counter()
+        samples = 0
+        cpu = 0.0
+
+        started = self.clock()
+        deadline = started + seconds
+        next_sample = started
+        while True:
+            cpu_start = time.thread_time()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_thread:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    index = frame_index.get(code)
+                    if index is None:
+                        index = frame_index[code] = len(frames)
+                        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    stack.append(index)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[tuple(reversed(stack))] += 1
+            samples += 1
+            cpu += time.thread_time() - cpu_start
+
+            # Fixed-rate schedule; passes that overrun are skipped rather than bunched up
+            next_sample += interval
+            now = self.clock()
+            if next_sample < now:
+                next_sample += ((now - next_sample) // interval + 1) * interval
+            if next_sample >= deadline:
+                break
+            self.sleep(next_sample - now)
+
+        return StackProfile(counts, frames, interval, self.clock() - started, samples, cpu)
+
+
+def create_profiler_from_env() -> Optional[SamplingProfiler]:
+    """
+    Build the profiler configured by environment variables
+
+    Profiling is off unless PROFILER_TOKEN is set; callers must send that token.
+    PROFILER_MAX_SECONDS caps the duration of one profile.
+    """
+    token = os.environ.get('PROFILER_TOKEN')
+    if not token:
+        return None
+    return SamplingProfiler(token, float(os.environ.get('PROFILER_MAX_SECONDS', DEFAULT_MAX_SECONDS)))
@@ -0,0 +1,632 @@
+"""
+Shard Router for the Heat Demand Prediction API
+Consistent-hashes prediction traffic by building or site across backend nodes, fanning out batch and district requests
+
+Usage:
+    python shard_router.py --nodes http://10.0.0.11:5000,http://10.0.0.12:5000 --port 8000
+    python shard_router.py --spawn 3 --port 8000        # three local backend processes as nodes
+    gunicorn -b 0.0.0.0:8000 --threads 16 "shard_router:create_app()"   # SHARD_NODES=...
+
+Nodes must share one prediction store (the same PREDICTION_STORE_URL, a PostgreSQL
+database in the sharded compose profile): rebalancing moves registered buildings but
+not stored predictions, so /api/history of a building that changed owner would
+otherwise come back empty. Spawned local nodes inherit the router's environment.
+"""
+import argparse
+import bisect
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+from district import flatten_district
+from request_decoding import RequestDecodeError
+
+logger = logging.getLogger(__name__)
+
+# Ring points per node; more points even out the share each node owns
+DEFAULT_VNODES = 128
+
+# Seconds before a node request is abandoned
+DEFAULT_TIMEOUT = 30.0
+
+# Hop-by-hop and recomputed headers that are never copied between client, router and node
+# (Content-Encoding, ETag and Vary pass through, so proxied bodies keep their node encoding)
+SKIPPED_HEADERS = {
+    'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'host',
+    'proxy-authorization', 'te', 'trailer', 'upgrade'
+}
+
+# Routes whose path names the building that owns them
+BUILDING_PATH = re.compile(r'^/api/(forecast|history|buildings)/(?P<key>[^/]+)$')
+WEATHER_PATH = re.compile(r'^/api/weather/(?P<key>[^/]+)$')
+
+# Routes keyed by a field of the JSON body
+BODY_KEYED_PATHS = ('/api/predict', '/api/predict-horizon', '/api/explain', '/api/actuals', '/api/buildings')
+
+# A transport sends (node, method, path with query, headers, body) and returns (status, headers, body)
+Transport = Callable[[str, str, str, Dict[str, str], bytes], Tuple[int, Dict[str, str], bytes]]
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes
+
+    Each node is placed at ``vnodes`` pseudo-random points; a key belongs to
+    the first point clockwise from its hash. Adding or removing a node only
+    moves the keys between that node's points and their predecessors, about
+    1/N of all keys, and leaves every other assignment unchanged.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        self.vnodes = vnodes
+        # (nodes, sorted points, owner index per point), replaced as a whole so
+        # lookups running during a membership change see either ring, never a mix
+        self._state: Tuple[Tuple[str, ...], np.ndarray, np.ndarray] = (
+            (), np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.intp)
+        )
+        for node in nodes:
+            self.add_node(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._state[0])
+
+    def _rebuild(self, nodes: Tuple[str, ...]):
+        points = np.array(
+            [_hash(f"{node}#{i}") for node in nodes for i in range(self.vnodes)], dtype=np.uint64
+        )
+        owners = np.repeat(np.arange(len(nodes)), self.vnodes)
+        order = np.argsort(points, kind='stable')
+        self._state = (nodes, points[order], owners[order])
+
+    def add_node(self, node: str):
+        nodes = self._state[0]
+        if node in nodes:
+            raise ValueError(f"Node already in ring: {node}")
+        self._rebuild(nodes + (node,))
+
+    def remove_node(self, node: str):
+        nodes = self._state[0]
+        if node not in nodes:
+            raise ValueError(f"Node not in ring: {node}")
+        self._rebuild(tuple(n for n in nodes if n != node))
+
+    def node_for(self, key: str) -> str:
+        """Owner of one key"""
+        nodes, points, owners = self._state
+        if not nodes:
+            raise LookupError("No nodes in ring")
+        index = bisect.bisect_right(points, _hash(key)) % len(points)
+        return nodes[owners[index]]
+
+    def nodes_for(self, keys: List[str]) -> List[str]:
+        """Owners of many keys (one sorted search for all of them)"""
+        nodes, points, owners = self._state
+        if not nodes:
+            raise LookupError("No nodes in ring")
+        hashes = np.fromiter((_hash(key) for key in keys), dtype=np.uint64, count=len(keys))
+        indices = np.searchsorted(points, hashes, side='right') % len(points)
+        return [nodes[owner] for owner in owners[indices]]
+
+
+class HTTPTransport:
+    """Plain HTTP/1.1 transport to backend nodes given as base URLs"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def __call__(self, node: str, method: str, path: str, headers: Dict[str, str], body: bytes):
+        req = urllib.request.Request(node.rstrip('/') + path, data=body or None, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+
+class NodeError(RuntimeError):
+    """Raised when a node cannot be reached"""
+
+    def __init__(self, node: str, reason: str):
+        super().__init__(f"Node {node} unavailable: {reason}")
+        self.node = node
+
+
+class ShardRouter:
+    """
+    Routes API requests to the backend node that owns their building or site
+
+    The shard key is the building id, falling back to the location (site), so
+    a building's registry entry, stored history and cached horizons live on one
+    node. Batch predictions, batch explanations and district aggregations are split by owner, sent
+    to the nodes in parallel and merged back in request order; building
+    listings are gathered from every node and weather ingestion is broadcast,
+    since any node may serve buildings at a location. Stateless routes
+    (model metadata, health) go to the nodes in turn.
+    """
+
+    def __init__(self, nodes: Iterable[str], transport: Optional[Transport] = None,
+                 vnodes: int = DEFAULT_VNODES, max_workers: int = 16):
+        """
+        Args:
+            nodes: Node names (base URLs for the default HTTP transport)
+            transport: Callable sending one request to a node (injectable for tests)
+            vnodes: Ring points per node
+            max_workers: Parallel node requests during fan-out
+        """
+        self.ring = HashRing(nodes, vnodes)
+        self.transport = transport or HTTPTransport()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shard')
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        # Serializes membership changes with the rebalance that follows them
+        self._membership_lock = threading.Lock()
+
+    @staticmethod
+    def shard_key(entry) -> Optional[str]:
+        if type(entry) is not dict:
+            return None
+        key = entry.get('buildingId') or entry.get('location')
+        return str(key) if key else None
+
+    def owner(self, key: Optional[str]) -> str:
+        """Node for a shard key; keyless requests are spread round-robin"""
+        if key is not None:
+            return self.ring.node_for(key)
+        nodes = self.ring.nodes
+        if not nodes:
+            raise LookupError("No nodes in ring")
+        with self._lock:
+            return nodes[next(self._round_robin) % len(nodes)]
+
+    def send(self, node: str, method: str, path: str, headers: Dict[str, str], body: bytes = b''):
+        try:
+            return self.transport(node, method, path, headers, body)
+        except (OSError, urllib.error.URLError) as e:
+            raise NodeError(node, str(e))
+
+    def send_json(self, node: str, method: str, path: str, headers: Dict[str, str], payload) -> Tuple[int, Dict]:
+        # The router parses these replies, so they must not come back compressed
+        headers = {k: v for k, v in headers.items() if k.lower() != 'accept-encoding'}
+        headers.update({'Content-Type': 'application/json', 'Accept': 'application/json', 'Accept-Encoding': 'identity'})
+        status, _, body = self.send(node, method, path, headers, json.dumps(payload).encode() if payload is not None else b'')
+        try:
+            return status, json.loads(body) if body else {}
+        except ValueError:
+            raise NodeError(node, f"status {status} reply is not JSON")
+
+    def fan_out(self, requests: List[Tuple[str, str, str, Dict, object]]) -> List[Tuple[int, Dict]]:
+        """Send (node, method, path, headers, payload) JSON requests in parallel"""
+        return list(self.executor.map(lambda args: self.send_json(*args), requests))
+
+    def route(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes):
+        """
+        Handle one client request
+
+        Returns:
+            (status, headers, body) for the client
+        """
+        full_path = f"{path}?{query}" if query else path
+        if method == 'POST' and path == '/api/predict-batch':
+            return self._json_response(*self.predict_batch(full_path, headers, body))
+        if method == 'POST' and path == '/api/explain':
+            return self._json_response(*self.explain(full_path, headers, body))
+        if method == 'POST' and path == '/api/district/aggregate':
+            return self._json_response(*self.aggregate_district(full_path, headers, body))
+        if method == 'GET' and path == '/api/buildings':
+            return self._json_response(*self.list_buildings(headers))
+        if method == 'PUT' and WEATHER_PATH.match(path):
+            return self._json_response(*self.broadcast(method, full_path, headers, body))
+
+        key = None
+        match = BUILDING_PATH.match(path) or WEATHER_PATH.match(path)
+        if match:
+            key = match.group('key')
+        elif method == 'POST' and path in BODY_KEYED_PATHS + ('/api/dispatch',):
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                payload = None
+            if path == '/api/dispatch':
+                # Warm starts need every re-plan of a plant on the same node
+                key = f"plant:{payload.get('plantId', 'default')}" if type(payload) is dict else None
+            else:
+                key = self.shard_key(payload)
+        return self.send(self.owner(key), method, full_path, headers, body)
+
+    @staticmethod
+    def _json_response(status: int, payload) -> Tuple[int, Dict[str, str], bytes]:
+        return status, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+
+    def _split_batch(self, path: str, headers: Dict[str, str], body: bytes):
+        """
+        Send each owner node its share of a batch body's 'buildings'
+
+        Returns:
+            (indices per node, node responses) when the batch was split, otherwise the (status, response) to return
+        """
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None, (400, {'error': 'Invalid JSON body'})
+        buildings = payload.get('buildings') if type(payload) is dict else None
+        if type(buildings) is not list or not buildings:
+            return None, self.send_json(self.owner(self.shard_key(payload)), 'POST', path, headers, payload)
+
+        default_location = payload.get('location')
+        groups: Dict[str, List[int]] = {}
+        for i, building in enumerate(buildings):
+            key = self.shard_key(building) or default_location
+            groups.setdefault(self.owner(key), []).append(i)
+
+        requests = []
+        for node, indices in groups.items():
+            # Ids default to the building's position, which must stay the position in the full batch
+            part = [
+                {**buildings[i], 'buildingId': buildings[i].get('buildingId', str(i))} if type(buildings[i]) is dict
+                else buildings[i]
+                for i in indices
+            ]
+            requests.append((node, 'POST', path, headers, {**payload, 'buildings': part}))
+        responses = self.fan_out(requests)
+
+        for indices, (status, response) in zip(groups.values(), responses):
+            if status != 200:
+                return None, (status, self._global_field_paths(response, indices))
+        return list(zip(groups.values(), responses)), None
+
+    @staticmethod
+    def _merge_results(parts, size: int) -> List:
+        """Per-building results of every node, back in request order"""
+        results = [None] * size
+        for indices, (_, response) in parts:
+            for i, result in zip(indices, response['results']):
+                results[i] = result
+        return results
+
+    def predict_batch(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """Split a batch by owner node and merge the per-building results back in request order"""
+        if 'format=' in path and not re.search(r'[?&]format=json(&|$)', path):
+            return 406, {'error': 'Sharded batch responses are JSON only'}
+        parts, reply = self._split_batch(path, headers, body)
+        if parts is None:
+            return reply
+
+        responses = [response for _, (_, response) in parts]
+        first = responses[0]
+        return 200, {
+            'results': self._merge_results(parts, sum(len(indices) for indices, _ in parts)),
+            'horizon_hours': first['horizon_hours'],
+            'total_buildings': sum(response['total_buildings'] for response in responses),
+            'total_predictions': sum(response['total_predictions'] for response in responses),
+            'model_version': first['model_version'],
+            'interval_method': first['interval_method'],
+            'generated_at': datetime.now().isoformat(),
+            'shards': len(parts)
+        }
+
+    def explain(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """Explain each building of a batch on its owner node, which holds its cached explanations"""
+        parts, reply = self._split_batch(path, headers, body)
+        if parts is None:
+            return reply
+
+        responses = [response for _, (_, response) in parts]
+        return 200, {
+            **responses[0],
+            'results': self._merge_results(parts, sum(len(indices) for indices, _ in parts)),
+            'cache': {
+                key: sum(response['cache'][key] for response in responses) for key in responses[0]['cache']
+            },
+            'generated_at': datetime.now().isoformat(),
+            'shards': len(parts)
+        }
+
+    @staticmethod
+    def _global_field_paths(response: Dict, indices: List[int]) -> Dict:
+        """Rewrite buildings[i] in a shard's field errors to the index in the client's batch"""
+        if not isinstance(response, dict) or 'field_errors' not in response:
+            return response
+
+        def remap(text: str) -> str:
+            return re.sub(r'buildings\[(\d+)\]', lambda m: f"buildings[{indices[int(m.group(1))]}]", text)
+
+        return {
+            **response,
+            'error': remap(response.get('error', '')),
+            'field_errors': [{**error, 'field': remap(error['field'])} for error in response['field_errors']]
+        }
+
+    def aggregate_district(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """
+        Aggregate a district on every node that owns some of its buildings and sum the node series
+
+        Each node receives the full tree pruned to the buildings it owns, so every
+        aggregate node appears in every partial result and sums elementwise.
+        """
+        try:
+            payload = json.loads(body)
+            definition = payload['district']
+            _, buildings = flatten_district(definition)
+        except RequestDecodeError as e:
+            return 400, e.to_dict()
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return 400, {'error': f"Invalid district definition: {e}"}
+
+        owners = dict(zip(
+            (str(b['buildingId']) for b in buildings),
+            self.ring.nodes_for([self.shard_key(b) or str(b['buildingId']) for b in buildings])
+        ))
+
+        def prune(node: Dict, shard: str) -> Dict:
+            if 'buildingId' in node:
+                return node
+            children = [
+                prune(child, shard) for child in node['children']
+                if 'buildingId' not in child or owners[str(child['buildingId'])] == shard
+            ]
+            return {**node, 'children': children}
+
+        shards = sorted(set(owners.values()))
+        responses = self.fan_out([
+            (shard, 'POST', path, headers, {**payload, 'district': prune(definition, shard)}) for shard in shards
+        ])
+        for status, response in responses:
+            if status != 200:
+                return status, response
+
+        merged = json.loads(json.dumps(responses[0][1]))
+        for _, response in responses[1:]:
+            for node_id, node in response['nodes'].items():
+                target = merged['nodes'][node_id]
+                target['buildings'] += node['buildings']
+                for key in ('demand', 'confidence_low', 'confidence_high'):
+                    target[key] = (np.asarray(target[key]) + np.asarray(node[key])).tolist()
+            merged['missing_buildings'] += response['missing_buildings']
+            for key in merged['recomputed']:
+                merged['recomputed'][key] += response['recomputed'][key]
+        for node in merged['nodes'].values():
+            node['peak_demand'] = float(max(node['demand'])) if node['demand'] else 0.0
+            node['total_demand'] = float(sum(node['demand']))
+        merged['generated_at'] = datetime.now().isoformat()
+        merged['shards'] = len(shards)
+        return 200, merged
+
+    def list_buildings(self, headers: Dict[str, str]) -> Tuple[int, Dict]:
+        """Registered buildings of every node, with each node's forecast cache status"""
+        nodes = self.ring.nodes
+        responses = self.fan_out([(node, 'GET', '/api/buildings', headers, None) for node in nodes])
+        buildings, caches = [], {}
+        for node, (status, response) in zip(nodes, responses):
+            if status != 200:
+                return status, response
+            buildings.extend(response['buildings'])
+            caches[node] = response['forecast_cache']
+        return 200, {'buildings': buildings, 'forecast_cache': caches}
+
+    def broadcast(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """Send the same request to every node; the first failure wins, otherwise the first reply"""
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return 400, {'error': 'Invalid JSON body'}
+        responses = self.fan_out([(node, method, path, headers, payload) for node in self.ring.nodes])
+        return next(((status, response) for status, response in responses if status >= 400), responses[0])
+
+    def add_node(self, node: str, rebalance: bool = True) -> Dict:
+        """Add a node and move registered buildings it now owns onto it"""
+        with self._membership_lock:
+            self.ring.add_node(node)
+            return self._rebalance() if rebalance else {'moved': 0, 'failed': 0}
+
+    def remove_node(self, node: str, rebalance: bool = True) -> Dict:
+        """Remove a node, first moving its registered buildings to their new owners (if it is reachable)"""
+        with self._membership_lock:
+            self.ring.remove_node(node)
+            return self._rebalance(extra_nodes=[node]) if rebalance else {'moved': 0, 'failed': 0}
+
+    def rebalance(self, extra_nodes: Iterable[str] = ()) -> Dict:
+        """
+        Move every registered building to the node that owns it under the current ring
+
+        Entries are registered on the new owner before they are removed from the
+        old one, so a building is never left unregistered. Stored predictions and
+        actuals are not moved; they stay reachable because every node reads and
+        writes the same shared prediction store.
+
+        Args:
+            extra_nodes: Nodes no longer in the ring whose entries must also be moved
+
+        Returns:
+            Dict with counts of 'moved' and 'failed' buildings
+        """
+        with self._membership_lock:
+            return self._rebalance(extra_nodes)
+
+    def _rebalance(self, extra_nodes: Iterable[str] = ()) -> Dict:
+        moved = failed = 0
+        for node in self.ring.nodes + list(extra_nodes):
+            try:
+                status, listing = self.send_json(node, 'GET', '/api/buildings', {}, None)
+            except NodeError as e:
+                logger.warning(f"Skipping rebalance of {node}: {e}")
+                continue
+            if status != 200:
+                continue
+            for entry in listing['buildings']:
+                owner = self.ring.node_for(entry['buildingId'])
+                if owner == node:
+                    continue
+                try:
+                    status, _ = self.send_json(owner, 'POST', '/api/buildings', {}, entry)
+                    if status == 201:
+                        self.send_json(node, 'DELETE', f"/api/buildings/{entry['buildingId']}", {}, None)
+                        moved += 1
+                        continue
+                except NodeError as e:
+                    logger.warning(f"Could not move building {entry['buildingId']}: {e}")
+                failed += 1
+        logger.info(f"Rebalanced {moved} registered buildings across {len(self.ring.nodes)} nodes ({failed} failed)")
+        return {'moved': moved, 'failed': failed}
+
+    def describe(self) -> Dict:
+        nodes = self.ring.nodes
+        status = {}
+        for node in nodes:
+            try:
+                code, _ = self.send_json(node, 'GET', '/api/health', {}, None)
+                status[node] = 'healthy' if code == 200 else f'status {code}'
+            except NodeError as e:
+                status[node] = str(e)
+        return {'nodes': status, 'vnodes': self.ring.vnodes}
+
+
+def create_router_app(router: ShardRouter, token: Optional[str] = None) -> Flask:
+    """
+    Flask app proxying /api/* through the router
+
+    /router/nodes lists ring members with their health; POST (with {'node': ...}) and
+    DELETE /router/nodes/<node> change membership and need the bearer token.
+    Without a token, membership is fixed.
+    """
+    app = Flask(__name__)
+
+    def authorized() -> bool:
+        presented = request.headers.get('Authorization', '')[len('Bearer '):]
+        return bool(token) and hmac.compare_digest(presented.encode(), token.encode())
+
+    @app.route('/router/nodes', methods=['GET'])
+    def list_nodes():
+        return jsonify(router.describe())
+
+    @app.route('/router/nodes', methods=['POST'])
+    def add_node():
+        if not authorized():
+            return jsonify({'error': 'Router token required'}), 403
+        node = (request.get_json(silent=True) or {}).get('node')
+        if not node:
+            return jsonify({'error': 'node required'}), 400
+        try:
+            return jsonify(router.add_node(node)), 201
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+
+    @app.route('/router/nodes/<path:node>', methods=['DELETE'])
+    def remove_node(node):
+        if not authorized():
+            return jsonify({'error': 'Router token required'}), 403
+        try:
+            return jsonify(router.remove_node(node))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 404
+
+    @app.route('/api/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+    def proxy(path):
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        try:
+            status, response_headers, body = router.route(
+                request.method, f'/api/{path}', request.query_string.decode(), headers, request.get_data()
+            )
+        except NodeError as e:
+            logger.error(str(e))
+            return jsonify({'error': str(e)}), 502
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 503
+        response = Response(body, status=status)
+        for name, value in response_headers.items():
+            if name.lower() not in SKIPPED_HEADERS:
+                response.headers[name] = value
+        return response
+
+    return app
+
+
+def create_app() -> Flask:
+    """
+    Router app configured by environment variables (for gunicorn)
+
+    SHARD_NODES is a comma-separated list of node base URLs; SHARD_VNODES sets
+    ring points per node; ROUTER_TOKEN enables membership changes.
+    """
+    nodes = [node.strip() for node in os.environ.get('SHARD_NODES', '').split(',') if node.strip()]
+    if not nodes:
+        raise ValueError("SHARD_NODES must list at least one backend node")
+    router = ShardRouter(nodes, vnodes=int(os.environ.get('SHARD_VNODES', DEFAULT_VNODES)))
+    return create_router_app(router, os.environ.get('ROUTER_TOKEN'))
+
+
+def spawn_local_nodes(count: int, base_port: int) -> Tuple[List[str], List[subprocess.Popen]]:
+    """Start ``count`` backend processes on consecutive local ports and wait until they answer"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    nodes, processes = [], []
+    for i in range(count):
+        port = base_port + i
+        processes.append(subprocess.Popen(
+            [sys.executable, '-c', f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+            cwd=backend_dir
+        ))
+        nodes.append(f"http://127.0.0.1:{port}")
+    transport = HTTPTransport(timeout=1.0)
+    deadline = time.monotonic() + 60
+    for node in nodes:
+        while True:
+            try:
+                if transport(node, 'GET', '/api/health', {}, b'')[0] == 200:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Node {node} did not start")
+            time.sleep(0.5)
+    return nodes, processes
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Consistent-hash router in front of several backend nodes")
+    parser.add_argument('--nodes', help="Comma-separated node base URLs")
+    parser.add_argument('--spawn', type=int, default=0, help="Start this many local backend processes as nodes")
+    parser.add_argument('--base-port', type=int, default=5101, help="First port of spawned nodes")
+    parser.add_argument('--port', type=int, default=8000, help="Router port")
+    parser.add_argument('--vnodes', type=int, default=DEFAULT_VNODES, help="Ring points per node")
+    args = parser.parse_args()
+
+    nodes = [node.strip() for node in (args.nodes or '').split(',') if node.strip()]
+    processes = []
+    if args.spawn:
+        spawned, processes = spawn_local_nodes(args.spawn, args.base_port)
+        nodes += spawned
+    if not nodes:
+        parser.error("give --nodes or --spawn")
+
+    router = ShardRouter(nodes, vnodes=args.vnodes)
+    logger.info(f"Routing across {len(nodes)} nodes: {', '.join(nodes)}")
+    try:
+        create_router_app(router, os.environ.get('ROUTER_TOKEN')).run(host='0.0.0.0', port=args.port, threaded=True)
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
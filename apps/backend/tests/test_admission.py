@@ -0,0 +1,99 @@
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from admission import AdmissionController, AdmissionRejected
+
+CLASSES = {
+    'control': {'priority': 0, 'limit': 2, 'queue': 4, 'timeout': 2.0},
+    'bulk': {'priority': 2, 'limit': 1, 'queue': 1, 'timeout': 2.0}
+}
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+def test_full_class_queue_is_rejected_with_429():
+    controller = AdmissionController(capacity=4, classes=CLASSES)
+    started = controller.acquire('bulk')
+    
+    queued = threading.Thread(target=lambda: controller.release('bulk', controller.acquire('bulk')))
+    queued.start()
+    wait_until(lambda: controller.describe()['classes']['bulk']['queued'] == 1)
+    
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk')
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after >= 1
+    
+    # Control traffic still has its own slots while bulk is saturated
+    controller.release('control', controller.acquire('control'))
+    
+    controller.release('bulk', started)
+    queued.join()
+    stats = controller.describe()['classes']['bulk']
+    assert stats['admitted'] == 2 and stats['rejected_queue_full'] == 1 and stats['running'] == 0
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    controller = AdmissionController(capacity=1, classes=CLASSES)
+    started = controller.acquire('control')
+    order = []
+    
+    def run(request_class):
+        token = controller.acquire(request_class)
+        order.append(request_class)
+        controller.release(request_class, token)
+    
+    bulk = threading.Thread(target=run, args=('bulk',))
+    bulk.start()
+    wait_until(lambda: controller.describe()['classes']['bulk']['queued'] == 1)
+    control = threading.Thread(target=run, args=('control',))
+    control.start()
+    wait_until(lambda: controller.describe()['classes']['control']['queued'] == 1)
+    
+    controller.release('control', started)
+    bulk.join()
+    control.join()
+    assert order == ['control', 'bulk']
+
+def test_queue_wait_timeout_is_rejected_with_503():
+    controller = AdmissionController(capacity=1, classes={'bulk': {**CLASSES['bulk'], 'timeout': 0.05}})
+    started = controller.acquire('bulk')
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk')
+    assert rejected.value.status == 503
+    controller.release('bulk', started)
+    assert controller.describe()['classes']['bulk']['rejected_timeout'] == 1
+
+def test_shed_request_gets_retry_after(monkeypatch):
+    import app as app_module
+    saturated = AdmissionController(
+        capacity=1, classes={name: {**config, 'limit': 0, 'queue': 0} for name, config in CLASSES.items()}
+    )
+    monkeypatch.setattr(app_module, 'admission_controller', saturated)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        rv = client.get('/api/forecast/building-1')
+    assert rv.status_code == 429
+    assert int(rv.headers['Retry-After']) >= 1
+    assert rv.get_json()['request_class'] == 'control'
+
+def test_health_and_metrics_bypass_a_saturated_worker(monkeypatch):
+    import app as app_module
+    saturated = AdmissionController(
+        capacity=1, classes={name: {**config, 'limit': 0, 'queue': 0} for name, config in CLASSES.items()}
+    )
+    monkeypatch.setattr(app_module, 'admission_controller', saturated)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        assert client.get('/api/forecast/building-1').status_code == 429
+        assert client.get('/api/health').status_code == 200
+        assert client.get('/api/admission').status_code == 200
+        assert client.get('/api/drift').status_code != 429
@@ -0,0 +1,126 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dispatch import DispatchOptimizer, Plant
+from request_decoding import RequestDecodeError
+
+START = datetime(2024, 1, 8)
+HOURS = np.arange(48)
+DEMAND = 1500 + 800 * np.sin((HOURS - 6) / 24 * 2 * np.pi)
+# Electricity is dear in the day, which makes CHP heat cheaper than gas
+PRICE = 0.10 + 0.12 * ((HOURS % 24 >= 7) & (HOURS % 24 <= 20))
+UNITS = [
+    {'id': 'chp', 'type': 'chp', 'capacityKw': 800, 'efficiency': 0.45, 'fuelCost': 0.05, 'powerToHeat': 0.8},
+    {'id': 'gas', 'type': 'boiler', 'capacityKw': 2000, 'efficiency': 0.9, 'fuelCost': 0.05},
+    {'id': 'oil', 'type': 'boiler', 'capacityKw': 1000, 'efficiency': 0.85, 'fuelCost': 0.09}
+]
+STORAGE = {'capacityKwh': 4000, 'maxChargeKw': 1000, 'maxDischargeKw': 1000, 'lossPerHour': 0.0}
+
+def test_without_storage_units_follow_merit_order():
+    """Each hour is filled cheapest unit first; overflow beyond capacity is reported unserved."""
+    plant = Plant.from_request({'units': UNITS})
+    demand = np.array([500.0, 1500.0, 3500.0, 4000.0])
+    schedule = DispatchOptimizer().optimize('plant', plant, demand, START, electricity_price=0.05)
+
+    # At 0.05/kWh electricity: gas (0.056) < chp (0.071) < oil (0.106)
+    np.testing.assert_allclose(schedule['setpoints'], [
+        [0, 500, 0], [0, 1500, 0], [800, 2000, 700], [800, 2000, 1000]
+    ])
+    np.testing.assert_allclose(schedule['unserved'], [0, 0, 0, 200])
+    np.testing.assert_allclose(schedule['electricity'][:, 0], 0.8 * schedule['setpoints'][:, 0])
+
+def test_storage_shifts_production_and_respects_limits():
+    """A lossless store with spare CHP capacity lowers the cost, within its energy and rate limits."""
+    demand = np.where(PRICE > 0.15, 400.0, 1800.0)
+    optimizer = DispatchOptimizer()
+    without = optimizer.optimize('a', Plant.from_request({'units': UNITS}), demand, START, PRICE)
+    plant = Plant.from_request({'units': UNITS, 'storage': {**STORAGE, 'initialKwh': 2000}})
+    schedule = optimizer.optimize('b', plant, demand, START, PRICE)
+
+    assert schedule['total_cost'] < without['total_cost']
+    # Charged by CHP while electricity is dear, discharged at night
+    assert schedule['storage_flow'][PRICE > 0.15].sum() > 0 > schedule['storage_flow'][PRICE < 0.15].sum()
+    np.testing.assert_allclose(schedule['production'] - schedule['storage_flow'], demand, atol=1e-9)
+    np.testing.assert_allclose(schedule['setpoints'].sum(axis=1), schedule['production'], atol=1e-9)
+    assert (schedule['storage_kwh'] >= 0).all() and (schedule['storage_kwh'] <= 4000).all()
+    assert schedule['storage_flow'].max() <= 1000 + 1e-9 and schedule['storage_flow'].min() >= -1000 - 1e-9
+    assert schedule['storage_kwh'][0] == 2000 and schedule['storage_kwh'][-1] >= 2000 - 40
+
+def test_next_hour_is_warm_started_from_the_previous_plan():
+    """Re-optimizing an hour later searches near the old plan and matches a full solve."""
+    optimizer = DispatchOptimizer()
+    first = optimizer.optimize('plant', Plant.from_request({'units': UNITS, 'storage': {**STORAGE, 'initialKwh': 2000}}),
+                               DEMAND, START, PRICE)
+    plant = Plant.from_request({'units': UNITS, 'storage': STORAGE})
+    later = START.replace(hour=1)
+    warm = optimizer.optimize('plant', plant, DEMAND[1:] * 1.02, later, PRICE[1:])
+
+    assert warm['method'] == 'warm_start'
+    # The store starts where the previous plan said it would be
+    assert warm['storage_kwh'][0] == first['storage_kwh'][1]
+    cold = DispatchOptimizer().optimize(
+        'plant', Plant.from_request({'units': UNITS, 'storage': {**STORAGE, 'initialKwh': float(warm['storage_kwh'][0])}}),
+        DEMAND[1:] * 1.02, later, PRICE[1:]
+    )
+    assert cold['method'] == 'full'
+    assert warm['total_cost'] == pytest.approx(cold['total_cost'], rel=1e-4)
+
+def test_kept_plans_are_bounded_by_recent_use():
+    """Plans for many plant ids evict the least recently dispatched, so warm starts stay for active plants."""
+    optimizer = DispatchOptimizer(max_plans=2)
+    plant = Plant.from_request({'units': UNITS, 'storage': {**STORAGE, 'initialKwh': 2000}})
+    for plant_id in ('a', 'b', 'a', 'c'):
+        optimizer.optimize(plant_id, plant, DEMAND, START, PRICE)
+
+    later = Plant.from_request({'units': UNITS, 'storage': STORAGE})
+    assert optimizer.optimize('a', later, DEMAND[1:] * 1.02, START.replace(hour=1), PRICE[1:])['method'] == 'warm_start'
+    assert optimizer.optimize('b', later, DEMAND[1:] * 1.02, START.replace(hour=1), PRICE[1:])['method'] == 'full'
+
+    with pytest.raises(RequestDecodeError):
+        Plant.from_request({'units': UNITS, 'storage': STORAGE, 'storageLevels': 1001})
+
+def test_plant_errors_name_their_fields():
+    with pytest.raises(RequestDecodeError) as raised:
+        Plant.from_request({'units': [{'type': 'turbine', 'capacityKw': -1, 'efficiency': 0.9, 'fuelCost': 0.05},
+                                      {'type': 'chp', 'capacityKw': 100, 'efficiency': 0.4, 'fuelCost': 0.05}]})
+    assert [path for path, _ in raised.value.errors] == [
+        'plant.units[0].type', 'plant.units[0].capacityKw', 'plant.units[1].powerToHeat'
+    ]
+
+def test_dispatch_endpoint(monkeypatch):
+    """Explicit demand and forecast-driven requests both return per-unit schedules."""
+    import app as app_module
+    monkeypatch.setattr(app_module, 'dispatch_optimizer', DispatchOptimizer())
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        rv = client.post('/api/dispatch', json={
+            'plant': {'units': UNITS, 'storage': STORAGE}, 'demand': DEMAND.tolist(),
+            'electricityPrice': PRICE.tolist(), 'start': START.isoformat()
+        })
+        assert rv.status_code == 200
+        body = rv.get_json()
+        assert set(body['units']) == {'chp', 'gas', 'oil'} and len(body['timestamps']) == 48
+        assert len(body['storage']['level_kwh']) == 49 and body['summary']['unserved_kwh'] == 0
+
+        building = {
+            'buildingId': 'b1', 'buildingData': {'floorArea': 2000},
+            'weatherData': {'temperature': 2.0}, 'weatherForecast': [{'temperature': 2.0 - 0.1 * i} for i in range(23)]
+        }
+        rv = client.post('/api/dispatch', json={
+            'plant': {'units': UNITS[1:]}, 'buildings': [building, {**building, 'buildingId': 'b2'}],
+            'demandSeries': 'confidence_high'
+        })
+        assert rv.status_code == 200, rv.get_json()
+        body = rv.get_json()
+        assert len(body['production']) == 24 and body['solver']['method'] == 'full'
+        np.testing.assert_allclose(body['production'], body['demand'])
+
+        rv = client.post('/api/dispatch', json={'plant': {'units': []}, 'demand': [1.0]})
+        assert rv.status_code == 400 and rv.get_json()['field_errors'][0]['field'] == 'plant.units'
+        assert client.post('/api/dispatch', json={'plant': {'units': UNITS}}).status_code == 400
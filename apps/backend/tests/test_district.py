@@ -0,0 +1,81 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from district import DistrictAggregator, flatten_district
+
+def make_district(area_b3=100.0):
+    return {
+        'id': 'network',
+        'children': [
+            {'id': 'sub-a', 'children': [
+                {'buildingId': 'b1', 'location': 'site', 'buildingData': {'floorArea': 100.0}},
+                {'buildingId': 'b2', 'location': 'site', 'buildingData': {'floorArea': 200.0}}
+            ]},
+            {'id': 'sub-b', 'children': [
+                {'id': 'feeder-1', 'children': [
+                    {'buildingId': 'b3', 'location': 'site', 'buildingData': {'floorArea': area_b3}}
+                ]}
+            ]}
+        ]
+    }
+
+class CountingScorer:
+    """Scores each building as a flat line equal to its floor area, recording the calls."""
+    def __init__(self):
+        self.calls = []
+    def __call__(self, buildings, horizon):
+        self.calls.append([b['buildingId'] for b in buildings])
+        demand = np.array([[b['buildingData']['floorArea']] * horizon for b in buildings])
+        return {
+            'demand': demand, 'confidence_low': demand * 0.9, 'confidence_high': demand * 1.1,
+            'building_ids': [b['buildingId'] for b in buildings]
+        }
+
+def test_rollup_sums_children():
+    """Test that every node carries the sum of the buildings beneath it."""
+    aggregator = DistrictAggregator(CountingScorer(), lambda location: 'v1')
+    result = aggregator.aggregate(make_district(), 24)
+    
+    assert result['order'][-1] == 'network'
+    assert np.allclose(result['nodes']['sub-a']['demand'], 300.0)
+    assert np.allclose(result['nodes']['network']['demand'], 400.0)
+    assert result['nodes']['network']['buildings'] == 3
+
+def test_change_recomputes_only_its_path():
+    """Test that changing one building re-scores it alone and re-sums only its ancestors."""
+    scorer = CountingScorer()
+    aggregator = DistrictAggregator(scorer, lambda location: 'v1')
+    aggregator.aggregate(make_district(), 24)
+    
+    result = aggregator.aggregate(make_district(area_b3=500.0), 24)
+    
+    assert scorer.calls[-1] == ['b3']
+    assert result['recomputed'] == {'buildings': 1, 'nodes': 3}
+    assert np.allclose(result['nodes']['network']['demand'], 800.0)
+
+def test_duplicate_node_ids_rejected():
+    """Test that ambiguous district definitions are rejected."""
+    with pytest.raises(ValueError):
+        flatten_district({'id': 'x', 'children': [{'id': 'x', 'children': []}]})
+
+def test_current_conditions_are_part_of_the_building_key():
+    """Test that changing only a building's current weather re-scores it, and numeric ids are accepted."""
+    scorer = CountingScorer()
+    aggregator = DistrictAggregator(scorer, lambda location: 'v1')
+    forecast = [{'temperature': 5.0}] * 23
+    def district(temperature):
+        return {'id': 'network', 'children': [
+            {'buildingId': 7, 'buildingData': {'floorArea': 100.0},
+             'weatherData': {'temperature': temperature}, 'weatherForecast': forecast}
+        ]}
+    aggregator.aggregate(district(5.0), 24)
+    
+    assert aggregator.aggregate(district(5.0), 24)['recomputed']['buildings'] == 0
+    assert aggregator.aggregate(district(-10.0), 24)['recomputed']['buildings'] == 1
+    assert aggregator.aggregate(district(-10.0), 24, 'reloaded')['recomputed']['buildings'] == 1
+    assert scorer.calls == [[7], [7], [7]]
@@ -0,0 +1,97 @@
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from drift_monitor import DriftMonitor, IQR_TO_STD
+
+def test_reference_like_traffic_is_stable_and_shift_is_flagged():
+    monitor = DriftMonitor(['temp', 'wind'], center=[10.0, 5.0], scale=[8.0, 4.0])
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        batch = rng.normal(0.0, IQR_TO_STD, (500, 2))
+        batch[:, 1] += 1.5  # wind runs well above its training median
+        monitor.update(batch)
+    
+    report = monitor.report()
+    assert report['rows'] == 10000
+    assert report['features']['temp']['status'] == 'ok'
+    assert report['features']['temp']['ks'] < 0.05
+    assert abs(report['features']['temp']['p50'] - 10.0) < 0.5
+    assert report['drifting_features'] == ['wind']
+    assert abs(report['features']['wind']['mean'] - (5.0 + 1.5 * 4.0)) < 0.3
+
+def test_counts_decay_with_half_life():
+    monitor = DriftMonitor(['temp'], center=[0.0], scale=[1.0], half_life_rows=100)
+    monitor.update(np.full((100, 1), -1.0))
+    monitor.update(np.full((100, 1), 1.0))
+    report = monitor.report()
+    # The first batch has decayed to half the weight of the second
+    assert report['effective_rows'] == 150.0
+    assert abs(report['features']['temp']['mean'] - 1.0 / 3.0) < 1e-9
+
+def test_training_like_traffic_is_ok_for_every_model_feature():
+    """Calendar and heating degree features are scored against exact references, so healthy traffic is ok."""
+    import json
+    with open(os.path.join(os.path.dirname(__file__), '..', 'model_info.json')) as f:
+        model_info = json.load(f)
+    monitor = DriftMonitor.from_model_info(model_info)
+    center, scale = np.array(model_info['scaler_info']['center']), np.array(model_info['scaler_info']['scale'])
+    
+    rng = np.random.default_rng(0)
+    n = 5000
+    temperature = rng.normal(center[0], scale[0] * IQR_TO_STD, n)
+    day_of_week = rng.integers(0, 7, n)
+    columns = {
+        'outdoor_temp_synthetic': temperature,
+        'hdh': np.maximum(0, 17.0 - temperature),
+        'hour': rng.integers(0, 24, n),
+        'day_of_week': day_of_week,
+        'month': rng.integers(1, 13, n),
+        'is_weekend': (day_of_week >= 5).astype(float)
+    }
+    for i, name in enumerate(model_info['feature_names']):
+        columns.setdefault(name, rng.normal(center[i], scale[i] * IQR_TO_STD, n))
+    raw = np.column_stack([columns[name] for name in model_info['feature_names']])
+    monitor.update((raw - center) / scale)
+    
+    report = monitor.report()
+    assert report['drifting_features'] == []
+    assert all(f['status'] == 'ok' for f in report['features'].values()), {
+        name: f['psi'] for name, f in report['features'].items()
+    }
+    
+    # Night-only traffic is still caught on the exact hour reference
+    monitor.reset()
+    raw[:, model_info['feature_names'].index('hour')] = rng.integers(0, 6, n)
+    monitor.update((raw - center) / scale)
+    assert monitor.report()['drifting_features'] == ['hour']
+
+def test_heating_degree_reference_follows_served_building_scaling():
+    """A small, well insulated building's scaled hdh is ok against its own reference and would drift against the default one."""
+    import json
+    from feature_service import FeatureService, INSULATION_FACTORS
+    with open(os.path.join(os.path.dirname(__file__), '..', 'model_info.json')) as f:
+        model_info = json.load(f)
+    monitor = DriftMonitor.from_model_info(model_info)
+    center, scale = np.array(model_info['scaler_info']['center']), np.array(model_info['scaler_info']['scale'])
+    names = model_info['feature_names']
+    service = FeatureService()
+    rng = np.random.default_rng(0)
+    n = 5000
+
+    temperature = rng.normal(center[0], scale[0] * IQR_TO_STD, (1, n))
+    building = np.array([[1500.0, INSULATION_FACTORS['excellent'], 85.0, 25.0, 23.0]])
+    features = service.create_decoded_features(temperature[..., None], building_params=building)
+    raw = service.validate_features(features, names).to_numpy(dtype=np.float64)
+    heating_degree = features[['hdh_base_temp', 'hdh_scaling']].to_numpy()
+    assert heating_degree[0, 1] < 0.2
+
+    monitor.update((raw - center) / scale, heating_degree)
+    assert monitor.report()['features']['hdh']['status'] == 'ok'
+
+    monitor.reset()
+    monitor.update((raw - center) / scale)
+    assert monitor.report()['features']['hdh']['status'] == 'drift'
@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+import json
 
 # Add the parent directory to the path so we can import app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -33,3 +34,256 @@ def test_test_prediction_endpoint(client):
     assert json_data['test_successful'] is True
     assert 'prediction' in json_data
     assert type(json_data['prediction']) == float
+
+HORIZON_PAYLOAD = {
+    'weatherData': {'temperature': 8.0, 'windSpeed': 5.0, 'humidity': 70.0},
+    'weatherForecast': [{'temperature': 8.0 - i * 0.2} for i in range(24)],
+    'horizon': 24
+}
+
+def test_horizon_columnar_json_matches_rows(client):
+    """Test that the columnar horizon response carries the same values as the row format."""
+    rows = client.post('/api/predict-horizon', json=HORIZON_PAYLOAD).get_json()
+    rv = client.post(
+        '/api/predict-horizon', json=HORIZON_PAYLOAD,
+        headers={'Accept': 'application/vnd.heat.columnar+json'}
+    )
+    assert rv.status_code == 200
+    assert rv.mimetype == 'application/vnd.heat.columnar+json'
+    columnar = rv.get_json(force=True)
+    
+    assert columnar['length'] == 24
+    assert columnar['step_seconds'] == 3600
+    assert columnar['columns']['demand'] == [p['demand'] for p in rows['predictions']]
+    assert columnar['summary'] == rows['summary']
+
+def test_horizon_msgpack_response(client):
+    """Test that the MessagePack horizon response decodes to float arrays."""
+    msgpack = pytest.importorskip('msgpack')
+    import numpy as np
+    
+    rv = client.post('/api/predict-horizon?format=msgpack', json=HORIZON_PAYLOAD)
+    assert rv.status_code == 200
+    body = msgpack.unpackb(rv.data, raw=False)
+    demand = np.frombuffer(body['columns']['demand'], dtype=body['column_dtypes']['demand'])
+    
+    assert demand.shape == (24,)
+    assert body['total_predictions'] == 24
+
+def test_unknown_format_rejected(client):
+    """Test that an explicitly requested unknown format is rejected with 406."""
+    rv = client.post('/api/predict?format=xml', json={'weatherData': {'temperature': 10.0}})
+    assert rv.status_code == 406
+
+def test_batch_matches_single_horizon(client):
+    """Test that a batched horizon gives the same demand curve as the single-building route."""
+    single = client.post('/api/predict-horizon', json=HORIZON_PAYLOAD).get_json()
+    building = {
+        'buildingId': 'b1',
+        'weatherData': HORIZON_PAYLOAD['weatherData'],
+        'weatherForecast': HORIZON_PAYLOAD['weatherForecast']
+    }
+    rv = client.post('/api/predict-batch', json={'horizon': 24, 'buildings': [building, dict(building, buildingId='b2')]})
+    assert rv.status_code == 200
+    json_data = rv.get_json()
+    
+    assert json_data['total_buildings'] == 2
+    assert [r['buildingId'] for r in json_data['results']] == ['b1', 'b2']
+    batch_demand = [p['demand'] for p in json_data['results'][0]['predictions']]
+    assert batch_demand == [p['demand'] for p in single['predictions']]
+
+def test_horizon_from_cached_location(client):
+    """Test that a horizon request can refer to a pushed forecast by location."""
+    forecast = [{'temperature': 8.0 - i * 0.2} for i in range(48)]
+    rv = client.put('/api/weather/test-site', json={'forecast': forecast})
+    assert rv.status_code == 200
+    assert rv.get_json()['hours'] == 48
+    
+    rv = client.post('/api/predict-horizon', json={'location': 'test-site', 'horizon': 24})
+    assert rv.status_code == 200
+    assert rv.get_json()['total_predictions'] == 24
+    
+    rv = client.post('/api/predict-horizon', json={'location': 'unknown-site', 'horizon': 24})
+    assert rv.status_code == 404
+
+def test_history_from_stored_predictions(client, tmp_path, monkeypatch):
+    """Test that identified horizon predictions and actuals are queryable as history."""
+    import app as app_module
+    from storage import create_store
+    store = create_store(f"sqlite:///{tmp_path / 'history.db'}")
+    monkeypatch.setattr(app_module, 'prediction_store', store)
+    
+    rv = client.post('/api/predict-horizon', json=dict(HORIZON_PAYLOAD, buildingId='b1'))
+    first_hour = rv.get_json()['predictions'][0]['timestamp'][:13] + ':00:00'
+    rv = client.post('/api/actuals', json={
+        'buildingId': 'b1', 'observations': [{'timestamp': first_hour, 'demand': 2.5}]
+    })
+    assert rv.status_code == 202
+    store.flush()
+    
+    rv = client.get(f'/api/history/b1?start={first_hour}&end=2100-01-01T00:00:00&resolution=day')
+    assert rv.status_code == 200
+    bucket = rv.get_json()['buckets'][0]
+    assert bucket['actual_total'] == 2.5
+    assert bucket['predicted_count'] >= 1
+    store.close()
+
+def test_single_prediction_is_stored_at_the_hour_it_predicted(client, tmp_path, monkeypatch):
+    """An offset timestamp is featurized and stored as the same wall-clock hour, and so are its actuals."""
+    import app as app_module
+    from storage import create_store
+    store = create_store(f"sqlite:///{tmp_path / 'history.db'}")
+    monkeypatch.setattr(app_module, 'prediction_store', store)
+    
+    payload = {'buildingId': 'b1', 'timestamp': '2025-01-15T08:30:00+05:00', 'weatherData': {'temperature': 4.0}}
+    predicted = client.post('/api/predict', json=payload).get_json()
+    naive = client.post('/api/predict', json={**payload, 'buildingId': 'b2', 'timestamp': '2025-01-15T08:30:00'}).get_json()
+    client.post('/api/actuals', json={'buildingId': 'b1', 'observations': [{'timestamp': '2025-01-15T08:10:00+05:00', 'demand': 2.0}]})
+    store.flush()
+    
+    assert predicted['heat_demand_kw'] == naive['heat_demand_kw']
+    rows = store.query_range('predictions', 'b1', '2025-01-15', '2025-01-16')
+    assert [row['timestamp'] for row in rows] == ['2025-01-15T08:00:00']
+    buckets = client.get('/api/history/b1?start=2025-01-15T00:00:00&end=2025-01-16T00:00:00&resolution=hour').get_json()['buckets']
+    assert buckets[0]['timestamp'] == '2025-01-15T08:00:00' and buckets[0]['actual_total'] == 2.0
+    store.close()
+
+def test_precomputed_forecast_served_from_cache(client):
+    """Test that a registered building's forecast is served from the scheduler snapshot."""
+    import app as app_module
+    client.put('/api/weather/cache-site', json={'forecast': [{'temperature': 5.0}] * 48})
+    rv = client.post('/api/buildings', json={'buildingId': 'cached-1', 'location': 'cache-site'})
+    assert rv.status_code == 201
+    
+    app_module.forecast_scheduler.refresh()
+    rv = client.get('/api/forecast/cached-1?horizon=48')
+    assert rv.status_code == 200
+    json_data = rv.get_json()
+    
+    assert json_data['total_predictions'] == 48
+    assert json_data['cache_version'] >= 1
+    assert client.get('/api/forecast/not-registered').status_code == 404
+    client.delete('/api/buildings/cached-1')
+
+def test_explain_contributions_sum_to_prediction(client):
+    """SHAP contributions plus the expected value reproduce the model output, and repeats hit the cache."""
+    payload = {**HORIZON_PAYLOAD, 'buildingId': 'explain-b1'}
+    rv = client.post('/api/explain', json=payload)
+    assert rv.status_code == 200
+    explained = rv.get_json()
+    result = explained['results'][0]
+    assert len(result['contributions']) == 24
+    assert len(result['contributions'][0]) == len(explained['feature_names'])
+    
+    predicted = client.post('/api/predict-horizon', json=HORIZON_PAYLOAD).get_json()
+    assert result['predictions'] == pytest.approx([p['demand'] for p in predicted['predictions']])
+    
+    again = client.post('/api/explain', json=payload).get_json()
+    assert again['cache'] == {'cached': 1, 'computed': 0}
+    assert again['results'][0]['contributions'] == result['contributions']
+    
+    # Current conditions are hour 0, so a colder now with the same forecast is explained afresh
+    colder = {**payload, 'weatherData': {**payload['weatherData'], 'temperature': -10.0}}
+    changed = client.post('/api/explain', json=colder).get_json()
+    assert changed['cache'] == {'cached': 0, 'computed': 1}
+    predicted = client.post('/api/predict-horizon', json=colder).get_json()
+    assert changed['results'][0]['predictions'] == pytest.approx([p['demand'] for p in predicted['predictions']])
+    
+    single = client.post('/api/explain', json={'weatherData': {'temperature': 3.0}}).get_json()
+    assert single['horizon_hours'] == 1
+    assert single['global_importance'][0]['feature'] == 'hour'
+
+def test_drift_report_counts_defaulted_inputs(client):
+    """Scored batches feed the drift monitor, and missing weather fields are counted."""
+    client.get('/api/drift?reset=true')
+    client.post('/api/predict-horizon', json=HORIZON_PAYLOAD)
+    
+    report = client.get('/api/drift').get_json()
+    assert report['rows'] == 24
+    assert set(report['features']) == set(client.get('/api/features').get_json()['features'])
+    assert report['features']['outdoor_temp_synthetic']['p05'] < report['features']['outdoor_temp_synthetic']['p95']
+    # Forecast hours only carry a temperature, the current hour also has wind and humidity
+    assert report['defaulted_inputs']['weather.windSpeed'] == 23
+    assert report['defaulted_inputs']['weather.pressure'] == 24
+
+def test_invalid_fields_are_rejected_with_their_paths(client):
+    """Wrong values fail fast with per-field errors rather than silently taking defaults."""
+    payload = {**HORIZON_PAYLOAD, 'weatherForecast': [{'temperature': 'cold'}], 'buildingData': {'floorArea': 'big'}}
+    rv = client.post('/api/predict-horizon', json=payload)
+    assert rv.status_code == 400
+    assert rv.get_json()['field_errors'] == [
+        {'field': 'buildingData.floorArea', 'message': 'must be a number'}
+    ]
+
+    rv = client.post('/api/predict-batch', json={'buildings': [HORIZON_PAYLOAD, {**HORIZON_PAYLOAD, 'weatherForecast': [{'temperature': 'cold'}]}]})
+    assert rv.status_code == 400
+    assert rv.get_json()['field_errors'][0]['field'] == 'buildings[1].weatherForecast[0].temperature'
+
+def test_frontend_fallback_forecast_is_accepted(client):
+    """The frontend's generated fallback forecast still scores; fields the model ignores are clipped and counted."""
+    forecast = [{
+        'temperature': 5 + hour * 2, 'windSpeed': 3 + hour * 0.5, 'humidity': 80 - hour * 2,
+        'solarRadiation': 100 + hour * 50, 'cloudCover': 8 - hour, 'pressure': 101325, 'precipitation': 0
+    } for hour in range(1, 25)]
+    client.get('/api/drift?reset=true')
+    rv = client.post('/api/predict-horizon', json={**HORIZON_PAYLOAD, 'weatherForecast': forecast})
+    assert rv.status_code == 200
+    assert len(rv.get_json()['predictions']) == 24
+    assert client.get('/api/drift').get_json()['defaulted_inputs']['weather.cloudCover.clipped'] == 23 - 8
+
+def test_malformed_bodies_are_field_errors_on_every_endpoint(client, tmp_path, monkeypatch):
+    """Lists, wrong-typed entries and bad JSON give 400 field errors on the non-prediction endpoints too."""
+    import app as app_module
+    from storage import create_store
+    store = create_store(f"sqlite:///{tmp_path / 'history.db'}")
+    monkeypatch.setattr(app_module, 'prediction_store', store)
+    
+    cases = [
+        ('post', '/api/explain', [HORIZON_PAYLOAD], 'body'),
+        ('post', '/api/explain', {'buildings': [HORIZON_PAYLOAD, 'b2']}, 'buildings[1]'),
+        ('post', '/api/district/aggregate', {'district': {'id': 'n', 'children': ['b1']}}, 'district.children[0]'),
+        ('post', '/api/district/aggregate', {'district': {'id': 'n', 'children': []}, 'horizon': '24'}, 'horizon'),
+        ('post', '/api/actuals', {'buildingId': 'b1', 'observations': [{'timestamp': 'today', 'demand': '2'}]},
+         'observations[0].timestamp'),
+        ('post', '/api/buildings', {'buildingId': 'b1', 'location': '../etc'}, 'location'),
+        ('put', '/api/weather/site-1', {'forecast': [{'temperature': 'cold'}]}, 'forecast[0].temperature'),
+        ('put', '/api/weather/site-1', ['not', 'an', 'object'], 'body')
+    ]
+    for method, path, payload, field in cases:
+        rv = getattr(client, method)(path, json=payload)
+        assert rv.status_code == 400, (path, rv.get_json())
+        assert rv.get_json()['field_errors'][0]['field'] == field
+    
+    rv = client.post('/api/buildings', data=b'{"buildingId": ', content_type='application/json')
+    assert rv.status_code == 400 and rv.get_json()['field_errors'][0]['field'] == 'body'
+    store.close()
+
+def test_metadata_routes_are_precomputed_and_conditional(client):
+    """Metadata is served from cached bytes with ETags, gzip and 304 on revalidation."""
+    import gzip
+    for path in ('/api/model-info', '/api/features', '/api/sample'):
+        rv = client.get(path)
+        assert rv.status_code == 200
+        assert rv.headers['Cache-Control'] == 'public, max-age=60, must-revalidate'
+        etag = rv.headers['ETag']
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert client.get(path).headers['ETag'] == etag
+
+        rv = client.get(path, headers={'If-None-Match': etag})
+        assert rv.status_code == 304 and rv.data == b''
+
+    rv = client.get('/api/model-info', headers={'Accept-Encoding': 'gzip'})
+    assert rv.headers['Content-Encoding'] == 'gzip' and rv.headers['Vary'] == 'Accept-Encoding'
+    body = json.loads(gzip.decompress(rv.data))
+    assert body == client.get('/api/model-info').get_json()
+    assert len(body['top_features']) <= 10
+    # Either representation's tag revalidates
+    assert client.get('/api/model-info', headers={'If-None-Match': rv.headers['ETag']}).status_code == 304
+
+def test_expired_location_forecast_is_unavailable(client):
+    """A pushed forecast that ended before now gives 503 rather than its last hour repeated."""
+    client.put('/api/weather/old-site', json={'forecast': [
+        {'timestamp': f'2020-01-01T{hour:02d}:00:00', 'temperature': 3.0} for hour in range(24)
+    ]})
+    rv = client.post('/api/predict-horizon', json={'location': 'old-site', 'horizon': 24})
+    assert rv.status_code == 503
@@ -0,0 +1,91 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from feature_definitions import HEATING_ML_FEATURES, WEATHER_LAG_FEATURES
+from feature_service import FeatureService
+from request_decoding import FieldErrors, decode_building_data, decode_weather
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'building_data', 'processed'))
+
+def test_bulk_features_match_training_dataset():
+    """Recomputing heating_ml_features.csv from raw columns reproduces it wherever history is complete."""
+    data = pd.read_csv(os.path.join(DATA_DIR, 'heating_ml_features.csv'), parse_dates=['datetime'])
+    shuffled = data.sample(frac=1, random_state=0)
+
+    features = HEATING_ML_FEATURES.compute(shuffled, timestamp_column='datetime', group_column='building_type')
+
+    assert list(features.index) == list(shuffled.index)
+    position = shuffled.groupby('building_type')['datetime'].rank(method='first') - 1
+    complete = position >= HEATING_ML_FEATURES.history
+    np.testing.assert_allclose(
+        features.loc[complete].astype(float).values,
+        shuffled.loc[complete, HEATING_ML_FEATURES.names].astype(float).values,
+        atol=1e-9
+    )
+
+def test_stream_matches_bulk_per_group():
+    """The incremental serving path yields the same rows as the grouped bulk path, including warm-up."""
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame({
+        'datetime': np.tile(pd.date_range('2024-01-01', periods=40, freq='h'), 2),
+        'building_type': np.repeat(['bungalow', 'detached'], 40),
+        'outdoor_temp': rng.normal(5, 3, 80),
+        'heating_demand_kwh': rng.gamma(2.0, 5.0, 80)
+    })
+    bulk = HEATING_ML_FEATURES.compute(frame, timestamp_column='datetime', group_column='building_type')
+
+    for _, group in frame.groupby('building_type'):
+        stream = HEATING_ML_FEATURES.stream()
+        rows = [stream.update(record, record['datetime']) for record in group.to_dict('records')]
+        np.testing.assert_allclose(
+            pd.DataFrame(rows).astype(float).values, bulk.loc[group.index].astype(float).values
+        )
+
+def per_building_horizon(service, current, forecast, building_data, horizon, start):
+    """The per-building path: one hour at a time through a feature stream, scaled row by row."""
+    hourly = [current] + list(forecast[:horizon - 1])
+    hourly += [hourly[-1]] * (horizon - len(hourly))
+    stream = service.feature_set.stream()
+    rows = []
+    for hour, weather in enumerate(hourly):
+        row = stream.update({'outdoor_temp_synthetic': weather['temperature']}, start + timedelta(hours=hour))
+        rows.append(service._apply_building_scaling(row, building_data) if building_data else row)
+    return pd.DataFrame(rows)
+
+def decoded_horizon_features(service, entries, horizon, start):
+    """The served path: decode request fields, then build every building's horizon in one pass."""
+    errors = FieldErrors()
+    weather = np.stack([decode_weather(current, forecast, horizon, '', errors) for current, forecast, _ in entries])
+    params = np.stack([decode_building_data(building_data, 'buildingData', errors) for _, _, building_data in entries])
+    assert not errors
+    return service.create_decoded_features(weather, start, params)
+
+def test_batch_horizon_features_equal_per_building_features():
+    """The served, decoded batch matches the per-building, hour-by-hour path for every building."""
+    service = FeatureService()
+    start = datetime(2024, 1, 6, 8)
+    entries = [
+        ({'temperature': 4.0}, [{'temperature': 4.0 + i} for i in range(30)], {}),
+        ({'temperature': -2.0}, [{'temperature': -1.0}], {'floorArea': 3000, 'insulationLevel': 'poor'})
+    ]
+
+    batch = decoded_horizon_features(service, entries, 24, start)
+
+    assert len(batch) == 48
+    for i, (current, forecast, building_data) in enumerate(entries):
+        single = decoded_horizon_features(service, [(current, forecast, building_data)], 24, start)
+        pd.testing.assert_frame_equal(batch.iloc[i * 24:(i + 1) * 24].reset_index(drop=True), single)
+        reference = per_building_horizon(service, current, forecast, building_data, 24, start)
+        np.testing.assert_allclose(
+            batch.iloc[i * 24:(i + 1) * 24][list(reference.columns)].astype(float).values,
+            reference.astype(float).values
+        )
+    # Lags never reach across buildings
+    assert batch.loc[24, 'outdoor_temp_lag_1'] == -2.0
+    assert list(batch.columns[:len(WEATHER_LAG_FEATURES.names)]) == WEATHER_LAG_FEATURES.names
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The job writes Parquet partitions; pyarrow is optional in requirements.txt
+pytest.importorskip('pyarrow')
+
+from feature_service import FeatureService
+from fleet_forecast import BACKEND_DIR, FleetForecastJob
+from request_decoding import FieldErrors, decode_building_data, decode_weather
+
+START = datetime(2024, 1, 8, 6)
+
+@pytest.fixture
+def job_inputs(tmp_path):
+    roster = [
+        {'buildingId': f'b{i}', 'location': 'leeds' if i % 2 else 'york',
+         'buildingData': {'floorArea': 2000 + 500 * i, 'insulationLevel': 'poor'} if i % 3 else {}}
+        for i in range(5)
+    ] + [{'buildingId': 'lost', 'location': 'nowhere'}]
+    forecasts = {
+        location: [
+            {'timestamp': (pd.Timestamp(START) + pd.Timedelta(hours=h - 2)).isoformat(), 'temperature': offset - 0.3 * h}
+            for h in range(20)
+        ]
+        for location, offset in (('leeds', 6.0), ('york', 2.0))
+    }
+    roster_path, forecast_path = tmp_path / 'roster.json', tmp_path / 'forecasts.json'
+    roster_path.write_text(json.dumps(roster))
+    forecast_path.write_text(json.dumps(forecasts))
+    return roster, forecasts, str(roster_path), str(forecast_path), str(tmp_path / 'out')
+
+def test_fleet_job_matches_api_features_and_resumes(job_inputs):
+    roster, forecasts, roster_path, forecast_path, output_dir = job_inputs
+    job = FleetForecastJob(roster_path, forecast_path, output_dir, horizon=24, start=START, shard_size=2, workers=2)
+
+    summary = job.run()
+    assert summary['buildings'] == 5
+    assert summary['shards_written'] == 3 and summary['rows'] == 5 * 24
+
+    result = pd.read_parquet(job.partition_dir).sort_values(['building_id', 'hour'])
+    assert list(result['building_id'].unique()) == ['b0', 'b1', 'b2', 'b3', 'b4']
+
+    # Same numbers as the API path: window from the hour containing START, then per-building scaling
+    service = FeatureService()
+    model = joblib.load(os.path.join(BACKEND_DIR, 'best_heating_model.pkl'))
+    scaler = joblib.load(os.path.join(BACKEND_DIR, 'feature_scaler.pkl'))
+    with open(os.path.join(BACKEND_DIR, 'model_info.json')) as f:
+        feature_names = json.load(f)['feature_names']
+    errors = FieldErrors()
+    weather, params = [], []
+    for building in roster[:5]:
+        points = [{'temperature': p['temperature']} for p in forecasts[building['location']][2:]]
+        weather.append(decode_weather(points[0], points[1:], 24, '', errors))
+        params.append(decode_building_data(building['buildingData'], 'buildingData', errors))
+    features = service.create_decoded_features(np.stack(weather), START, np.stack(params))
+    expected = model.predict(scaler.transform(service.validate_features(features, feature_names)))
+    np.testing.assert_allclose(result['demand'].to_numpy(), expected, rtol=1e-9)
+
+    # A lost shard is recomputed; the others are kept
+    os.remove(job.checkpoint_path(1))
+    resumed = job.run()
+    assert resumed['shards_written'] == 1 and resumed['shards_skipped'] == 2
+    assert len(pd.read_parquet(job.partition_dir)) == 5 * 24
+
+def test_fleet_job_refuses_to_mix_jobs(job_inputs):
+    _, _, roster_path, forecast_path, output_dir = job_inputs
+    FleetForecastJob(roster_path, forecast_path, output_dir, start=START, shard_size=2, workers=1).run()
+
+    other = FleetForecastJob(roster_path, forecast_path, output_dir, horizon=48, start=START, shard_size=2, workers=1)
+    with pytest.raises(ValueError):
+        other.run()
+    assert other.run(force=True)['rows'] == 5 * 48
+
+def test_cli_exits_non_zero_when_shards_fail(job_inputs, monkeypatch):
+    """A run with failed shards reports them and exits 1, so schedulers see the partial output as a failure."""
+    import fleet_forecast
+    _, _, roster_path, forecast_path, output_dir = job_inputs
+    argv = ['fleet_forecast.py', '--roster', roster_path, '--forecasts', forecast_path, '--output-dir', output_dir,
+            '--start', START.isoformat(), '--shard-size', '2', '--workers', '1']
+    monkeypatch.setattr(sys, 'argv', argv)
+    monkeypatch.setattr(FleetForecastJob, 'run', lambda self, force=False: {'shards_failed': 1, 'rows': 48})
+    with pytest.raises(SystemExit) as exit_info:
+        fleet_forecast.main()
+    assert exit_info.value.code == 1
+    
+    monkeypatch.setattr(FleetForecastJob, 'run', lambda self, force=False: {'shards_failed': 0, 'rows': 120})
+    assert fleet_forecast.main()['rows'] == 120
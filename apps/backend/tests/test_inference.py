@@ -0,0 +1,55 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from inference import resolve_interval_config, predict_with_intervals
+
+class ConstantModel:
+    """Stand-in regressor returning a fixed value per row."""
+    def predict(self, X):
+        return np.full(len(X), 10.0)
+
+def test_fixed_fraction_fallback():
+    """Test that models without uncertainty output fall back to the relative band."""
+    config = resolve_interval_config(ConstantModel(), {'model_type': 'LightGBM'})
+    output = predict_with_intervals(ConstantModel(), np.zeros((3, 2)), config)
+    
+    assert output['interval_method'] == 'fixed_fraction'
+    assert np.allclose(output['confidence_low'], 9.5)
+    assert np.allclose(output['confidence_high'], 10.5)
+
+def test_multiquantile_model_detected():
+    """Test that a CatBoost MultiQuantile model returns its own bounds around the median."""
+    catboost = pytest.importorskip('catboost')
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 2))
+    y = X[:, 0] * 5 + rng.normal(0, 0.5, 300)
+    model = catboost.CatBoostRegressor(
+        iterations=30, loss_function='MultiQuantile:alpha=0.1,0.5,0.9',
+        verbose=False, allow_writing_files=False
+    ).fit(X, y)
+    
+    config = resolve_interval_config(model, {})
+    output = predict_with_intervals(model, X[:5], config)
+    
+    assert config == {'method': 'quantile', 'quantiles': [0.1, 0.5, 0.9]}
+    assert np.all(output['confidence_low'] <= output['demand'])
+    assert np.all(output['demand'] <= output['confidence_high'])
+
+def test_unordered_quantiles_pick_the_median_column():
+    """Test that configured quantiles out of order still select the median head as the point prediction."""
+    class HeadsModel:
+        def predict(self, X):
+            # Heads in configured order: median, low, high
+            return np.tile([10.0, 8.0, 13.0], (len(X), 1))
+
+    config = resolve_interval_config(HeadsModel(), {'prediction_interval': {'method': 'quantile', 'quantiles': [0.5, 0.05, 0.95]}})
+    output = predict_with_intervals(HeadsModel(), np.zeros((3, 2)), config)
+
+    assert config['quantiles'] == [0.05, 0.5, 0.95]
+    assert np.allclose(output['demand'], 10.0)
+    assert np.allclose(output['confidence_low'], 8.0) and np.allclose(output['confidence_high'], 13.0)
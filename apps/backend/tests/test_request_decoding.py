@@ -0,0 +1,77 @@
+import sys
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from feature_service import INSULATION_FACTORS, WEATHER_DEFAULTS
+from request_decoding import (
+    BUILDING_RECORD, WEATHER_RECORD, FieldErrors, RequestDecodeError, decode_building_data, decode_weather,
+    raise_for_errors
+)
+
+def test_rows_and_columns_decode_to_the_same_array():
+    """Row and columnar forecasts give the same array, padded to the horizon."""
+    rows = [{'temperature': 5.0 - i, 'humidity': 80} for i in range(30)]
+    columns = {'temperature': [row['temperature'] for row in rows], 'humidity': [80] * 30}
+    errors, defaulted = FieldErrors(), Counter()
+
+    weather = decode_weather({'temperature': 6.0}, rows, 24, '', errors, defaulted)
+
+    assert not errors
+    assert weather.shape == (24, len(WEATHER_RECORD.names))
+    np.testing.assert_array_equal(weather, decode_weather({'temperature': 6.0}, columns, 24, '', errors))
+    assert weather[1, 0] == 5.0 and weather[-1, 0] == 5.0 - 22
+    # Absent fields take the defaults and are counted (current hour + 23 forecast hours)
+    assert weather[0, WEATHER_RECORD.names.index('windSpeed')] == WEATHER_DEFAULTS['windSpeed']
+    assert defaulted['weather.windSpeed'] == 24 and defaulted['weather.humidity'] == 1
+
+def test_wrong_values_are_reported_per_field_instead_of_defaulted():
+    """Forecast errors are grouped by field, since each field is checked as one column."""
+    errors = FieldErrors()
+    decode_weather(
+        {'temperature': '4'}, [{'temperature': 3.0}, {'temperature': 95.0}, {'temperature': True}], 24,
+        'buildings[2]', errors
+    )
+    decode_building_data({'floorArea': -5, 'insulationLevel': 'great'}, 'buildingData', errors)
+
+    with pytest.raises(RequestDecodeError) as raised:
+        raise_for_errors(errors)
+    assert raised.value.errors == [
+        ('buildings[2].weatherData.temperature', 'must be a number'),
+        ('buildings[2].weatherForecast[2].temperature', 'must be a number'),
+        ('buildings[2].weatherForecast[1].temperature', 'must be between -90 and 60'),
+        ('buildingData.floorArea', 'must be between 1 and 1e+07'),
+        ('buildingData.insulationLevel', 'must be one of ' + ', '.join(INSULATION_FACTORS))
+    ]
+
+def test_fields_the_model_ignores_are_clipped_or_defaulted_and_counted():
+    """Bad values in weather fields other than temperature never fail a request; they are counted instead."""
+    rows = [{'temperature': 4.0, 'cloudCover': 8 - i, 'humidity': 140, 'windSpeed': True} for i in range(12)]
+    columns = {field: [row[field] for row in rows] for field in rows[0]}
+    errors, defaulted, by_column = FieldErrors(), Counter(), Counter()
+
+    weather = decode_weather({'temperature': 5.0, 'pressure': float('nan')}, rows, 12, '', errors, defaulted)
+
+    assert not errors
+    np.testing.assert_array_equal(weather, decode_weather({'temperature': 5.0, 'pressure': float('nan')}, columns, 12, '', errors, by_column))
+    cloud = weather[1:, WEATHER_RECORD.names.index('cloudCover')]
+    assert cloud.tolist() == [8, 7, 6, 5, 4, 3, 2, 1, 0, 0, 0]
+    assert weather[1, WEATHER_RECORD.names.index('humidity')] == 100.0
+    assert weather[1, WEATHER_RECORD.names.index('windSpeed')] == WEATHER_DEFAULTS['windSpeed']
+    assert weather[0, WEATHER_RECORD.names.index('pressure')] == WEATHER_DEFAULTS['pressure']
+    assert defaulted == by_column
+    assert defaulted['weather.cloudCover.clipped'] == 2 and defaulted['weather.humidity.clipped'] == 11
+    assert defaulted['weather.windSpeed.invalid'] == 11 and defaulted['weather.pressure.invalid'] == 1
+
+def test_building_data_decodes_to_scaling_arguments():
+    """Insulation levels decode to their factors; no building data decodes to NaN."""
+    errors = FieldErrors()
+    params = decode_building_data({'floorArea': 120, 'insulationLevel': 'Poor'}, 'buildingData', errors)
+
+    assert not errors
+    assert params[BUILDING_RECORD.names.index('insulationLevel')] == INSULATION_FACTORS['poor']
+    assert np.isnan(decode_building_data({}, 'buildingData', errors)).all()
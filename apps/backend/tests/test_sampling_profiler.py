@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sampling_profiler import ProfilerBusy, SamplingProfiler
+
+def spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin_until, args=(stop,), name='busy-worker')
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+def test_profile_finds_the_busy_function(busy_thread):
+    """The spinning thread's stack appears in both collapsed and speedscope output."""
+    profile = SamplingProfiler('secret').profile(0.2, 0.005)
+    assert profile.samples > 5
+
+    busy = [line for line in profile.collapsed().splitlines() if line.startswith('busy-worker;')]
+    assert busy and all('spin_until (test_sampling_profiler.py:' in line for line in busy)
+    # The profiling thread never samples itself
+    assert 'profile (sampling_profiler.py' not in profile.collapsed()
+
+    speedscope = profile.speedscope()
+    frames = speedscope['shared']['frames']
+    worker = next(p for p in speedscope['profiles'] if p['name'] == 'busy-worker')
+    assert len(worker['samples']) == len(worker['weights'])
+    assert all(frames[stack[-1]]['name'] == 'spin_until' or 'spin_until' in [frames[i]['name'] for i in stack]
+               for stack in worker['samples'])
+
+def test_one_profile_at_a_time_and_limits():
+    """Concurrent profiles are refused and out-of-range requests rejected."""
+    profiler = SamplingProfiler('secret', max_seconds=5)
+    with pytest.raises(ValueError):
+        profiler.profile(10)
+    with pytest.raises(ValueError):
+        profiler.profile(1, interval=0.0001)
+
+    profiler._lock.acquire()
+    with pytest.raises(ProfilerBusy):
+        profiler.profile(0.1)
+    profiler._lock.release()
+
+    assert profiler.authorized('secret') and not profiler.authorized('wrong') and not profiler.authorized(None)
+    assert not SamplingProfiler(None).authorized('')
+
+def test_profile_endpoint_is_gated(monkeypatch):
+    """Disabled by default (404), needs the token (403), then returns a flamegraph file."""
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        monkeypatch.setattr(app_module, 'profiler', None)
+        assert client.post('/api/admin/profile').status_code == 404
+
+        monkeypatch.setattr(app_module, 'profiler', SamplingProfiler('secret'))
+        assert client.post('/api/admin/profile?seconds=0.05').status_code == 403
+        headers = {'Authorization': 'Bearer secret'}
+        assert client.post('/api/admin/profile?seconds=600', headers=headers).status_code == 400
+
+        rv = client.post('/api/admin/profile?seconds=0.05&interval=0.005', headers=headers)
+        assert rv.status_code == 200
+        assert rv.mimetype == 'text/plain' and rv.headers['X-Profiled-Pid'] == str(os.getpid())
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in rv.get_data(as_text=True).splitlines())
+
+        rv = client.post('/api/admin/profile?seconds=0.05&format=speedscope', headers=headers)
+        assert rv.get_json()['$schema'].startswith('https://www.speedscope.app/')
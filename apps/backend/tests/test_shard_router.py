@@ -0,0 +1,178 @@
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from shard_router import HashRing, ShardRouter, create_router_app
+
+NODES = ['node-a', 'node-b', 'node-c']
+WEATHER = {
+    'weatherData': {'temperature': 8.0, 'windSpeed': 5.0, 'humidity': 70.0},
+    'weatherForecast': [{'temperature': 8.0 - i * 0.2} for i in range(24)]
+}
+
+class AppTransport:
+    """Serves every node from the test client, recording which node got each request."""
+    def __init__(self):
+        self.client = app.test_client()
+        self.calls = []
+    def __call__(self, node, method, path, headers, body):
+        self.calls.append((node, method, path))
+        rv = self.client.open(path, method=method, headers=headers, data=body)
+        return rv.status_code, dict(rv.headers), rv.data
+
+class RegistryTransport:
+    """Per-node building registries standing in for separate backend processes."""
+    def __init__(self, nodes):
+        self.registries = {node: {} for node in nodes}
+    def __call__(self, node, method, path, headers, body):
+        registry = self.registries[node]
+        if method == 'GET':
+            return 200, {}, json.dumps({'buildings': list(registry.values()), 'forecast_cache': {}}).encode()
+        if method == 'POST':
+            entry = json.loads(body)
+            registry[entry['buildingId']] = entry
+            return 201, {}, json.dumps(entry).encode()
+        registry.pop(path.rsplit('/', 1)[1], None)
+        return 200, {}, b'{}'
+
+def test_ring_is_balanced_and_moves_few_keys():
+    """Keys spread evenly, and adding a fourth node moves only keys onto that node."""
+    keys = [f'building-{i}' for i in range(20000)]
+    ring = HashRing(NODES)
+    before = ring.nodes_for(keys)
+    shares = np.unique(before, return_counts=True)[1] / len(keys)
+    assert shares.min() > 0.25 and shares.max() < 0.42
+    assert before[:50] == [ring.node_for(key) for key in keys[:50]]
+
+    ring.add_node('node-d')
+    after = ring.nodes_for(keys)
+    moved = [(old, new) for old, new in zip(before, after) if old != new]
+    assert all(new == 'node-d' for _, new in moved)
+    assert 0.18 < len(moved) / len(keys) < 0.32
+
+    ring.remove_node('node-d')
+    assert ring.nodes_for(keys) == before
+    with pytest.raises(ValueError):
+        ring.add_node('node-a')
+
+def test_batch_is_split_by_owner_and_merged_in_order():
+    """A sharded batch returns the same results, in request order, as one node scoring it all."""
+    transport = AppTransport()
+    router = ShardRouter(NODES, transport)
+    buildings = [{**WEATHER, 'buildingId': f'b{i}', 'buildingData': {'floorArea': 100.0 + i}} for i in range(12)]
+    buildings.append(dict(WEATHER))
+
+    status, merged = router.predict_batch('/api/predict-batch', {}, json.dumps({'buildings': buildings}).encode())
+    direct = transport.client.post('/api/predict-batch', json={'buildings': buildings}).get_json()
+
+    assert status == 200 and merged['shards'] == len({node for node, _, _ in transport.calls}) > 1
+    assert [r['buildingId'] for r in merged['results']] == [f'b{i}' for i in range(12)] + ['12']
+    demand = lambda results: [[(p['demand'], p['confidence']) for p in r['predictions']] for r in results]
+    assert demand(merged['results']) == demand(direct['results'])
+    assert merged['total_predictions'] == direct['total_predictions'] == 13 * 24
+
+    # Field errors point into the client's batch, not the node's share of it
+    buildings[7] = {**buildings[7], 'weatherForecast': [{'temperature': 'cold'}]}
+    status, errors = router.predict_batch('/api/predict-batch', {}, json.dumps({'buildings': buildings}).encode())
+    assert status == 400
+    assert errors['field_errors'][0]['field'] == 'buildings[7].weatherForecast[0].temperature'
+
+def test_district_partials_sum_to_the_single_node_aggregate():
+    """Each owner aggregates its buildings in the full tree; summed partials equal the whole."""
+    transport = AppTransport()
+    router = ShardRouter(NODES, transport)
+    leaves = [{**WEATHER, 'buildingId': f'd{i}', 'buildingData': {'floorArea': 50.0 * (i + 1)}} for i in range(9)]
+    district = {'id': 'network', 'children': [
+        {'id': 'north', 'children': leaves[:5]},
+        {'id': 'south', 'children': [{'id': 'feeder', 'children': leaves[5:]}]}
+    ]}
+
+    status, merged = router.aggregate_district('/api/district/aggregate', {}, json.dumps({'district': district}).encode())
+    direct = transport.client.post('/api/district/aggregate', json={'district': district}).get_json()
+
+    assert status == 200 and merged['shards'] > 1
+    for node_id, node in direct['nodes'].items():
+        assert merged['nodes'][node_id]['buildings'] == node['buildings']
+        np.testing.assert_allclose(merged['nodes'][node_id]['demand'], node['demand'], rtol=1e-9)
+        assert merged['nodes'][node_id]['peak_demand'] == pytest.approx(node['peak_demand'])
+
+def test_keyed_routes_go_to_the_owner():
+    """Single-building routes reach the node owning the building id, or the site when there is none."""
+    transport = AppTransport()
+    router = ShardRouter(NODES, transport)
+    body = json.dumps({**WEATHER, 'buildingId': 'b42'}).encode()
+    status, _, _ = router.route('POST', '/api/predict-horizon', '', {'Content-Type': 'application/json'}, body)
+    assert status == 200
+    assert transport.calls[-1][0] == router.ring.node_for('b42')
+
+    router.route('GET', '/api/forecast/b42', '', {}, b'')
+    router.route('GET', '/api/weather/site-7', '', {}, b'')
+    assert [node for node, _, _ in transport.calls[-2:]] == [router.ring.node_for('b42'), router.ring.node_for('site-7')]
+
+def test_membership_changes_move_registered_buildings():
+    """Adding and removing a node re-homes exactly the registered buildings whose owner changed."""
+    transport = RegistryTransport(NODES + ['node-d'])
+    router = ShardRouter(NODES, transport)
+    for i in range(200):
+        node = router.ring.node_for(f'b{i}')
+        transport.registries[node][f'b{i}'] = {'buildingId': f'b{i}', 'location': 'site'}
+
+    report = router.add_node('node-d')
+    owners = {b: node for node, registry in transport.registries.items() for b in registry}
+    assert len(owners) == 200 and report == {'moved': len(transport.registries['node-d']), 'failed': 0}
+    assert all(node == router.ring.node_for(b) for b, node in owners.items())
+
+    router.remove_node('node-d')
+    assert transport.registries['node-d'] == {}
+    assert sum(len(registry) for registry in transport.registries.values()) == 200
+
+def test_compressed_metadata_passes_through_the_router_app():
+    """A gzip reply from the node keeps its Content-Encoding, ETag and Vary through the router, so it still decodes."""
+    router_client = create_router_app(ShardRouter(NODES, AppTransport())).test_client()
+    direct = app.test_client().get('/api/model-info').get_json()
+
+    rv = router_client.get('/api/model-info', headers={'Accept-Encoding': 'gzip'})
+    assert rv.status_code == 200
+    assert rv.headers['Content-Encoding'] == 'gzip' and rv.headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(rv.data)) == direct
+
+    rv = router_client.get('/api/model-info', headers={'Accept-Encoding': 'gzip', 'If-None-Match': rv.headers['ETag']})
+    assert rv.status_code == 304
+
+    # Routes the router merges itself ask the nodes for identity bodies
+    rv = router_client.post('/api/predict-batch', json={'buildings': [dict(WEATHER, buildingId='b1')]}, headers={'Accept-Encoding': 'gzip'})
+    assert rv.status_code == 200 and rv.get_json()['total_buildings'] == 1
+
+def test_batch_explanations_are_split_by_owner():
+    """Each building of an explain batch is explained on its owner node, and the results merge in request order."""
+    transport = AppTransport()
+    router = ShardRouter(NODES, transport)
+    buildings = [{**WEATHER, 'buildingId': f'x{i}', 'buildingData': {'floorArea': 80.0 + i}} for i in range(8)]
+    body = json.dumps({'buildings': buildings}).encode()
+
+    status, _, reply = router.route('POST', '/api/explain', '', {'Content-Type': 'application/json'}, body)
+    merged = json.loads(reply)
+    direct = transport.client.post('/api/explain', json={'buildings': buildings}).get_json()
+
+    assert status == 200 and merged['shards'] > 1
+    explained = {node for node, _, path in transport.calls if path == '/api/explain'}
+    assert explained == {router.ring.node_for(b['buildingId']) for b in buildings}
+    assert [r['buildingId'] for r in merged['results']] == [b['buildingId'] for b in buildings]
+    for mine, theirs in zip(merged['results'], direct['results']):
+        np.testing.assert_allclose(mine['predictions'], theirs['predictions'], rtol=1e-9)
+    assert merged['cache']['computed'] + merged['cache']['cached'] == 8
+
+def test_malformed_bodies_are_rejected_by_the_router():
+    """Bodies the router has to parse give 400, not a server error."""
+    client = create_router_app(ShardRouter(NODES, AppTransport())).test_client()
+    for method, path in [('POST', '/api/predict-batch'), ('POST', '/api/explain'), ('POST', '/api/district/aggregate'),
+                         ('PUT', '/api/weather/site-1')]:
+        rv = client.open(path, method=method, data=b'{not json', content_type='application/json')
+        assert rv.status_code == 400, path
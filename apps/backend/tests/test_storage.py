@@ -0,0 +1,111 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage import MAX_WRITE_ATTEMPTS, PredictionStore, SQLiteBackend, create_store
+
+@pytest.fixture
+def store(tmp_path):
+    store = create_store(f"sqlite:///{tmp_path / 'predictions.db'}")
+    yield store
+    store.close()
+
+def test_daily_aggregation(store):
+    """Test that predictions and actuals roll up into daily buckets."""
+    hours = np.datetime64('2025-01-15T00:00') + np.arange(48) * np.timedelta64(1, 'h')
+    store.record_predictions('b1', hours, np.full(48, 2.0), model_version='test')
+    store.record_actuals('b1', hours[:24], np.full(24, 3.0))
+    store.record_actuals('b2', hours[:24], np.full(24, 9.0))
+    store.flush()
+    
+    buckets = store.aggregate('b1', '2025-01-15', '2025-01-17', 'day')
+    
+    assert [b['timestamp'] for b in buckets] == ['2025-01-15T00:00:00', '2025-01-16T00:00:00']
+    assert buckets[0]['predicted_total'] == 48.0
+    assert buckets[0]['actual_avg'] == 3.0
+    assert 'actual_total' not in buckets[1]
+
+def test_newer_prediction_replaces_older(store):
+    """Test that re-forecasting an hour keeps only the latest value."""
+    store.record_predictions('b1', ['2025-01-15T06:00:00'], [1.0])
+    store.record_predictions('b1', ['2025-01-15T06:00:00'], [4.0])
+    store.flush()
+    
+    rows = store.query_range('predictions', 'b1', '2025-01-15', '2025-01-16')
+    
+    assert len(rows) == 1
+    assert rows[0]['demand'] == 4.0
+
+def test_forecasts_of_the_same_hour_are_stored_once(store):
+    """Test that horizons generated at different minutes upsert one row per hour and aggregate without overlap."""
+    first = np.datetime64('2025-01-15T06:12:31') + np.arange(24) * np.timedelta64(1, 'h')
+    second = np.datetime64('2025-01-15T07:47:05') + np.arange(24) * np.timedelta64(1, 'h')
+    store.record_predictions('b1', first, np.full(24, 1.0))
+    store.record_predictions('b1', second, np.full(24, 2.0))
+    store.flush()
+    
+    rows = store.query_range('predictions', 'b1', '2025-01-15', '2025-01-17')
+    
+    assert len(rows) == 25
+    assert rows[0] == {**rows[0], 'timestamp': '2025-01-15T06:00:00', 'demand': 1.0}
+    assert all(row['demand'] == 2.0 for row in rows[1:])
+    
+    buckets = store.aggregate('b1', '2025-01-15', '2025-01-17', 'day')
+    hourly = store.aggregate('b1', '2025-01-15', '2025-01-17', 'hour')
+    
+    assert buckets[0]['predicted_total'] == 1.0 + 17 * 2.0 and buckets[0]['predicted_count'] == 18
+    assert buckets[1]['predicted_total'] == 7 * 2.0
+    assert len(hourly) == 25 and all(b['predicted_count'] == 1 for b in hourly)
+
+def test_nodes_sharing_a_store_url_share_history(tmp_path):
+    """Shard nodes on one PREDICTION_STORE_URL read each other's rows, so history survives a change of owner."""
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    old_owner, new_owner = create_store(url), create_store(url)
+    try:
+        old_owner.record_predictions('b1', ['2025-01-15T06:00:00', '2025-01-15T07:00:00'], [1.0, 2.0])
+        old_owner.flush()
+        new_owner.record_predictions('b1', ['2025-01-15T07:00:00'], [3.0])
+        new_owner.flush()
+
+        rows = new_owner.query_range('predictions', 'b1', '2025-01-15', '2025-01-16')
+        assert [row['demand'] for row in rows] == [1.0, 3.0]
+    finally:
+        old_owner.close()
+        new_owner.close()
+
+class FlakyBackend:
+    """SQLite backend whose first ``failures`` writes raise, as during a database restart."""
+    def __init__(self, path, failures):
+        self.inner = SQLiteBackend(path)
+        self.placeholder = self.inner.placeholder
+        self.failures = failures
+    def executescript(self, statements):
+        self.inner.executescript(statements)
+    def executemany(self, sql, rows):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('connection lost')
+        self.inner.executemany(sql, rows)
+    def query(self, sql, params):
+        return self.inner.query(sql, params)
+    def close(self):
+        self.inner.close()
+
+def test_failed_writes_are_retried_then_dropped_and_counted(tmp_path):
+    """A batch that fails is queued again; only a batch failing MAX_WRITE_ATTEMPTS times is dropped."""
+    store = PredictionStore(FlakyBackend(str(tmp_path / 'flaky.db'), failures=2), flush_interval=0.01)
+    store.record_predictions('b1', ['2025-01-15T06:00:00', '2025-01-15T07:00:00'], [1.0, 2.0])
+    store.flush()
+    assert len(store.query_range('predictions', 'b1', '2025-01-15', '2025-01-16')) == 2
+    assert store.stats == {'write_failures': 2, 'retried_rows': 4, 'dropped_rows': 0}
+    store.close()
+
+    store = PredictionStore(FlakyBackend(str(tmp_path / 'down.db'), failures=100), flush_interval=0.01)
+    store.record_actuals('b1', ['2025-01-15T06:00:00'], [3.0])
+    store.flush()
+    assert store.stats == {'write_failures': MAX_WRITE_ATTEMPTS, 'retried_rows': MAX_WRITE_ATTEMPTS - 1, 'dropped_rows': 1}
+    store.close()
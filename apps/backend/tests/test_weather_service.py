@@ -0,0 +1,52 @@
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from weather_service import WeatherCache, StaticWeatherProvider
+
+FORECAST = [
+    {'timestamp': f'2025-01-15T{hour:02d}:00:00', 'temperature': float(hour), 'windSpeed': 4.0}
+    for hour in range(24)
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+    def __call__(self):
+        return self.now
+
+def test_window_slices_from_start_hour():
+    """Test that the window starts at the hour containing the requested start."""
+    cache = WeatherCache(StaticWeatherProvider({'site': FORECAST}))
+    current, forecast = cache.window('site', datetime(2025, 1, 15, 5, 30), 6)
+
+    assert current['temperature'] == 5.0
+    assert [point['temperature'] for point in forecast] == [6.0, 7.0, 8.0, 9.0, 10.0]
+    assert cache.window('elsewhere', datetime(2025, 1, 15, 5), 6) is None
+
+def test_provider_refetched_after_ttl():
+    """Test that expired entries are refreshed from the provider."""
+    provider = StaticWeatherProvider({'site': FORECAST})
+    clock = FakeClock()
+    cache = WeatherCache(provider, ttl_seconds=60, clock=clock)
+
+    cache.get('site')
+    provider.forecasts = {'site': [dict(point, temperature=-1.0) for point in FORECAST]}
+    assert cache.get('site')['temperature'].iloc[0] == 0.0
+
+    clock.now += 61
+    assert cache.get('site')['temperature'].iloc[0] == -1.0
+
+def test_window_past_the_forecast_asks_the_provider_instead_of_repeating_the_last_hour():
+    """A start after the cached forecast refetches; if nothing newer exists the window is None, not stale data."""
+    provider = StaticWeatherProvider({'site': FORECAST})
+    cache = WeatherCache(provider, ttl_seconds=3600, clock=FakeClock())
+    cache.get('site')
+
+    assert cache.window('site', datetime(2025, 1, 16, 2), 6) is None
+
+    provider.forecasts = {'site': [dict(point, timestamp=point['timestamp'].replace('15T', '16T')) for point in FORECAST]}
+    current, _ = cache.window('site', datetime(2025, 1, 16, 2), 6)
+    assert current['temperature'] == 2.0
@@ -0,0 +1,266 @@
+"""
+Weather Forecast Service for Heat Demand Prediction API
+Ingests hourly forecasts from a pluggable provider and caches them per location
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Location keys double as file names for the file provider, so keep them simple
+LOCATION_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+# Fields carried for every forecast hour (same names as the frontend WeatherData type)
+WEATHER_FIELDS = [
+    'temperature', 'windSpeed', 'humidity', 'solarRadiation',
+    'cloudCover', 'pressure', 'precipitation'
+]
+
+
+def validate_location(location: str) -> str:
+    """
+    Check that a location key is safe to use as a cache key and file name
+
+    Raises:
+        ValueError: If the key contains anything other than letters, digits, '.', '_' or '-'
+    """
+    if not isinstance(location, str) or not LOCATION_PATTERN.match(location):
+        raise ValueError(f"Invalid location key: {location!r}")
+    return location
+
+
+def forecast_position(frame: pd.DataFrame, start: datetime) -> Optional[int]:
+    """
+    Row of a forecast frame holding the hour that contains start
+
+    A forecast beginning after start is used from its first hour; one that
+    ends before the hour containing start is expired and gives None.
+    """
+    hour = pd.Timestamp(start).floor('h')
+    if frame.empty or frame.index[-1] < hour:
+        return None
+    return max(int(frame.index.searchsorted(hour, side='right')) - 1, 0)
+
+
+class WeatherProvider:
+    """
+    Source of hourly forecasts for a location
+    """
+    name = 'none'
+
+    def fetch(self, location: str) -> Optional[List[Dict]]:
+        """
+        Fetch the latest hourly forecast for a location
+
+        Returns:
+            List of hourly weather dictionaries, or None if the location is unknown
+        """
+        return None
+
+
+class FileWeatherProvider(WeatherProvider):
+    """
+    Reads forecasts from ``<directory>/<location>.json``
+
+    Each file holds either a list of hourly points or an object with a
+    'forecast' list, as produced by an external downloader or cron job.
+    """
+    name = 'file'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, location: str) -> Optional[List[Dict]]:
+        path = os.path.join(self.directory, f"{validate_location(location)}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            payload = json.load(f)
+        return payload.get('forecast', []) if isinstance(payload, dict) else payload
+
+
+class StaticWeatherProvider(WeatherProvider):
+    """
+    Serves fixed forecasts, either per location or one forecast for every location (testing stub)
+    """
+    name = 'static'
+
+    def __init__(self, forecasts: Union[Dict[str, List[Dict]], List[Dict]]):
+        self.forecasts = forecasts
+
+    def fetch(self, location: str) -> Optional[List[Dict]]:
+        if isinstance(self.forecasts, dict):
+            return self.forecasts.get(location)
+        return self.forecasts
+
+
+class WeatherCache:
+    """
+    Shared, time-indexed forecast cache with a per-location TTL
+
+    Each location maps to a DataFrame indexed by hourly timestamp, so every
+    prediction for buildings at that site slices the same forecast instead of
+    each client fetching and posting its own copy.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[WeatherProvider] = None,
+        ttl_seconds: float = 900.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.provider = provider or WeatherProvider()
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _to_frame(self, points: List[Dict]) -> pd.DataFrame:
+        """Normalize hourly points into a timestamp-indexed frame"""
+        frame = pd.DataFrame(points)
+        for field in WEATHER_FIELDS:
+            if field not in frame.columns:
+                frame[field] = float('nan')
+        frame = frame[WEATHER_FIELDS + (['timestamp'] if 'timestamp' in frame.columns else [])]
+
+        if 'timestamp' in frame.columns:
+            index = pd.to_datetime(frame.pop('timestamp'))
+            if index.dt.tz is not None:
+                index = index.dt.tz_convert(None)
+        else:
+            # Untimed forecasts are taken to start at the current hour
+            start = pd.Timestamp(datetime.fromtimestamp(self.clock())).floor('h')
+            index = pd.Series(pd.date_range(start, periods=len(frame), freq='h'))
+
+        frame.index = pd.DatetimeIndex(index.values, name='timestamp')
+        frame = frame.apply(pd.to_numeric, errors='coerce')
+        return frame[~frame.index.duplicated(keep='last')].sort_index()
+
+    def ingest(self, location: str, points: List[Dict], source: str = 'push') -> Dict:
+        """
+        Store a forecast for a location, replacing any cached copy
+
+        Args:
+            location: Location key
+            points: Hourly weather dictionaries (optionally with 'timestamp')
+            source: Label recorded for diagnostics (provider name or 'push')
+
+        Returns:
+            Metadata for the stored entry
+        """
+        validate_location(location)
+        if not points:
+            raise ValueError("Forecast must contain at least one hourly point")
+
+        entry = {
+            'frame': self._to_frame(points),
+            'fetched_at': self.clock(),
+            'source': source
+        }
+        with self._lock:
+            self._entries[location] = entry
+        logger.info(f"Cached {len(entry['frame'])}-hour forecast for {location} from {source}")
+        return self._describe(location, entry)
+
+    def get(self, location: str, refresh: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Return the cached forecast frame, refreshing from the provider when expired (or when asked to)
+
+        A stale entry is still returned if the provider has nothing newer.
+        """
+        validate_location(location)
+        with self._lock:
+            entry = self._entries.get(location)
+
+        if refresh or entry is None or self.clock() - entry['fetched_at'] > self.ttl_seconds:
+            try:
+                points = self.provider.fetch(location)
+            except Exception as e:
+                logger.warning(f"Weather provider failed for {location}: {e}")
+                points = None
+            if points:
+                self.ingest(location, points, source=self.provider.name)
+                with self._lock:
+                    entry = self._entries[location]
+
+        return entry['frame'] if entry else None
+
+    def window(
+        self,
+        location: str,
+        start: datetime,
+        hours: int
+    ) -> Optional[Tuple[Dict[str, float], List[Dict[str, float]]]]:
+        """
+        Slice current conditions and the following forecast hours for a prediction
+
+        Args:
+            location: Location key
+            start: First prediction hour
+            hours: Horizon length
+
+        Returns:
+            (current weather, forecast list) in the shape FeatureService expects, or None if the
+            location is unknown or its forecast ends before start even after asking the provider
+        """
+        frame = self.get(location)
+        position = None if frame is None else forecast_position(frame, start)
+        if position is None and frame is not None:
+            # Serving the last cached hour for the whole horizon would be expired weather
+            frame = self.get(location, refresh=True)
+            position = forecast_position(frame, start)
+        if position is None:
+            return None
+
+        rows = frame.iloc[position:position + hours]
+        # Missing fields are dropped so FeatureService applies its own defaults
+        records = [
+            {field: value for field, value in record.items() if pd.notna(value)}
+            for record in rows.to_dict('records')
+        ]
+        return records[0], records[1:]
+
+    def _describe(self, location: str, entry: Dict) -> Dict:
+        frame = entry['frame']
+        return {
+            'location': location,
+            'source': entry['source'],
+            'hours': len(frame),
+            'start': frame.index[0].isoformat() if len(frame) else None,
+            'end': frame.index[-1].isoformat() if len(frame) else None,
+            'fetched_at': datetime.fromtimestamp(entry['fetched_at']).isoformat(),
+            'expires_at': datetime.fromtimestamp(entry['fetched_at'] + self.ttl_seconds).isoformat()
+        }
+
+    def describe(self, location: str) -> Optional[Dict]:
+        """Return metadata for a cached location (without triggering a refresh)"""
+        with self._lock:
+            entry = self._entries.get(location)
+        return self._describe(location, entry) if entry else None
+
+    def locations(self) -> List[str]:
+        """List the locations currently held in the cache"""
+        with self._lock:
+            return sorted(self._entries)
+
+
+def create_weather_cache_from_env() -> WeatherCache:
+    """
+    Build the weather cache configured by environment variables
+
+    WEATHER_FORECAST_DIR selects the file provider (one JSON file per location);
+    WEATHER_CACHE_TTL sets the refresh interval in seconds (default 900).
+    Without a provider, forecasts can still be pushed through the ingest endpoint.
+    """
+    directory = os.environ.get('WEATHER_FORECAST_DIR')
+    provider = FileWeatherProvider(directory) if directory else None
+    ttl_seconds = float(os.environ.get('WEATHER_CACHE_TTL', 900))
+    return WeatherCache(provider=provider, ttl_seconds=ttl_seconds)
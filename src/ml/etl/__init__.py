@@ -0,0 +1,5 @@
+"""
+Data Pipeline Package
+
+ETL from EnergyPlus simulation outputs to training-ready datasets.
+"""
@@ -0,0 +1,326 @@
+"""
+EnergyPlus Simulation ETL
+Parses per-archetype EnergyPlus outputs in parallel and writes training-ready partitioned Parquet
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bump when the output schema or normalization changes so every file is rebuilt
+ETL_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# "KEY:Variable Name [Unit](Frequency)" as written by EnergyPlus ReadVarsESO
+COLUMN_PATTERN = re.compile(r'^\s*(?P<key>[^:]*):(?P<name>.*?)\s*\[(?P<unit>[^\]]*)\]\s*\((?P<freq>[^)]*)\)\s*$')
+
+# Unit conversions applied to every matching column
+UNIT_CONVERSIONS = {
+    'W': ('kW', 1e-3),
+    'J': ('kWh', 1 / 3.6e6),
+    'kg/s': ('kg/s', 1.0),
+    'C': ('C', 1.0)
+}
+
+# First matching output variable becomes the heat_demand_kW target
+TARGET_PATTERNS = [
+    r'plant_supply_side_heating_demand_rate_kw$',
+    r'district_heating.*rate_kw$',
+    r'baseboard_total_heating_rate_kw$'
+]
+
+# Share of simulation hours that must find their weather hour when an EPW file is joined
+MIN_WEATHER_MATCH = 0.95
+
+# EPW columns kept for the weather join (0-based positions in the EPW data rows)
+EPW_COLUMNS = {
+    6: 'DryBulbTemp',
+    8: 'RelHumidity',
+    9: 'AtmPressure',
+    14: 'DirectNormRad',
+    15: 'DiffuseHorzRad',
+    21: 'WindSpeed',
+    22: 'TotalSkyCover'
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snake_case(text):
+    return re.sub(r'[^0-9a-z]+', '_', text.lower()).strip('_')
+
+
+def parse_energyplus_timestamps(values, year):
+    """
+    Convert EnergyPlus ' MM/DD  HH:MM:SS' stamps to datetimes in one vectorized pass
+
+    EnergyPlus reports hour-ending values, so '24:00:00' rolls over to 00:00 of
+    the next day (matching the original processed datasets).
+    """
+    parts = pd.Series(values).astype(str).str.extract(
+        r'(?P<month>\d{1,2})/(?P<day>\d{1,2})\s+(?P<hour>\d{1,2}):(?P<minute>\d{2})'
+    ).astype(int)
+    dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': parts['month'], 'day': parts['day']}))
+    return dates + pd.to_timedelta(parts['hour'], unit='h') + pd.to_timedelta(parts['minute'], unit='m')
+
+
+def normalize_columns(df):
+    """
+    Rename EnergyPlus output columns to snake_case with units and convert W/J to kW/kWh
+
+    Returns:
+        DataFrame with converted numeric columns
+    """
+    renamed = {}
+    for column in df.columns:
+        match = COLUMN_PATTERN.match(column)
+        if not match:
+            continue
+        unit, factor = UNIT_CONVERSIONS.get(match['unit'], (match['unit'], 1.0))
+        name = snake_case(f"{match['key']} {match['name']} {unit}")
+        renamed[name] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64) * factor
+    return pd.DataFrame(renamed, index=df.index)
+
+
+def read_energyplus_csv(path):
+    """Read a ReadVarsESO CSV into (timestamp strings, raw output columns)"""
+    df = pd.read_csv(path)
+    df.columns = [c.strip() for c in df.columns]
+    return df.pop('Date/Time'), df
+
+
+def read_energyplus_sql(path):
+    """Read hourly report variables from an EnergyPlus SQLite output into the same shape as the CSV"""
+    with sqlite3.connect(path) as connection:
+        df = pd.read_sql_query(
+            """SELECT t.Month, t.Day, t.Hour, t.Minute,
+                      d.KeyValue, d.Name, d.Units, d.ReportingFrequency, r.Value
+               FROM ReportData r
+               JOIN ReportDataDictionary d ON r.ReportDataDictionaryIndex = d.ReportDataDictionaryIndex
+               JOIN Time t ON r.TimeIndex = t.TimeIndex
+               WHERE d.ReportingFrequency = 'Hourly' AND t.WarmupFlag = 0""",
+            connection
+        )
+    df['column'] = df['KeyValue'] + ':' + df['Name'] + ' [' + df['Units'] + '](' + df['ReportingFrequency'] + ')'
+    df['stamp'] = (
+        df['Month'].map('{:02d}'.format) + '/' + df['Day'].map('{:02d}'.format) + '  '
+        + df['Hour'].map('{:02d}'.format) + ':' + df['Minute'].map('{:02d}'.format) + ':00'
+    )
+    wide = df.pivot_table(index='stamp', columns='column', values='Value', sort=False)
+    return pd.Series(wide.index, name='Date/Time'), wide.reset_index(drop=True)
+
+
+def read_epw(path, year):
+    """
+    Read an EPW weather file into an hourly frame indexed by timestamp
+
+    EPW hours run 1-24 (hour ending), aligned the same way as EnergyPlus outputs.
+    Typical-year files take each month from a different year, so the file's year
+    column is replaced by the simulation year; a leap day the year lacks is dropped.
+    """
+    raw = pd.read_csv(path, skiprows=8, header=None, usecols=[0, 1, 2, 3] + list(EPW_COLUMNS))
+    dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': raw[1], 'day': raw[2]}), errors='coerce')
+    weather = raw[list(EPW_COLUMNS)].rename(columns=EPW_COLUMNS)
+    weather.index = pd.DatetimeIndex(dates + pd.to_timedelta(raw[3], unit='h'), name='timestamp')
+    weather = weather[weather.index.notna()]
+    return weather[~weather.index.duplicated(keep='first')]
+
+
+def transform_file(source_path, archetype, year, weather_path, output_dir):
+    """
+    Convert one simulation output file into a Parquet partition (runs in a worker process)
+
+    Returns:
+        Dict with the written path and row count
+    """
+    started = time.perf_counter()
+    if source_path.endswith('.sql'):
+        stamps, raw = read_energyplus_sql(source_path)
+    else:
+        stamps, raw = read_energyplus_csv(source_path)
+
+    df = normalize_columns(raw)
+    df.insert(0, 'timestamp', parse_energyplus_timestamps(stamps, year).to_numpy())
+
+    target = next(
+        (column for pattern in TARGET_PATTERNS for column in df.columns if re.search(pattern, column)),
+        None
+    )
+    if target is None:
+        raise ValueError(f"No heating demand variable found in {source_path}")
+    df['heat_demand_kW'] = df[target]
+
+    if weather_path:
+        weather = read_epw(weather_path, year)
+        df = df.merge(weather, how='left', left_on='timestamp', right_index=True)
+        matched = df['timestamp'].isin(weather.index).mean()
+        if matched < MIN_WEATHER_MATCH:
+            raise ValueError(
+                f"Only {matched:.1%} of {source_path} hours matched {weather_path} "
+                f"(simulation year {year}); check the weather file covers the run period"
+            )
+
+    df['building_type'] = archetype
+
+    partition_dir = os.path.join(output_dir, f'building_type={archetype}')
+    os.makedirs(partition_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    output_path = os.path.join(partition_dir, f'{stem}.parquet')
+    # Partition value lives in the directory name, not the file
+    df.drop(columns=['building_type']).to_parquet(output_path, index=False)
+
+    return {
+        'output': output_path,
+        'rows': len(df),
+        'target_column': target,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+class EnergyPlusETL:
+    """
+    Incremental, parallel ETL from EnergyPlus outputs to partitioned Parquet
+    """
+
+    def __init__(self, models_dir=None, output_dir=None, weather_path=None, year=2009, workers=None):
+        self.models_dir = models_dir or os.path.join(BASE_DIR, 'building_data', 'models')
+        self.output_dir = output_dir or os.path.join(BASE_DIR, 'data', 'processed', 'simulations')
+        self.weather_path = weather_path
+        self.year = year
+        self.workers = workers or os.cpu_count()
+        self.manifest_path = os.path.join(self.output_dir, '_manifest.json')
+
+    def discover_sources(self):
+        """
+        Find one simulation output per run under models_dir/<archetype>/
+
+        The ReadVarsESO CSV is preferred; the SQLite output is used when no CSV exists.
+        Tabular summaries (*Table.csv) are skipped.
+
+        Returns:
+            List of (path, archetype) tuples
+        """
+        sources = []
+        for archetype_dir in sorted(glob(os.path.join(self.models_dir, '*'))):
+            if not os.path.isdir(archetype_dir):
+                continue
+            archetype = os.path.basename(archetype_dir)
+            csvs = [p for p in sorted(glob(os.path.join(archetype_dir, '*.csv'))) if not p.endswith('Table.csv')]
+            csv_stems = {os.path.splitext(p)[0] for p in csvs}
+            sqls = [p for p in sorted(glob(os.path.join(archetype_dir, '*.sql'))) if os.path.splitext(p)[0] not in csv_stems]
+            sources.extend((path, archetype) for path in csvs + sqls)
+        return sources
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def run(self, force=False):
+        """
+        Rebuild Parquet partitions for every source whose content (or settings) changed
+
+        Args:
+            force: Rebuild everything regardless of the manifest
+
+        Returns:
+            Dict with counts of processed, skipped and failed files
+        """
+        started = time.perf_counter()
+        sources = self.discover_sources()
+        manifest = self.load_manifest()
+        weather_hash = file_hash(self.weather_path) if self.weather_path else None
+
+        pending = []
+        skipped = 0
+        for path, archetype in sources:
+            key = os.path.relpath(path, self.models_dir)
+            fingerprint = {
+                'sha256': file_hash(path),
+                'weather_sha256': weather_hash,
+                'year': self.year,
+                'etl_version': ETL_VERSION
+            }
+            previous = manifest.get(key, {})
+            unchanged = all(previous.get(k) == v for k, v in fingerprint.items())
+            if unchanged and not force and os.path.exists(previous.get('output', '')):
+                skipped += 1
+                continue
+            pending.append((key, path, archetype, fingerprint))
+
+        logger.info(f"{len(sources)} simulation outputs found: {len(pending)} to process, {skipped} unchanged")
+
+        failed = 0
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                futures = {
+                    pool.submit(transform_file, path, archetype, self.year, self.weather_path, self.output_dir):
+                        (key, fingerprint)
+                    for key, path, archetype, fingerprint in pending
+                }
+                for future in as_completed(futures):
+                    key, fingerprint = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Failed to process {key}: {e}")
+                        continue
+                    manifest[key] = {**fingerprint, **result}
+                    logger.info(f"  {key}: {result['rows']:,} rows in {result['seconds']:.2f}s")
+            self.save_manifest(manifest)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"ETL finished in {elapsed:.2f}s")
+        return {
+            'processed': len(pending) - failed,
+            'skipped': skipped,
+            'failed': failed,
+            'seconds': elapsed
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert EnergyPlus outputs to partitioned Parquet")
+    parser.add_argument('--models-dir', help="Directory with one sub-directory per archetype")
+    parser.add_argument('--output-dir', help="Parquet dataset root")
+    parser.add_argument('--weather', help="EPW weather file joined on timestamp")
+    parser.add_argument('--year', type=int, default=2009, help="Calendar year of the simulation run period")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Rebuild every partition")
+    args = parser.parse_args()
+
+    etl = EnergyPlusETL(args.models_dir, args.output_dir, args.weather, args.year, args.workers)
+    return etl.run(force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Training Pipeline Benchmark
+Runs the ProductionCatBoostModel stages on synthetic datasets of a chosen size and writes comparable JSON reports
+
+Every stage (load_and_prepare_data, train_model, evaluate_model) is measured for
+wall time, CPU time and utilization, peak RSS and, in a separate traced pass,
+the source lines that allocated the most memory.
+
+Usage:
+    python benchmark.py --buildings 200 --hours 2160 --output reports/baseline.json
+    python benchmark.py --buildings 200 --hours 2160 --output reports/new.json --baseline reports/baseline.json
+    python benchmark.py --data-path ../../../data/raw/simulations/extended_winter_dataset_clean.csv --output reports/winter.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import catboost
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
+from catboost_model import FEATURE_SETS, ProductionCatBoostModel
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if os.path.join(BASE_DIR, 'src') not in sys.path:
+    sys.path.insert(0, os.path.join(BASE_DIR, 'src'))
+
+logger = logging.getLogger(__name__)
+
+# Generated datasets are cached here, keyed by size and seed, so only the first run pays for generation
+DATASET_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'heat_demand_benchmarks')
+
+# Generated datasets hold raw weather and building columns, so features are computed with this set by default
+GENERATED_FEATURE_SET = 'heating_ml'
+
+# First hour of generated datasets (a fixed start keeps datasets identical across runs)
+DATASET_START = datetime(2024, 1, 1)
+
+STAGES = ('load_and_prepare_data', 'train_model', 'evaluate_model')
+
+# Allocation sites kept per stage
+TOP_ALLOCATIONS = 10
+
+# Stack depth recorded per allocation (deep enough to reach repository code from inside pandas)
+TRACE_FRAMES = 25
+
+# RSS sampling period in seconds
+RSS_INTERVAL = 0.005
+
+# Wall/CPU ratios above this (or peak RSS above it) are flagged as regressions in comparisons
+REGRESSION_THRESHOLD = 1.10
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (psutil when installed, /proc otherwise)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class RSSSampler:
+    """
+    Background thread recording the highest RSS seen while it runs
+
+    ru_maxrss is a lifetime high-water mark that cannot be reset between stages,
+    so the per-stage peak is sampled instead. Allocations that rise and fall
+    within one sampling period can be missed.
+    """
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and rss > self.peak_rss:
+                self.peak_rss = rss
+
+    def __enter__(self) -> 'RSSSampler':
+        self.start_rss = self.peak_rss = current_rss()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+
+def measure(function: Callable, *args):
+    """
+    Call function(*args) and measure it
+
+    Returns:
+        (result, dict with wall_seconds, cpu_seconds, cpu_utilization, start_rss_mb and peak_rss_mb)
+    """
+    with RSSSampler() as sampler:
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        result = function(*args)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+    stats = {
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        # CPU seconds per wall second: above 1 when CatBoost trains on several threads
+        'cpu_utilization': cpu / wall if wall > 0 else 0.0,
+        'start_rss_mb': sampler.start_rss / 2 ** 20 if sampler.start_rss is not None else None,
+        'peak_rss_mb': sampler.peak_rss / 2 ** 20 if sampler.peak_rss is not None else None
+    }
+    return result, stats
+
+
+def trace_allocations(function: Callable, *args, top: int = TOP_ALLOCATIONS):
+    """
+    Call function(*args) under tracemalloc
+
+    Only Python-visible allocations are traced (NumPy and pandas buffers included,
+    CatBoost's native training memory not); peak RSS covers the rest. Memory still
+    held when the stage returns is attributed to the innermost line of this
+    repository's code on the allocating stack, so a hotspot names the pipeline
+    line to change rather than a pandas internal.
+
+    Returns:
+        (result, dict with traced_peak_mb and the top allocation sites by net size)
+    """
+    tracemalloc.start(TRACE_FRAMES)
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # The snapshots themselves are not part of the stage
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    sites = {}
+    for diff in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'traceback'):
+        if diff.size_diff <= 0:
+            continue
+        # Tracebacks run outermost frame first; the benchmark's own frames only wrap the stage
+        frame = next(
+            (frame for frame in reversed(diff.traceback)
+             if _is_repo_code(frame.filename) and os.path.abspath(frame.filename) != os.path.abspath(__file__)),
+            diff.traceback[-1]
+        )
+        location = f"{os.path.relpath(frame.filename, BASE_DIR) if _is_repo_code(frame.filename) else frame.filename}:{frame.lineno}"
+        site = sites.setdefault(location, {'location': location, 'size_mb': 0.0, 'count': 0})
+        site['size_mb'] += diff.size_diff / 2 ** 20
+        site['count'] += diff.count_diff
+    hotspots = sorted(sites.values(), key=lambda site: site['size_mb'], reverse=True)[:top]
+    return result, {'traced_peak_mb': peak / 2 ** 20, 'top_allocations': hotspots}
+
+
+def _is_repo_code(filename: str) -> bool:
+    return filename.startswith(BASE_DIR) and 'site-packages' not in filename
+
+
+def generate_dataset(buildings: int, hours: int, seed: int = 0, cache_dir: str = DATASET_CACHE_DIR) -> str:
+    """
+    Write (or reuse) a synthetic training CSV with buildings x hours rows
+
+    Returns:
+        Path of the CSV
+    """
+    path = os.path.join(cache_dir, f"fleet_b{buildings}_h{hours}_s{seed}.csv")
+    if os.path.exists(path):
+        return path
+
+    from simulation.synthetic_fleet import SyntheticFleet, write_table
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fleet = SyntheticFleet(buildings, n_locations=min(buildings, 100), seed=seed)
+    written = write_table(fleet.iter_dataset(DATASET_START, hours), path + '.tmp.csv')
+    os.replace(path + '.tmp.csv', path)
+    logger.info(f"Generated {written:,} rows into {path}")
+    return path
+
+
+def environment() -> Dict:
+    """Interpreter, library and machine details that affect comparability"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'catboost': catboost.__version__
+    }
+
+
+class TrainingBenchmark:
+    """
+    Stage-by-stage benchmark of the ProductionCatBoostModel training pipeline
+
+    Timed runs and the allocation-tracing run are kept separate because
+    tracemalloc slows allocation-heavy code several-fold: wall, CPU and RSS
+    figures come from `repeats` untraced runs (median wall and CPU, maximum
+    peak RSS), hotspots from one extra traced run whose timings are discarded.
+    """
+
+    def __init__(
+        self,
+        data_path: str,
+        feature_set: Optional[str] = None,
+        uncertainty_mode: Optional[str] = None,
+        params: Optional[Dict] = None,
+        repeats: int = 1,
+        trace: bool = True
+    ):
+        if repeats < 1:
+            raise ValueError("repeats must be at least 1")
+        self.data_path = data_path
+        self.feature_set = feature_set
+        self.uncertainty_mode = uncertainty_mode
+        self.params = params or {}
+        self.repeats = repeats
+        self.trace = trace
+
+    def new_model(self) -> ProductionCatBoostModel:
+        model = ProductionCatBoostModel(uncertainty_mode=self.uncertainty_mode, feature_set=self.feature_set)
+        # CatBoost's training logs would otherwise be written (and timed) in the working directory
+        model.best_params.update({'allow_writing_files': False, **self.params})
+        return model
+
+    def run(self) -> Dict:
+        """
+        Benchmark the pipeline
+
+        Returns:
+            Report dict (see write_report)
+        """
+        started = datetime.now()
+        runs = []
+        for i in range(self.repeats):
+            logger.info(f"Timed run {i + 1}/{self.repeats}")
+            runs.append(self._timed_run())
+
+        stages = {}
+        for name in STAGES:
+            samples = [run['stages'][name] for run in runs]
+            walls = [sample['wall_seconds'] for sample in samples]
+            cpus = [sample['cpu_seconds'] for sample in samples]
+            peaks = [sample['peak_rss_mb'] for sample in samples if sample['peak_rss_mb'] is not None]
+            wall = statistics.median(walls)
+            rows = samples[0]['rows']
+            stages[name] = {
+                'wall_seconds': wall,
+                'wall_seconds_runs': walls,
+                'cpu_seconds': statistics.median(cpus),
+                'cpu_utilization': statistics.median(sample['cpu_utilization'] for sample in samples),
+                'start_rss_mb': samples[0]['start_rss_mb'],
+                'peak_rss_mb': max(peaks) if peaks else None,
+                'rows': rows,
+                'rows_per_second': rows / wall if wall > 0 else None
+            }
+
+        if self.trace:
+            logger.info("Allocation-tracing run")
+            traced = self._traced_run()
+            for name in STAGES:
+                stages[name].update(traced[name])
+
+        model = runs[-1]['model']
+        return {
+            'created': started.isoformat(),
+            'seconds': (datetime.now() - started).total_seconds(),
+            'environment': environment(),
+            'dataset': {
+                'path': os.path.abspath(self.data_path),
+                'bytes': os.path.getsize(self.data_path),
+                'rows': stages['load_and_prepare_data']['rows']
+            },
+            'config': {
+                'feature_set': self.feature_set,
+                'uncertainty_mode': self.uncertainty_mode,
+                'hyperparameters': model.get_model_params(),
+                'features': len(model.feature_names),
+                'repeats': self.repeats,
+                'traced': self.trace
+            },
+            'stages': stages,
+            'metrics': runs[-1]['metrics'],
+            'max_rss_mb': _max_rss_mb()
+        }
+
+    def _timed_run(self) -> Dict:
+        model = self.new_model()
+        stages = {}
+        splits, stages['load_and_prepare_data'] = measure(model.load_and_prepare_data, self.data_path)
+        X_train, y_train, X_val, y_val, X_test, y_test = splits
+        _, stages['train_model'] = measure(model.train_model, X_train, y_train, X_val, y_val)
+        metrics, stages['evaluate_model'] = measure(model.evaluate_model, *splits)
+
+        stages['load_and_prepare_data']['rows'] = len(X_train) + len(X_val) + len(X_test)
+        stages['train_model']['rows'] = len(X_train)
+        # evaluate_model predicts every split once
+        stages['evaluate_model']['rows'] = len(X_train) + len(X_val) + len(X_test)
+        return {'stages': stages, 'metrics': metrics, 'model': model}
+
+    def _traced_run(self) -> Dict:
+        model = self.new_model()
+        stages = {}
+        splits, stages['load_and_prepare_data'] = trace_allocations(model.load_and_prepare_data, self.data_path)
+        X_train, y_train, X_val, y_val, _, _ = splits
+        _, stages['train_model'] = trace_allocations(model.train_model, X_train, y_train, X_val, y_val)
+        _, stages['evaluate_model'] = trace_allocations(model.evaluate_model, *splits)
+        return stages
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Lifetime peak RSS of the process (ru_maxrss is in KiB on Linux, bytes on macOS)"""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def compare_reports(baseline: Dict, report: Dict, threshold: float = REGRESSION_THRESHOLD) -> Dict:
+    """
+    Per-stage ratios of report to baseline for wall time, CPU time and peak RSS
+
+    Returns:
+        {stage: {metric: {'baseline', 'current', 'ratio', 'regressed'}}} plus 'comparable',
+        which is False when the datasets or hyperparameters differ
+    """
+    comparison = {
+        'comparable': (
+            baseline['dataset']['rows'] == report['dataset']['rows']
+            and baseline['config']['hyperparameters'] == report['config']['hyperparameters']
+        )
+    }
+    for name in STAGES:
+        if name not in baseline['stages'] or name not in report['stages']:
+            continue
+        stage = {}
+        for metric in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb'):
+            before = baseline['stages'][name].get(metric)
+            after = report['stages'][name].get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            stage[metric] = {'baseline': before, 'current': after, 'ratio': ratio, 'regressed': ratio > threshold}
+        comparison[name] = stage
+    return comparison
+
+
+def write_report(report: Dict, path: str):
+    """Write a report as indented JSON (atomically, so an interrupted run leaves no partial file)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    os.replace(path + '.tmp', path)
+
+
+def log_summary(report: Dict):
+    """Log one line per stage, with the change against the baseline when compared"""
+    comparison = report.get('comparison', {})
+    for name in STAGES:
+        stage = report['stages'][name]
+        peak = f"{stage['peak_rss_mb']:.0f} MB" if stage['peak_rss_mb'] is not None else 'n/a'
+        line = (
+            f"{name:<22} {stage['wall_seconds']:8.2f}s wall {stage['cpu_seconds']:8.2f}s CPU "
+            f"({stage['cpu_utilization']:.1f}x) peak RSS {peak}, {stage['rows_per_second']:,.0f} rows/s"
+        )
+        changes = comparison.get(name, {})
+        if changes:
+            line += ' | ' + ', '.join(
+                f"{metric} x{change['ratio']:.2f}{' REGRESSED' if change['regressed'] else ''}"
+                for metric, change in changes.items()
+            )
+        logger.info(line)
+        for hotspot in stage.get('top_allocations', [])[:3]:
+            logger.info(f"    {hotspot['size_mb']:8.1f} MB  {hotspot['location']}")
+    if comparison and not comparison['comparable']:
+        logger.warning("Baseline used a different dataset or hyperparameters; ratios are not like for like")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Benchmark the CatBoost training pipeline stage by stage")
+    parser.add_argument('--output', required=True, help="JSON report path")
+    parser.add_argument('--data-path', help="Training CSV (default: a generated synthetic dataset)")
+    parser.add_argument('--buildings', type=int, default=50, help="Generated dataset: number of buildings")
+    parser.add_argument('--hours', type=int, default=2160, help="Generated dataset: hours per building")
+    parser.add_argument('--seed', type=int, default=0, help="Generated dataset: random seed")
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default=None,
+                        help=f"Compute features from raw columns with a shared feature set "
+                             f"(default for generated datasets: {GENERATED_FEATURE_SET})")
+    parser.add_argument('--uncertainty', choices=['quantile', 'virtual_ensemble'], default=None,
+                        help="Benchmark an interval model")
+    parser.add_argument('--iterations', type=int, help="Override the boosting rounds")
+    parser.add_argument('--depth', type=int, help="Override the tree depth")
+    parser.add_argument('--thread-count', type=int, help="CatBoost training threads (default: all cores)")
+    parser.add_argument('--repeats', type=int, default=1, help="Timed runs; the median is reported")
+    parser.add_argument('--no-trace', action='store_true', help="Skip the allocation-tracing run")
+    parser.add_argument('--baseline', help="Earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    data_path = args.data_path or generate_dataset(args.buildings, args.hours, args.seed)
+    feature_set = args.feature_set or (None if args.data_path else GENERATED_FEATURE_SET)
+    params = {
+        key: value for key, value in (
+            ('iterations', args.iterations), ('depth', args.depth), ('thread_count', args.thread_count)
+        ) if value is not None
+    }
+    benchmark = TrainingBenchmark(
+        data_path, feature_set=feature_set, uncertainty_mode=args.uncertainty, params=params,
+        repeats=args.repeats, trace=not args.no_trace
+    )
+    report = benchmark.run()
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare_reports(json.load(f), report)
+
+    write_report(report, args.output)
+    log_summary(report)
+    logger.info(f"Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,26 @@ import warnings
 import pickle
 import json
 import os
+import re
+import sys
+import argparse
 from datetime import datetime
+from statistics import NormalDist
 from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 from catboost import CatBoostRegressor
 import logging
 
 warnings.filterwarnings('ignore')
 
+# Feature definitions are shared with the serving API so training and serving compute identical features
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'apps', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+from feature_definitions import FEATURE_SETS
+
+# Trained models and their configuration are written here
+MODEL_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'data', 'processed', 'models')
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,12 +39,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def latest_published_version(output_dir):
+    """Highest version already published in output_dir (model_config.json or a best_heating_model_vN.pkl file)"""
+    versions = [0]
+    config_path = os.path.join(output_dir, 'model_config.json')
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            versions.append(int(json.load(f).get('model_version', 0)))
+    for name in os.listdir(output_dir) if os.path.isdir(output_dir) else []:
+        match = re.fullmatch(r'best_heating_model_v(\d+)\.pkl', name)
+        if match:
+            versions.append(int(match.group(1)))
+    return max(versions)
+
 class ProductionCatBoostModel:
     """
     Production-ready CatBoost model for heat demand prediction
     """
     
-    def __init__(self, model_path='production_catboost_model.pkl', config_path='model_config.json'):
+    # Supported ways of producing prediction intervals
+    UNCERTAINTY_MODES = (None, 'quantile', 'virtual_ensemble')
+    
+    def __init__(self, model_path='production_catboost_model.pkl', config_path='model_config.json',
+                 uncertainty_mode=None, quantiles=(0.05, 0.5, 0.95), virtual_ensembles_count=10,
+                 feature_set=None):
+        if uncertainty_mode not in self.UNCERTAINTY_MODES:
+            raise ValueError(f"Unknown uncertainty mode: {uncertainty_mode}")
+        if feature_set is not None and feature_set not in FEATURE_SETS:
+            raise ValueError(f"Unknown feature set: {feature_set}")
+        if uncertainty_mode == 'quantile' and 0.5 not in quantiles:
+            raise ValueError("Quantile mode needs the 0.5 quantile for the point prediction")
+        
         self.model_path = model_path
         self.config_path = config_path
         self.model = None
@@ -39,6 +77,18 @@ class ProductionCatBoostModel:
         self.scaler = None
         self.training_date = None
         
+        # Published versions: full retrains and accepted incremental updates each add one
+        self.model_version = 0
+        self.update_history = []
+        
+        # Prediction interval settings (None trains a plain RMSE point model)
+        self.uncertainty_mode = uncertainty_mode
+        self.quantiles = sorted(quantiles)
+        self.virtual_ensembles_count = virtual_ensembles_count
+        
+        # Shared feature set computed from raw columns (None uses the data's columns as-is)
+        self.feature_set = FEATURE_SETS[feature_set] if feature_set else None
+        
         # Best hyperparameters from tuning
         self.best_params = {
             'iterations': 200,
@@ -58,6 +108,90 @@ class ProductionCatBoostModel:
         rmse = np.sqrt(mean_squared_error(y_true, y_pred))
         return {'MAE': mae, 'R2': r2, 'MAPE': mape, 'RMSE': rmse}
     
+    def calculate_interval_metrics(self, y_true, y_low, y_high):
+        """Calculate empirical coverage and mean width of prediction intervals"""
+        y_true = np.asarray(y_true)
+        coverage = np.mean((y_true >= y_low) & (y_true <= y_high)) * 100
+        width = np.mean(y_high - y_low)
+        return {'coverage': coverage, 'nominal_coverage': round((self.quantiles[-1] - self.quantiles[0]) * 100, 1), 'width': width}
+    
+    def get_model_params(self):
+        """Build CatBoost parameters for the configured uncertainty mode"""
+        params = dict(self.best_params)
+        if self.uncertainty_mode == 'quantile':
+            # One tree ensemble with a leaf value per quantile
+            params['loss_function'] = 'MultiQuantile:alpha=' + ','.join(str(q) for q in self.quantiles)
+        elif self.uncertainty_mode == 'virtual_ensemble':
+            # Predicts mean and data variance; posterior sampling enables knowledge uncertainty
+            params['loss_function'] = 'RMSEWithUncertainty'
+            params['posterior_sampling'] = True
+        return params
+    
+    def predict_with_interval(self, X):
+        """Return point predictions with lower/upper bounds from a single inference call"""
+        if self.model is None:
+            raise ValueError("Model not loaded. Call load_model() first.")
+        
+        if self.uncertainty_mode == 'quantile':
+            raw = np.sort(np.asarray(self.model.predict(X)).reshape(len(X), -1), axis=1)
+            return raw[:, self.quantiles.index(0.5)], raw[:, 0], raw[:, -1]
+        
+        if self.uncertainty_mode == 'virtual_ensemble':
+            raw = self.model.virtual_ensembles_predict(
+                X, prediction_type='TotalUncertainty',
+                virtual_ensembles_count=self.virtual_ensembles_count
+            )
+            mean = raw[:, 0]
+            std = np.sqrt(raw[:, 1:].sum(axis=1))
+            z = NormalDist().inv_cdf(self.quantiles[-1])
+            return mean, mean - z * std, mean + z * std
+        
+        point = self.model.predict(X)
+        return point, point, point
+    
+    def build_features(self, df):
+        """
+        Compute the configured feature set from raw columns, grouped by building
+        
+        Returns:
+            DataFrame with timestamp, the feature columns and heat_demand_kW
+        """
+        # Synthetic fleets hold many buildings per archetype, so prefer the building id when present
+        group_column = next((c for c in ('building_id', 'buildingId', 'building_type') if c in df.columns), None)
+        features = self.feature_set.compute(df, timestamp_column='timestamp', group_column=group_column)
+        
+        # Hourly energy in kWh equals the mean power over the hour in kW
+        target = df['heat_demand_kW'] if 'heat_demand_kW' in df.columns else df['heating_demand_kwh']
+        logger.info(f"Computed {len(self.feature_set.names)} '{self.feature_set.name}' features")
+        return pd.concat([df[['timestamp']], features, target.rename('heat_demand_kW')], axis=1)
+    
+    def read_dataset(self, data_path):
+        """Read a CSV, compute the configured feature set and sort by timestamp"""
+        df = pd.read_csv(data_path)
+        if 'timestamp' not in df.columns and 'datetime' in df.columns:
+            df = df.rename(columns={'datetime': 'timestamp'})
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        logger.info(f"Data loaded: {len(df):,} rows, {len(df.columns)} columns")
+        
+        if self.feature_set is not None:
+            df = self.build_features(df)
+        
+        # Sort by timestamp for time-series split
+        return df.sort_values(['timestamp'])
+    
+    def prepare_features(self, df):
+        """Drop the timestamp, coerce columns to numeric and fill missing values"""
+        df_ml = df.copy()
+        exclude_cols = ['timestamp']
+        df_ml = df_ml.drop(columns=[col for col in exclude_cols if col in df_ml.columns], errors='ignore')
+        
+        for col in df_ml.columns:
+            if df_ml[col].dtype == 'object' or df_ml[col].dtype == 'bool':
+                df_ml[col] = pd.to_numeric(df_ml[col], errors='coerce')
+        
+        df_ml = df_ml.fillna(0)
+        return df_ml
+    
     def load_and_prepare_data(self, data_path=None):
         """Load and prepare data for training"""
         logger.info("Loading training data...")
@@ -68,12 +202,7 @@ class ProductionCatBoostModel:
             data_path = os.path.join(base_dir, 'data', 'raw', 'simulations', 'extended_winter_dataset_clean.csv')
         
         try:
-            df = pd.read_csv(data_path)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            logger.info(f"Data loaded: {len(df):,} rows, {len(df.columns)} columns")
-            
-            # Sort by timestamp for time-series split
-            df = df.sort_values(['timestamp'])
+            df = self.read_dataset(data_path)
             
             # Calculate split points (70/15/15)
             total_rows = len(df)
@@ -86,21 +215,9 @@ class ProductionCatBoostModel:
             test_data = df.iloc[val_end:].copy()
             
             # Prepare features
-            def prepare_features(df):
-                df_ml = df.copy()
-                exclude_cols = ['timestamp']
-                df_ml = df_ml.drop(columns=[col for col in exclude_cols if col in df_ml.columns], errors='ignore')
-                
-                for col in df_ml.columns:
-                    if df_ml[col].dtype == 'object' or df_ml[col].dtype == 'bool':
-                        df_ml[col] = pd.to_numeric(df_ml[col], errors='coerce')
-                
-                df_ml = df_ml.fillna(0)
-                return df_ml
-            
-            train_features = prepare_features(train_data)
-            val_features = prepare_features(val_data)
-            test_features = prepare_features(test_data)
+            train_features = self.prepare_features(train_data)
+            val_features = self.prepare_features(val_data)
+            test_features = self.prepare_features(test_data)
             
             # Prepare target variables
             y_train = train_features['heat_demand_kW']
@@ -132,7 +249,7 @@ class ProductionCatBoostModel:
         
         try:
             # Initialize model with best parameters
-            self.model = CatBoostRegressor(**self.best_params)
+            self.model = CatBoostRegressor(**self.get_model_params())
             
             # Train model
             self.model.fit(
@@ -156,10 +273,10 @@ class ProductionCatBoostModel:
         logger.info("Evaluating model performance...")
         
         try:
-            # Make predictions
-            y_train_pred = self.model.predict(X_train)
-            y_val_pred = self.model.predict(X_val)
-            y_test_pred = self.model.predict(X_test)
+            # Make predictions (point estimate plus interval bounds)
+            y_train_pred, _, _ = self.predict_with_interval(X_train)
+            y_val_pred, _, _ = self.predict_with_interval(X_val)
+            y_test_pred, y_test_low, y_test_high = self.predict_with_interval(X_test)
             
             # Calculate metrics
             train_metrics = self.calculate_metrics(y_train, y_train_pred)
@@ -191,39 +308,62 @@ class ProductionCatBoostModel:
             logger.info(f"  RMSE: {test_metrics['RMSE']:.3f}")
             logger.info(f"  MAPE: {test_metrics['MAPE']:.2f}%")
             
+            if self.uncertainty_mode is not None:
+                interval_metrics = self.calculate_interval_metrics(y_test, y_test_low, y_test_high)
+                metrics['test_interval'] = interval_metrics
+                logger.info("Test Interval Metrics:")
+                logger.info(f"  Coverage: {interval_metrics['coverage']:.1f}% (nominal {interval_metrics['nominal_coverage']:.0f}%)")
+                logger.info(f"  Mean width: {interval_metrics['width']:.3f}")
+            
             return metrics
             
         except Exception as e:
             logger.error(f"Error evaluating model: {e}")
             raise
     
-    def save_model(self):
-        """Save the trained model and configuration"""
+    def save_model(self, output_dir=None):
+        """
+        Save the trained model and configuration as a new version
+        
+        The versioned copy is kept; best_heating_model.pkl and model_config.json are
+        replaced atomically so readers never see a half-written model.
+        """
         logger.info("Saving model and configuration...")
         
         try:
             # Create output directory
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            output_dir = os.path.join(base_dir, 'data', 'processed', 'models')
+            output_dir = output_dir or MODEL_OUTPUT_DIR
             os.makedirs(output_dir, exist_ok=True)
+            # A fresh retrain starts at version 0; never reuse a number already published here
+            self.model_version = max(self.model_version, latest_published_version(output_dir)) + 1
             
             # Save model
             model_path = os.path.join(output_dir, 'best_heating_model.pkl')
-            with open(model_path, 'wb') as f:
+            version_path = os.path.join(output_dir, f'best_heating_model_v{self.model_version}.pkl')
+            with open(version_path, 'wb') as f:
+                pickle.dump(self.model, f)
+            with open(model_path + '.tmp', 'wb') as f:
                 pickle.dump(self.model, f)
+            os.replace(model_path + '.tmp', model_path)
             
             # Save configuration
             config = {
                 'model_type': 'CatBoost',
+                'model_version': self.model_version,
                 'feature_names': self.feature_names,
                 'training_date': self.training_date,
-                'hyperparameters': self.best_params,
-                'model_path': model_path
+                'hyperparameters': self.get_model_params(),
+                'prediction_interval': self.get_interval_config(),
+                'feature_set': self.feature_set.name if self.feature_set else None,
+                'incremental_updates': self.update_history,
+                'model_path': model_path,
+                'version_path': version_path
             }
             
             config_path = os.path.join(output_dir, 'model_config.json')
-            with open(config_path, 'w') as f:
+            with open(config_path + '.tmp', 'w') as f:
                 json.dump(config, f, indent=2)
+            os.replace(config_path + '.tmp', config_path)
             
             logger.info(f"Model saved to: {model_path}")
             logger.info(f"Configuration saved to: {config_path}")
@@ -232,6 +372,16 @@ class ProductionCatBoostModel:
             logger.error(f"Error saving model: {e}")
             raise
     
+    def get_interval_config(self):
+        """Describe the interval method in the format read by the serving layer (model_info.json)"""
+        if self.uncertainty_mode is None:
+            return {'method': 'fixed_fraction', 'fraction': 0.05}
+        return {
+            'method': self.uncertainty_mode,
+            'quantiles': self.quantiles,
+            'virtual_ensembles_count': self.virtual_ensembles_count
+        }
+    
     def load_model(self):
         """Load a saved model"""
         logger.info("Loading saved model...")
@@ -247,6 +397,16 @@ class ProductionCatBoostModel:
             
             self.feature_names = config['feature_names']
             self.training_date = config['training_date']
+            self.model_version = config.get('model_version', 1)
+            self.update_history = config.get('incremental_updates', [])
+            if config.get('feature_set'):
+                self.feature_set = FEATURE_SETS[config['feature_set']]
+            
+            interval = config.get('prediction_interval', {})
+            if interval.get('method') in ('quantile', 'virtual_ensemble'):
+                self.uncertainty_mode = interval['method']
+                self.quantiles = interval['quantiles']
+                self.virtual_ensembles_count = interval.get('virtual_ensembles_count', 10)
             
             logger.info("Model loaded successfully")
             
@@ -280,8 +440,8 @@ class ProductionCatBoostModel:
                 
                 input_data = input_data.fillna(0)
             
-            # Make prediction
-            prediction = self.model.predict(input_data)
+            # Make prediction (point estimate only; see predict_with_interval for bounds)
+            prediction, _, _ = self.predict_with_interval(input_data)
             
             return prediction
             
@@ -289,6 +449,92 @@ class ProductionCatBoostModel:
             logger.error(f"Error making prediction: {e}")
             raise
     
+    def incremental_update(self, data_path, since=None, holdout_hours=168, iterations=100,
+                           tolerance=0.02, output_dir=None):
+        """
+        Continue boosting the current model on a new window of observed data
+        
+        The window's last `holdout_hours` are held out. The current model and a
+        candidate (warm-started from it via init_model and trained on the rest
+        of the window) are both scored on that holdout; the candidate is saved as
+        a new version only if its MAE and RMSE are within `tolerance` (relative)
+        of the current model's.
+        
+        Args:
+            data_path: CSV with the same columns as the training data
+            since: Only rows at or after this timestamp are used
+            holdout_hours: Length of the rolling holdout at the end of the window
+            iterations: Additional boosting rounds
+            tolerance: Allowed relative degradation of holdout MAE/RMSE
+            output_dir: Where a published model is written (defaults to MODEL_OUTPUT_DIR)
+        
+        Returns:
+            Dict with the decision, holdout metrics of both models and the resulting version
+        """
+        if self.model is None:
+            self.load_model()
+        started = datetime.now()
+        
+        df = self.read_dataset(data_path)
+        if since is not None:
+            df = df[df['timestamp'] >= pd.to_datetime(since)]
+        holdout_start = df['timestamp'].max() - pd.Timedelta(hours=holdout_hours)
+        in_holdout = (df['timestamp'] > holdout_start).to_numpy()
+        if in_holdout.all() or not in_holdout.any():
+            raise ValueError(f"Window of {len(df)} rows is too short for a {holdout_hours}h holdout")
+        
+        features = self.prepare_features(df)
+        X = features[self.feature_names]
+        y = features['heat_demand_kW']
+        X_train, y_train = X[~in_holdout], y[~in_holdout]
+        X_hold, y_hold = X[in_holdout], y[in_holdout]
+        logger.info(f"Incremental window: {len(X_train):,} training rows, {len(X_hold):,} holdout rows")
+        
+        current_model = self.model
+        baseline = self.calculate_metrics(y_hold, self.predict_with_interval(X_hold)[0])
+        
+        params = self.get_model_params()
+        params['iterations'] = iterations
+        candidate = CatBoostRegressor(**params)
+        candidate.fit(X_train, y_train, init_model=current_model, verbose=False)
+        
+        self.model = candidate
+        candidate_metrics = self.calculate_metrics(y_hold, self.predict_with_interval(X_hold)[0])
+        
+        published = bool(
+            candidate_metrics['MAE'] <= baseline['MAE'] * (1 + tolerance)
+            and candidate_metrics['RMSE'] <= baseline['RMSE'] * (1 + tolerance)
+        )
+        logger.info(
+            f"Holdout MAE {baseline['MAE']:.3f} -> {candidate_metrics['MAE']:.3f}, "
+            f"RMSE {baseline['RMSE']:.3f} -> {candidate_metrics['RMSE']:.3f}"
+        )
+        
+        report = {
+            'published': published,
+            'window_start': df['timestamp'].min().isoformat(),
+            'window_end': df['timestamp'].max().isoformat(),
+            'train_rows': len(X_train),
+            'holdout_rows': len(X_hold),
+            'iterations': iterations,
+            'baseline': baseline,
+            'candidate': candidate_metrics
+        }
+        
+        if published:
+            self.training_date = datetime.now().isoformat()
+            self.update_history.append({**report, 'trained_at': self.training_date, 'from_version': self.model_version})
+            self.save_model(output_dir)
+            logger.info(f"Published incremental model version {self.model_version}")
+        else:
+            # Keep serving the current model
+            self.model = current_model
+            logger.warning("Candidate model rejected: holdout metrics degraded beyond tolerance")
+        
+        report['model_version'] = self.model_version
+        report['seconds'] = (datetime.now() - started).total_seconds()
+        return report
+    
     def get_feature_importance(self, top_n=10):
         """Get feature importance from the trained model"""
         if self.model is None:
@@ -301,16 +547,16 @@ class ProductionCatBoostModel:
         
         return feature_importance.head(top_n)
 
-def main():
+def main(uncertainty_mode=None, feature_set=None, data_path=None):
     """Main function to train and save production model"""
     logger.info("Starting production model training...")
     
     try:
         # Initialize model
-        production_model = ProductionCatBoostModel()
+        production_model = ProductionCatBoostModel(uncertainty_mode=uncertainty_mode, feature_set=feature_set)
         
         # Load and prepare data
-        X_train, y_train, X_val, y_val, X_test, y_test = production_model.load_and_prepare_data()
+        X_train, y_train, X_val, y_val, X_test, y_test = production_model.load_and_prepare_data(data_path)
         
         # Train model
         production_model.train_model(X_train, y_train, X_val, y_val)
@@ -334,8 +580,41 @@ def main():
         logger.error(f"Error in main training process: {e}")
         raise
 
+def main_incremental(data_path, since=None, holdout_hours=168, iterations=100, tolerance=0.02):
+    """Warm-start the published model on newly observed data"""
+    logger.info("Starting incremental model update...")
+    
+    production_model = ProductionCatBoostModel(
+        model_path=os.path.join(MODEL_OUTPUT_DIR, 'best_heating_model.pkl'),
+        config_path=os.path.join(MODEL_OUTPUT_DIR, 'model_config.json')
+    )
+    report = production_model.incremental_update(
+        data_path, since=since, holdout_hours=holdout_hours, iterations=iterations, tolerance=tolerance
+    )
+    logger.info(f"Incremental update finished in {report['seconds']:.1f}s (published: {report['published']})")
+    return production_model, report
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the production CatBoost heat demand model")
+    parser.add_argument('--uncertainty', choices=['quantile', 'virtual_ensemble'], default=None,
+                        help="Train a model that also produces prediction intervals")
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default=None,
+                        help="Compute features from raw columns with a shared feature set")
+    parser.add_argument('--data-path', default=None, help="Training CSV (defaults to the extended winter dataset)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue boosting the published model on --data-path instead of retraining")
+    parser.add_argument('--since', default=None, help="Incremental mode: first timestamp of the new window")
+    parser.add_argument('--holdout-hours', type=int, default=168, help="Incremental mode: rolling holdout length")
+    parser.add_argument('--iterations', type=int, default=100, help="Incremental mode: additional boosting rounds")
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help="Incremental mode: allowed relative holdout degradation before rejecting")
+    args = parser.parse_args()
+    if args.incremental:
+        if not args.data_path:
+            parser.error("--incremental requires --data-path")
+        main_incremental(args.data_path, args.since, args.holdout_hours, args.iterations, args.tolerance)
+    else:
+        main(uncertainty_mode=args.uncertainty, feature_set=args.feature_set, data_path=args.data_path)
 
 
 
@@ -0,0 +1,5 @@
+"""
+Simulation Package
+
+Synthetic building fleets, weather and request streams for scale testing.
+"""
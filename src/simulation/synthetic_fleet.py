@@ -0,0 +1,530 @@
+"""
+Synthetic Fleet and Weather Generator
+Samples realistic building rosters, correlated hourly weather, training datasets and API request streams at scale
+
+Usage:
+    python synthetic_fleet.py roster --buildings 100000 --locations 500 --output roster.parquet
+    python synthetic_fleet.py weather --locations 500 --hours 48 --output forecasts.json
+    python synthetic_fleet.py dataset --buildings 10000 --hours 8760 --output dataset.parquet
+    python synthetic_fleet.py requests --buildings 10000 --count 1000000 --output requests.jsonl
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from statistics import NormalDist
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Building scaling is shared with the serving API so synthetic demand responds to the same factors
+BACKEND_DIR = os.path.join(BASE_DIR, 'apps', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+from feature_service import BUILDING_DEFAULTS, INSULATION_FACTORS, FeatureService
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(BASE_DIR, 'building_data', 'models')
+DATA_PATH = os.path.join(BASE_DIR, 'building_data', 'processed', 'heat_demand_processed.csv')
+
+# heat_demand_processed.csv is the bungalow simulation; demand is calibrated against it
+REFERENCE_ARCHETYPE = 'bungalow'
+
+# Observed weather columns and the API field each one becomes
+WEATHER_COLUMNS = {'db_temp_C': 'temperature', 'rel_humidity_pct': 'humidity', 'wind_mps': 'windSpeed'}
+
+INSULATION_LEVELS = ['poor', 'standard', 'excellent']
+
+# Archetype priors. Shares approximate the English house stock without flats; floor areas
+# are fallbacks for the Zone floor area in each archetype's IDF; insulation probabilities
+# (poor, standard, excellent) follow the insulation described in the IDF constructions
+ARCHETYPES = {
+    'bungalow': {'share': 0.11, 'floor_area': 96.0, 'age': (45.0, 15.0), 'insulation': (0.25, 0.55, 0.20)},
+    'detached': {'share': 0.22, 'floor_area': 224.0, 'age': (35.0, 20.0), 'insulation': (0.15, 0.55, 0.30)},
+    'semi_detached': {'share': 0.32, 'floor_area': 144.0, 'age': (55.0, 20.0), 'insulation': (0.35, 0.50, 0.15)},
+    'mid_terrace': {'share': 0.22, 'floor_area': 100.0, 'age': (85.0, 30.0), 'insulation': (0.45, 0.45, 0.10)},
+    'end_terrace': {'share': 0.13, 'floor_area': 110.0, 'age': (80.0, 30.0), 'insulation': (0.30, 0.50, 0.20)}
+}
+
+# Older buildings are more likely to be poorly insulated (latent loading of standardized age)
+AGE_INSULATION_LOADING = 0.8
+
+# Location-level deviations from the fitted climate (temperature, humidity, wind speed)
+SITE_OFFSET_STD = np.array([1.5, 4.0, 0.8])
+
+# Request mix of the generated API stream (endpoint -> share)
+# Dataset rows (building-hours) materialized at once; about 250 MB of DataFrame with the object columns
+DEFAULT_DATASET_ROWS = 1_000_000
+
+DEFAULT_REQUEST_MIX = {'/api/predict': 0.5, '/api/predict-horizon': 0.35, '/api/predict-batch': 0.15}
+
+
+def read_archetype_floor_areas(models_dir: str = MODELS_DIR) -> Dict[str, float]:
+    """Zone floor area (m²) from each archetype's EnergyPlus model, where the IDF states one"""
+    pattern = re.compile(r'^\s*([0-9.]+)\s*,\s*!-\s*Floor Area \{m2\}', re.MULTILINE)
+    areas = {}
+    for archetype in ARCHETYPES:
+        for path in glob.glob(os.path.join(models_dir, archetype, '*.idf')):
+            with open(path, 'r', errors='ignore') as f:
+                match = pattern.search(f.read())
+            if match:
+                areas[archetype] = float(match.group(1))
+                break
+    return areas
+
+
+def _harmonics(timestamps: pd.DatetimeIndex) -> np.ndarray:
+    """Seasonal and diurnal harmonic regressors (rows x 9)"""
+    day = 2 * np.pi * (timestamps.dayofyear.to_numpy() - 1) / 365.25
+    hour = 2 * np.pi * timestamps.hour.to_numpy() / 24
+    return np.column_stack([
+        np.ones(len(timestamps)),
+        np.sin(day), np.cos(day), np.sin(2 * day), np.cos(2 * day),
+        np.sin(hour), np.cos(hour), np.sin(2 * hour), np.cos(2 * hour)
+    ])
+
+
+class WeatherModel:
+    """
+    Hourly temperature, humidity and wind speed as climatology plus correlated noise
+
+    Each variable is a seasonal and diurnal harmonic mean plus an AR(1)
+    residual; the innovations of the three variables are drawn jointly, so
+    the cross-correlations of the observations (e.g. cold hours being humid)
+    are preserved. Locations share a regional innovation component, which
+    makes neighbouring sites move together as they do in real forecasts.
+    """
+
+    def __init__(self, coefficients: np.ndarray, phi: np.ndarray, innovation_cov: np.ndarray):
+        """
+        Args:
+            coefficients: Harmonic coefficients (9 x variables)
+            phi: Lag-1 autocorrelation of each variable's residual
+            innovation_cov: Covariance of the AR(1) innovations (variables x variables)
+        """
+        self.coefficients = coefficients
+        self.phi = phi
+        self.innovation_cov = innovation_cov
+        self.cholesky = np.linalg.cholesky(innovation_cov)
+
+    @classmethod
+    def fit(cls, observations: pd.DataFrame) -> 'WeatherModel':
+        """
+        Fit to hourly observations
+
+        Args:
+            observations: Hourly frame indexed by timestamp with temperature, humidity and windSpeed columns
+        """
+        values = observations[list(WEATHER_COLUMNS.values())].to_numpy(dtype=np.float64)
+        design = _harmonics(observations.index)
+        coefficients = np.linalg.lstsq(design, values, rcond=None)[0]
+        residuals = values - design @ coefficients
+        phi = np.array([np.corrcoef(residuals[1:, k], residuals[:-1, k])[0, 1] for k in range(values.shape[1])])
+        innovations = residuals[1:] - phi * residuals[:-1]
+        return cls(coefficients, phi, np.cov(innovations.T))
+
+    @classmethod
+    def from_processed(cls, data_path: str = DATA_PATH) -> 'WeatherModel':
+        """Fit to the weather columns of heat_demand_processed.csv"""
+        data = pd.read_csv(data_path, parse_dates=['datetime'])
+        observations = data.drop_duplicates('datetime').set_index('datetime').rename(columns=WEATHER_COLUMNS)
+        return cls.fit(observations.sort_index())
+
+    def climatology(self, start: datetime, hours: int) -> np.ndarray:
+        """Mean weather for each hour (hours x variables)"""
+        return _harmonics(pd.date_range(start, periods=hours, freq='h')) @ self.coefficients
+
+    def generate(
+        self,
+        site_offsets: np.ndarray,
+        start: datetime,
+        hours: int,
+        rng: np.random.Generator,
+        spatial_correlation: float = 0.8
+    ) -> np.ndarray:
+        """
+        Sample hourly weather for many locations at once
+
+        Args:
+            site_offsets: Per-location shift of each variable (locations x variables)
+            start: First hour
+            hours: Number of hours
+            rng: Random generator
+            spatial_correlation: Share of innovation variance common to all locations
+
+        Returns:
+            Array (locations x hours x variables) of temperature, humidity and wind speed
+        """
+        n_locations, n_variables = site_offsets.shape
+        regional = rng.standard_normal((1, hours, n_variables))
+        local = rng.standard_normal((n_locations, hours, n_variables))
+        shocks = np.sqrt(spatial_correlation) * regional + np.sqrt(1 - spatial_correlation) * local
+        innovations = shocks @ self.cholesky.T
+
+        # Start every series in its stationary distribution, then filter each variable as AR(1)
+        innovations[:, 0, :] /= np.sqrt(1 - self.phi ** 2)
+        residuals = np.empty_like(innovations)
+        for k in range(n_variables):
+            residuals[..., k] = lfilter([1.0], [1.0, -self.phi[k]], innovations[..., k], axis=1)
+
+        weather = self.climatology(start, hours)[None, :, :] + site_offsets[:, None, :] + residuals
+        weather[..., 1] = np.clip(weather[..., 1], 5.0, 100.0)
+        weather[..., 2] = np.maximum(weather[..., 2], 0.0)
+        return weather
+
+
+class SyntheticFleet:
+    """
+    Reproducible synthetic fleet of buildings spread over weather locations
+
+    Buildings are generated in fixed-size chunks, each from its own seeded
+    random stream, so any chunk can be regenerated independently and
+    rosters and request streams for 10^3 to 10^7 buildings are written
+    without holding the whole fleet in memory. Hourly datasets are emitted
+    in blocks of a bounded number of building-hours, so their memory does
+    not grow with the horizon either. The same seed and chunk size always
+    give the same fleet.
+    """
+
+    def __init__(
+        self,
+        n_buildings: int,
+        n_locations: int = 100,
+        seed: int = 0,
+        chunk_size: int = 100000,
+        data_path: str = DATA_PATH,
+        models_dir: str = MODELS_DIR
+    ):
+        self.n_buildings = n_buildings
+        self.n_locations = n_locations
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.locations = [f"site-{i:05d}" for i in range(n_locations)]
+        self.feature_service = FeatureService()
+
+        self.archetypes = {name: dict(prior) for name, prior in ARCHETYPES.items()}
+        for name, area in read_archetype_floor_areas(models_dir).items():
+            self.archetypes[name]['floor_area'] = area
+        shares = np.array([prior['share'] for prior in self.archetypes.values()])
+        self.archetype_probabilities = shares / shares.sum()
+
+        self.weather_model = WeatherModel.from_processed(data_path)
+        self._fit_demand(data_path)
+        self.site_offsets = np.random.default_rng([seed, 1]).normal(
+            0.0, SITE_OFFSET_STD, (n_locations, len(SITE_OFFSET_STD))
+        )
+
+    def _fit_demand(self, data_path: str):
+        """Calibrate demand = slope * heating degree hours + intercept on the reference archetype"""
+        data = pd.read_csv(data_path)
+        hdh = np.maximum(0.0, self.feature_service.base_temp - data['db_temp_C'].to_numpy())
+        demand = data['heat_demand_kW'].to_numpy()
+        (self.demand_slope, self.demand_intercept), *_ = np.linalg.lstsq(
+            np.column_stack([hdh, np.ones(len(hdh))]), demand, rcond=None
+        )
+        residuals = demand - (self.demand_slope * hdh + self.demand_intercept)
+        self.demand_noise = float(residuals.std() / demand.mean())
+        reference = self.archetypes[REFERENCE_ARCHETYPE]['floor_area']
+        _, scaling, _ = self.feature_service.building_scaling_arrays(
+            reference, 1.0, BUILDING_DEFAULTS['occupancyRate'], BUILDING_DEFAULTS['buildingAge'],
+            BUILDING_DEFAULTS['thermostatSetpoint']
+        )
+        self.reference_scaling = float(scaling)
+
+    def chunks(self) -> Iterator[tuple]:
+        """(chunk index, first building, end) for every chunk"""
+        for index, begin in enumerate(range(0, self.n_buildings, self.chunk_size)):
+            yield index, begin, min(begin + self.chunk_size, self.n_buildings)
+
+    def buildings(self, chunk: int) -> pd.DataFrame:
+        """
+        Sample one chunk of buildings
+
+        Returns:
+            DataFrame with buildingId, location, building_type and the API building fields
+        """
+        begin = chunk * self.chunk_size
+        n = min(self.chunk_size, self.n_buildings - begin)
+        rng = np.random.default_rng([self.seed, 0, chunk])
+        names = list(self.archetypes)
+        archetype = rng.choice(len(names), size=n, p=self.archetype_probabilities)
+
+        area = np.array([self.archetypes[name]['floor_area'] for name in names])[archetype]
+        age_mean = np.array([self.archetypes[name]['age'][0] for name in names])[archetype]
+        age_std = np.array([self.archetypes[name]['age'][1] for name in names])[archetype]
+        age_z = rng.standard_normal(n)
+        building_age = np.clip(np.round(age_mean + age_std * age_z), 0, 150)
+
+        # Ordered probit on a latent "insulation quality" that falls with age; the cut points
+        # are set so each archetype keeps its marginal insulation probabilities
+        latent = (-AGE_INSULATION_LOADING * age_z + rng.standard_normal(n)) / np.sqrt(1 + AGE_INSULATION_LOADING ** 2)
+        cumulative = np.cumsum([self.archetypes[name]['insulation'] for name in names], axis=1)[:, :-1]
+        cuts = np.vectorize(NormalDist().inv_cdf)(np.clip(cumulative, 1e-9, 1 - 1e-9))[archetype]
+        insulation = (latent[:, None] > cuts).sum(axis=1)
+
+        return pd.DataFrame({
+            'buildingId': [f"bldg-{i:08d}" for i in range(begin, begin + n)],
+            'location': np.array(self.locations, dtype=object)[rng.integers(0, self.n_locations, n)],
+            'building_type': np.array(names, dtype=object)[archetype],
+            'floorArea': np.round(np.clip(area * rng.lognormal(0.0, 0.25, n), 30.0, 5 * area), 1),
+            'insulationLevel': np.array(INSULATION_LEVELS, dtype=object)[insulation],
+            'occupancyRate': np.round(100 * rng.beta(8.5, 1.5, n), 1),
+            'buildingAge': building_age,
+            'thermostatSetpoint': np.round(np.clip(rng.normal(20.5, 1.0, n), 16.0, 24.0) * 2) / 2
+        })
+
+    def iter_buildings(self) -> Iterator[pd.DataFrame]:
+        for chunk, _, _ in self.chunks():
+            yield self.buildings(chunk)
+
+    def weather(self, start: datetime, hours: int, locations: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Hourly weather for every location (or the given location indices)
+
+        Returns:
+            Array (locations x hours x 3) of temperature, humidity and wind speed
+        """
+        rng = np.random.default_rng([self.seed, 2, int(pd.Timestamp(start).timestamp()), hours])
+        weather = self.weather_model.generate(self.site_offsets, start, hours, rng)
+        return weather if locations is None else weather[locations]
+
+    def demand(self, buildings: pd.DataFrame, temperatures: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Hourly heat demand (kW) per building from its characteristics and outdoor temperatures
+
+        The reference archetype's calibrated response is scaled by the same factors
+        the API applies to buildingData, relative to the reference building.
+        """
+        base_temp, scaling, _ = self.feature_service.building_scaling_arrays(
+            buildings['floorArea'].to_numpy(), buildings['insulationLevel'].map(INSULATION_FACTORS).to_numpy(),
+            buildings['occupancyRate'].to_numpy(), buildings['buildingAge'].to_numpy(),
+            buildings['thermostatSetpoint'].to_numpy()
+        )
+        hdh = np.maximum(0.0, base_temp[:, None] - temperatures)
+        demand = (self.demand_slope * hdh + self.demand_intercept) * (scaling / self.reference_scaling)[:, None]
+        noise = rng.normal(1.0, self.demand_noise, demand.shape)
+        return np.maximum(demand * noise, 0.0)
+
+    def iter_dataset(self, start: datetime, hours: int, max_rows: int = DEFAULT_DATASET_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Hourly training rows for every building, at most max_rows building-hours at a time
+
+        Each chunk of buildings is emitted in blocks of max(1, max_rows // hours)
+        buildings. Block noise is drawn in sequence from the chunk's stream, so the
+        rows do not depend on max_rows.
+
+        Columns follow heat_demand_processed.csv plus the building fields; outdoor_temp,
+        outdoor_temp_synthetic and heating_demand_kwh are aliases so every feature set
+        in FEATURE_SETS can be computed from the output.
+        """
+        weather = self.weather(start, hours)
+        timestamps = pd.date_range(start, periods=hours, freq='h')
+        location_index = {location: i for i, location in enumerate(self.locations)}
+        block_size = max(1, max_rows // hours)
+        for chunk, _, _ in self.chunks():
+            chunk_buildings = self.buildings(chunk)
+            rng = np.random.default_rng([self.seed, 3, chunk])
+            for begin in range(0, len(chunk_buildings), block_size):
+                buildings = chunk_buildings.iloc[begin:begin + block_size]
+                local = weather[buildings['location'].map(location_index).to_numpy()]
+                demand = self.demand(buildings, local[..., 0], rng)
+                rows = buildings.loc[buildings.index.repeat(hours)].reset_index(drop=True)
+                rows.insert(0, 'datetime', np.tile(timestamps.values, len(buildings)))
+                rows['db_temp_C'] = local[..., 0].ravel().round(2)
+                rows['rel_humidity_pct'] = local[..., 1].ravel().round(1)
+                rows['wind_mps'] = local[..., 2].ravel().round(2)
+                rows['outdoor_temp'] = rows['outdoor_temp_synthetic'] = rows['db_temp_C']
+                rows['heat_demand_kW'] = rows['heating_demand_kwh'] = demand.ravel()
+                yield rows
+
+    def iter_requests(
+        self,
+        count: int,
+        start: datetime,
+        span_hours: int = 168,
+        mix: Optional[Dict[str, float]] = None,
+        batch_size: int = 50
+    ) -> Iterator[Dict]:
+        """
+        API requests against random fleet buildings at random hours of a time span
+
+        Each item is {'method', 'path', 'body'} with a body in the frontend's format;
+        horizon requests embed the location's forecast for 24 or 48 hours. Requests
+        are spread over the building chunks in proportion to their size and emitted
+        chunk by chunk, so each chunk of the fleet is generated only once.
+        """
+        mix = mix or DEFAULT_REQUEST_MIX
+        paths, weights = list(mix), np.array(list(mix.values()), dtype=np.float64)
+        weather = np.round(self.weather(start, span_hours + 48), 2)
+        location_index = {location: i for i, location in enumerate(self.locations)}
+        sizes = np.array([end - begin for _, begin, end in self.chunks()])
+        per_chunk = np.random.default_rng([self.seed, 4]).multinomial(count, sizes / sizes.sum())
+
+        def weather_point(location: int, hour: int) -> Dict:
+            temperature, humidity, wind = weather[location, hour]
+            return {'temperature': float(temperature), 'humidity': float(humidity), 'windSpeed': float(wind)}
+
+        def entry(building: Dict, hour: int, horizon: int) -> Dict:
+            location = location_index[building['location']]
+            return {
+                'buildingId': building['buildingId'],
+                'weatherData': weather_point(location, hour),
+                'weatherForecast': [weather_point(location, h) for h in range(hour + 1, hour + horizon)],
+                'buildingData': {field: building[field] for field in BUILDING_DEFAULTS}
+            }
+
+        for chunk, n in enumerate(per_chunk):
+            if n == 0:
+                continue
+            records = self.buildings(chunk).to_dict('records')
+            rng = np.random.default_rng([self.seed, 5, chunk])
+            kinds = rng.choice(len(paths), size=n, p=weights / weights.sum())
+            hours = rng.integers(0, span_hours, n)
+            horizons = np.where(rng.random(n) < 0.8, 24, 48)
+            picks = rng.integers(0, len(records), (n, batch_size))
+            for i in range(n):
+                path, hour, horizon = paths[kinds[i]], int(hours[i]), int(horizons[i])
+                if path == '/api/predict':
+                    body = entry(records[picks[i, 0]], hour, 1)
+                    del body['weatherForecast']
+                    body['timestamp'] = (pd.Timestamp(start) + pd.Timedelta(hours=hour)).isoformat()
+                elif path == '/api/predict-horizon':
+                    body = {**entry(records[picks[i, 0]], hour, horizon), 'horizon': horizon}
+                else:
+                    body = {'horizon': horizon, 'buildings': [entry(records[b], hour, horizon) for b in picks[i]]}
+                yield {'method': 'POST', 'path': path, 'body': body}
+
+
+def write_table(chunks: Iterator[pd.DataFrame], path: str) -> int:
+    """
+    Stream DataFrame chunks to one Parquet or CSV file
+
+    Returns:
+        Number of rows written
+    """
+    rows = 0
+    writer = None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        for frame in chunks:
+            if path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                frame.to_csv(path, mode='a' if rows else 'w', header=not rows, index=False)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_roster(fleet: SyntheticFleet, path: str) -> int:
+    """
+    Write the fleet as a roster: BuildingRegistry JSON for .json paths, else a CSV/Parquet table
+
+    Returns:
+        Number of buildings written
+    """
+    if not path.endswith('.json'):
+        return write_table(fleet.iter_buildings(), path)
+    rows = 0
+    with open(path, 'w') as f:
+        f.write('[')
+        for frame in fleet.iter_buildings():
+            for record in frame.to_dict('records'):
+                entry = {
+                    'buildingId': record['buildingId'],
+                    'location': record['location'],
+                    'buildingData': {field: record[field] for field in BUILDING_DEFAULTS}
+                }
+                f.write((',\n' if rows else '\n') + json.dumps(entry))
+                rows += 1
+        f.write('\n]\n')
+    return rows
+
+
+def write_forecasts(fleet: SyntheticFleet, start: datetime, hours: int, path: str) -> int:
+    """
+    Write hourly forecasts for every location: a JSON object {location: [points]} or a long CSV/Parquet table
+
+    Returns:
+        Number of location-hours written
+    """
+    weather = np.round(fleet.weather(start, hours), 2)
+    timestamps = pd.date_range(start, periods=hours, freq='h')
+    table = pd.DataFrame({
+        'location': np.repeat(np.array(fleet.locations, dtype=object), hours),
+        'timestamp': np.tile(timestamps.strftime('%Y-%m-%dT%H:%M:%S').to_numpy(dtype=object), len(fleet.locations)),
+        **{field: weather[..., k].ravel() for k, field in enumerate(WEATHER_COLUMNS.values())}
+    })
+    if not path.endswith('.json'):
+        return write_table(iter([table]), path)
+    forecasts = {
+        location: group.drop(columns=['location']).to_dict('records')
+        for location, group in table.groupby('location', sort=False)
+    }
+    with open(path, 'w') as f:
+        json.dump(forecasts, f)
+    return len(table)
+
+
+def write_requests(requests: Iterator[Dict], path: str) -> int:
+    """Write a request stream as JSON lines; returns the number of requests"""
+    count = 0
+    with open(path, 'w') as f:
+        for item in requests:
+            f.write(json.dumps(item) + '\n')
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic fleets, weather, datasets and request streams")
+    parser.add_argument('kind', choices=['roster', 'weather', 'dataset', 'requests'], help="What to generate")
+    parser.add_argument('--output', required=True, help="Output path (.json/.jsonl, .csv or .parquet)")
+    parser.add_argument('--buildings', type=int, default=1000, help="Fleet size")
+    parser.add_argument('--locations', type=int, default=100, help="Number of weather locations")
+    parser.add_argument('--start', help="First hour, ISO format (default: current hour)")
+    parser.add_argument('--hours', type=int, default=48, help="Hours of weather or dataset rows per building")
+    parser.add_argument('--count', type=int, default=10000, help="Number of requests")
+    parser.add_argument('--batch-size', type=int, default=50, help="Buildings per batch request")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Buildings generated per chunk")
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_DATASET_ROWS,
+                        help="Dataset rows (building-hours) held in memory at once")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now().replace(minute=0, second=0, microsecond=0)
+    fleet = SyntheticFleet(args.buildings, args.locations, args.seed, args.chunk_size)
+
+    started = time.perf_counter()
+    if args.kind == 'roster':
+        written = write_roster(fleet, args.output)
+    elif args.kind == 'weather':
+        written = write_forecasts(fleet, start, args.hours, args.output)
+    elif args.kind == 'dataset':
+        written = write_table(fleet.iter_dataset(start, args.hours, args.max_rows), args.output)
+    else:
+        written = write_requests(fleet.iter_requests(args.count, start, batch_size=args.batch_size), args.output)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Wrote {written:,} {args.kind} records to {args.output} in {elapsed:.2f}s")
+    return written
+
+
+if __name__ == "__main__":
+    main()
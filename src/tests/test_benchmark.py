@@ -0,0 +1,19 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ml', 'training')))
+
+from benchmark import trace_allocations
+
+def hold_buffers(n):
+    buffers = [bytearray(4096) for _ in range(n)]
+    return buffers
+
+def test_allocations_are_attributed_to_the_allocating_line():
+    """A hotspot names the innermost repository line that allocated, not the caller wrapping the stage."""
+    result, report = trace_allocations(hold_buffers, 2000)
+
+    top = report['top_allocations'][0]
+    assert len(result) == 2000
+    assert top['location'] == f"src/tests/test_benchmark.py:{hold_buffers.__code__.co_firstlineno + 1}"
+    assert top['size_mb'] >= 2000 * 4096 / 2 ** 20
@@ -0,0 +1,76 @@
+import sys
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('catboost')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ml', 'training')))
+
+from catboost_model import ProductionCatBoostModel, latest_published_version
+
+def write_dataset(path, hours=600, seed=0):
+    rng = np.random.default_rng(seed)
+    temperature = rng.normal(5, 4, hours)
+    pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=hours, freq='h'),
+        'outdoor_temp': temperature,
+        'hour': np.arange(hours) % 24,
+        'heat_demand_kW': np.maximum(0, 18 - temperature) * 2 + rng.normal(0, 0.5, hours)
+    }).to_csv(path, index=False)
+
+def train_and_save(data_path, output_dir):
+    model = ProductionCatBoostModel(
+        model_path=os.path.join(output_dir, 'best_heating_model.pkl'),
+        config_path=os.path.join(output_dir, 'model_config.json')
+    )
+    model.best_params['iterations'] = 30
+    X_train, y_train, X_val, y_val, _, _ = model.load_and_prepare_data(data_path)
+    model.train_model(X_train, y_train, X_val, y_val)
+    model.save_model(output_dir)
+    return model
+
+def test_candidate_published_only_within_tolerance(tmp_path):
+    """Test that the holdout gate rejects a candidate beyond tolerance and publishes one within it."""
+    write_dataset(tmp_path / 'train.csv')
+    write_dataset(tmp_path / 'window.csv', hours=400, seed=1)
+    model = train_and_save(tmp_path / 'train.csv', str(tmp_path))
+    
+    # No candidate can be 90% better than the current model on the holdout
+    rejected = model.incremental_update(tmp_path / 'window.csv', iterations=20, tolerance=-0.9, output_dir=str(tmp_path))
+    
+    assert rejected['published'] is False and rejected['model_version'] == 1
+    assert not os.path.exists(tmp_path / 'best_heating_model_v2.pkl')
+    assert json.load(open(tmp_path / 'model_config.json'))['model_version'] == 1
+    
+    accepted = model.incremental_update(tmp_path / 'window.csv', iterations=20, tolerance=10.0, output_dir=str(tmp_path))
+    
+    assert accepted['published'] is True and accepted['model_version'] == 2
+    assert accepted['candidate']['MAE'] <= accepted['baseline']['MAE'] * 11
+    config = json.load(open(tmp_path / 'model_config.json'))
+    assert config['model_version'] == 2 and config['incremental_updates'][0]['from_version'] == 1
+
+def test_full_retrain_continues_version_numbering(tmp_path):
+    """Test that a fresh retrain after an incremental update writes the next version instead of overwriting v1."""
+    write_dataset(tmp_path / 'train.csv')
+    train_and_save(tmp_path / 'train.csv', str(tmp_path))
+    first = open(tmp_path / 'best_heating_model_v1.pkl', 'rb').read()
+    
+    updater = ProductionCatBoostModel(
+        model_path=str(tmp_path / 'best_heating_model.pkl'), config_path=str(tmp_path / 'model_config.json')
+    )
+    updater.load_model()
+    updater.save_model(str(tmp_path))
+    retrained = train_and_save(tmp_path / 'train.csv', str(tmp_path))
+    
+    assert retrained.model_version == 3
+    assert json.load(open(tmp_path / 'model_config.json'))['model_version'] == 3
+    assert open(tmp_path / 'best_heating_model_v1.pkl', 'rb').read() == first
+    assert latest_published_version(str(tmp_path)) == 3
+    
+    # The highest versioned file counts even when the config was lost
+    os.remove(tmp_path / 'model_config.json')
+    assert latest_published_version(str(tmp_path)) == 3
+    assert latest_published_version(str(tmp_path / 'missing')) == 0
@@ -0,0 +1,73 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ml', 'etl')))
+
+from energyplus_etl import EnergyPlusETL, read_epw, transform_file
+
+TARGET = 'PLANT:Plant Supply Side Heating Demand Rate [W](Hourly)'
+
+def write_epw(path, months):
+    """Two days per month at the start of each month, each month from a different source year (as in TMY files)."""
+    rows = []
+    for month, source_year in months:
+        for day in (1, 2):
+            for hour in range(1, 25):
+                fields = [source_year, month, day, hour, 60, '?'] + [0] * 29
+                fields[6] = month * 10 + hour / 100
+                rows.append(','.join(map(str, fields)))
+    with open(path, 'w') as f:
+        f.write('\n'.join(['HEADER'] * 8 + rows) + '\n')
+
+def write_simulation_csv(path, months):
+    stamps = [f' {month:02d}/{day:02d}  {hour:02d}:00:00' for month in months for day in (1, 2) for hour in range(1, 25)]
+    pd.DataFrame({'Date/Time': stamps, TARGET: np.arange(len(stamps)) * 1000.0}).to_csv(path, index=False)
+
+def test_typical_year_weather_joins_every_simulation_hour(tmp_path):
+    """Test that EPW months from mixed source years align with the simulation year."""
+    write_epw(tmp_path / 'site.epw', [(1, 1995), (2, 2001), (3, 1988)])
+    write_simulation_csv(tmp_path / 'run.csv', [1, 2, 3])
+    
+    result = transform_file(str(tmp_path / 'run.csv'), 'office', 2009, str(tmp_path / 'site.epw'), str(tmp_path / 'out'))
+    df = pd.read_parquet(result['output'])
+    
+    assert result['rows'] == 144
+    assert df['DryBulbTemp'].notna().all()
+    first_feb = df[df['timestamp'] == pd.Timestamp('2009-02-01 05:00')]
+    assert first_feb['DryBulbTemp'].item() == pytest.approx(20.05)
+    assert df['heat_demand_kW'].iloc[1] == 1.0
+
+def test_leap_day_dropped_in_common_years(tmp_path):
+    """Test that a leap-day row is skipped rather than failing the parse."""
+    path = tmp_path / 'leap.epw'
+    write_epw(path, [(2, 1996)])
+    with open(path, 'a') as f:
+        f.write(','.join(map(str, [1996, 2, 29, 1, 60, '?'] + [0] * 29)) + '\n')
+    
+    weather = read_epw(str(path), 2009)
+    
+    assert len(weather) == 48 and weather.index.notna().all()
+
+def test_unmatched_weather_fails_the_file(tmp_path):
+    """Test that a weather file missing most simulation hours is reported instead of producing NaN columns."""
+    write_epw(tmp_path / 'site.epw', [(1, 1995)])
+    write_simulation_csv(tmp_path / 'run.csv', [1, 6, 7])
+    
+    with pytest.raises(ValueError, match='matched'):
+        transform_file(str(tmp_path / 'run.csv'), 'office', 2009, str(tmp_path / 'site.epw'), str(tmp_path / 'out'))
+
+def test_unchanged_sources_are_skipped(tmp_path):
+    """Test that a second run only rebuilds files whose content changed."""
+    archetype_dir = tmp_path / 'models' / 'office'
+    archetype_dir.mkdir(parents=True)
+    write_simulation_csv(archetype_dir / 'run.csv', [1])
+    etl = EnergyPlusETL(str(tmp_path / 'models'), str(tmp_path / 'out'), workers=1)
+    
+    assert etl.run()['processed'] == 1
+    second = etl.run()
+    assert (second['processed'], second['skipped'], second['failed']) == (0, 1, 0)
+    assert os.path.exists(tmp_path / 'out' / 'building_type=office' / 'run.parquet')
@@ -0,0 +1,45 @@
+import sys
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'simulation')))
+
+from synthetic_fleet import SyntheticFleet
+
+START = datetime(2024, 1, 1)
+
+def test_same_seed_gives_the_same_fleet():
+    """Test that rosters and datasets are reproducible for a seed and differ across seeds."""
+    first, second = SyntheticFleet(50, 5, seed=3, chunk_size=20), SyntheticFleet(50, 5, seed=3, chunk_size=20)
+    
+    pd.testing.assert_frame_equal(pd.concat(first.iter_buildings()), pd.concat(second.iter_buildings()))
+    pd.testing.assert_frame_equal(pd.concat(first.iter_dataset(START, 24)), pd.concat(second.iter_dataset(START, 24)))
+    other = pd.concat(SyntheticFleet(50, 5, seed=4, chunk_size=20).iter_buildings())
+    assert not other['floorArea'].equals(pd.concat(first.iter_buildings())['floorArea'])
+
+def test_chunks_regenerate_independently():
+    """Test that any chunk can be generated alone and equals its slice of the full fleet."""
+    fleet = SyntheticFleet(50, 5, seed=1, chunk_size=20)
+    full = pd.concat(fleet.iter_buildings(), ignore_index=True)
+    
+    assert [end - begin for _, begin, end in fleet.chunks()] == [20, 20, 10]
+    pd.testing.assert_frame_equal(fleet.buildings(2), full.iloc[40:].reset_index(drop=True))
+    assert full['buildingId'].is_unique and full['buildingId'].iloc[-1] == 'bldg-00000049'
+
+def test_dataset_blocks_are_bounded_and_do_not_change_rows():
+    """Test that the row budget bounds every block without changing the generated rows."""
+    fleet = SyntheticFleet(30, 4, seed=2, chunk_size=20)
+    hours = 48
+    
+    blocks = list(fleet.iter_dataset(START, hours, max_rows=5 * hours))
+    unbounded = pd.concat(fleet.iter_dataset(START, hours), ignore_index=True)
+    
+    assert max(len(block) for block in blocks) == 5 * hours and len(blocks) == 4 + 2
+    pd.testing.assert_frame_equal(pd.concat(blocks, ignore_index=True), unbounded)
+    assert len(unbounded) == 30 * hours
+    # A budget smaller than one building still emits one building per block
+    assert len(next(fleet.iter_dataset(START, hours, max_rows=10))) == hours